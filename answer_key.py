@@ -0,0 +1,228 @@
+import argparse
+import difflib
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime
+
+# Resolves each question's `correct` answer texts to option indices once, when
+# the row is written, and stores them in questions.correct_idx (a JSON list of
+# ints) so pages only compare integers. A row whose options/correct change gets
+# correct_idx reset to NULL by a trigger (schema.py); writers then call
+# resolve_pending(conn) before committing, next to schema.refresh_category_sets().
+#
+# Answers are matched exactly first, then ignoring case/spacing/an 'A. ' label,
+# then as a bare option letter, then fuzzily. Answers that match nothing are
+# queued in answer_review instead of silently leaving the question without a
+# correct option:
+#
+#   python answer_key.py [--db PATH] list
+#   python answer_key.py accept QUESTION_ID [LETTER ...]   # default: the suggestion
+#   python answer_key.py rebuild                            # re-resolve every row
+#
+# Without --db the commands cover every datasource.write_paths() file (mcqs.db,
+# or the configured primary and shards); the promoted snapshot is refused.
+
+# --- CONFIGURATION ---
+LETTERS = 'ABCDE'
+FUZZY_ACCEPT = 0.88  # difflib ratio needed to take the closest option without review
+FUZZY_MARGIN = 0.1   # ...and by how much it must beat the runner-up
+BATCH_SIZE = 5000
+
+_LABEL = re.compile(r'^[a-e][.)]\s*', re.IGNORECASE)
+
+
+# --- MATCHING ---
+
+def _normalize(text):
+    """'  B.  Dynamic  grounding. ' -> 'dynamic grounding'"""
+    text = _LABEL.sub('', ' '.join(text.split()))
+    return text.rstrip('.').lower()
+
+
+def _closest(answer, normalized_options):
+    """(best index, best ratio, runner-up ratio) by difflib similarity."""
+    scores = sorted(((difflib.SequenceMatcher(None, answer, option).ratio(), i)
+                     for i, option in enumerate(normalized_options)), reverse=True)
+    if not scores:
+        return None, 0.0, 0.0
+    return scores[0][1], scores[0][0], scores[1][0] if len(scores) > 1 else 0.0
+
+
+def resolve(options, correct):
+    """
+    Maps `correct` (a list of answer texts, or a single one) onto `options`.
+    Returns (sorted option indices, misses) where misses lists
+    (answer, closest option index or None, ratio) for answers matching no option.
+    """
+    if not isinstance(options, list):
+        options = []
+    if isinstance(correct, str):
+        correct = [correct]
+    elif not isinstance(correct, list):
+        correct = []
+    stripped = [str(o).strip() for o in options]
+    normalized = [_normalize(o) for o in stripped]
+
+    indices, misses = set(), []
+    for answer in correct:
+        answer = str(answer).strip()
+        if answer in stripped:
+            indices.add(stripped.index(answer))
+            continue
+        key = _normalize(answer)
+        if key in normalized:
+            indices.add(normalized.index(key))
+            continue
+        letter = answer.rstrip('.)').upper()
+        if len(letter) == 1 and letter in LETTERS[:len(options)]:
+            indices.add(LETTERS.index(letter))
+            continue
+        best, ratio, runner_up = _closest(key, normalized)
+        if best is not None and ratio >= FUZZY_ACCEPT and ratio - runner_up >= FUZZY_MARGIN:
+            indices.add(best)
+            continue
+        misses.append((answer, best, round(ratio, 3)))
+    return sorted(indices), misses
+
+
+# --- WRITE-TIME RESOLUTION ---
+
+def json_field(text):
+    """A JSON column of questions, parsed ([] if empty, the raw text if not JSON)."""
+    try:
+        return json.loads(text) if text else []
+    except ValueError:
+        return text  # bare text in `correct` still counts as one answer
+
+
+def resolve_pending(conn):
+    """
+    Fills correct_idx for every row where it is NULL (new or edited rows) and
+    updates the review queue. Runs inside the caller's transaction; the lookup
+    uses the partial index idx_questions_unresolved. Returns (resolved, queued).
+    """
+    resolved = queued = 0
+    now = datetime.now().isoformat(timespec='seconds')
+    while True:
+        rows = conn.execute('SELECT rowid, id, options, correct FROM questions '
+                            'WHERE correct_idx IS NULL LIMIT ?', (BATCH_SIZE,)).fetchall()
+        if not rows:
+            break
+        updates, review, cleared = [], [], []
+        for rowid, qid, options, correct in rows:
+            options = json_field(options)
+            indices, misses = resolve(options, json_field(correct))
+            updates.append((json.dumps(indices), rowid))
+            if misses or not indices:
+                best = misses[0][1] if misses else None
+                ratio = misses[0][2] if misses else None
+                review.append((qid, json.dumps([m[0] for m in misses], ensure_ascii=False), best, ratio, now))
+            else:
+                cleared.append((qid,))
+        conn.executemany('UPDATE questions SET correct_idx = ? WHERE rowid = ?', updates)
+        conn.executemany('INSERT OR REPLACE INTO answer_review (question_id, unmatched, suggestion, score, queued_at) '
+                         'VALUES (?, ?, ?, ?, ?)', review)
+        conn.executemany('DELETE FROM answer_review WHERE question_id = ?', cleared)
+        resolved += len(cleared)
+        queued += len(review)
+    if resolved or queued:
+        conn.execute('DELETE FROM answer_review WHERE question_id NOT IN (SELECT id FROM questions)')
+    return resolved, queued
+
+
+# --- REVIEW CLI ---
+
+def _label(i):
+    return LETTERS[i] if i < len(LETTERS) else str(i + 1)
+
+
+def list_queue(conn):
+    rows = conn.execute('''
+        SELECT r.question_id, r.unmatched, r.suggestion, r.score, q.category, q.set_id, q.question, q.options
+        FROM answer_review r JOIN questions q ON q.id = r.question_id
+        ORDER BY q.category, q.set_id, r.question_id''').fetchall()
+    for qid, unmatched, suggestion, score, category, set_id, question, options in rows:
+        print(f'{qid}  {category} / set {set_id}')
+        print(f"    {' '.join(question.split())[:110]}")
+        for i, option in enumerate(json_field(options)):
+            mark = '?' if i == suggestion else ' '
+            print(f'   {mark}{_label(i)}. {option}')
+        answers = json.loads(unmatched)
+        print(f"    unmatched: {', '.join(repr(a) for a in answers) if answers else '(no answer given)'}"
+              + (f'  (closest {_label(suggestion)}, ratio {score})' if suggestion is not None else ''))
+    print(f'{len(rows)} questions awaiting review')
+
+
+def accept(conn, qid, letters):
+    """Sets `correct` to the chosen options (default: the queued suggestion) and re-resolves."""
+    row = conn.execute('SELECT q.options, r.suggestion FROM questions q '
+                       'LEFT JOIN answer_review r ON r.question_id = q.id WHERE q.id = ?', (qid,)).fetchone()
+    if row is None:
+        sys.exit(f'No question {qid}')
+    options = json_field(row[0])
+    if letters:
+        picks = [LETTERS.index(l.upper()) for l in letters if l.upper() in LETTERS]
+    else:
+        picks = [row[1]] if row[1] is not None else []
+    picks = [i for i in picks if i < len(options)]
+    if not picks:
+        sys.exit(f'{qid}: no valid option chosen (give letters, e.g. accept {qid} B)')
+    with conn:
+        conn.execute('UPDATE questions SET correct = ? WHERE id = ?',
+                     (json.dumps([options[i].strip() for i in picks]), qid))
+        resolve_pending(conn)
+    print(f"{qid}: correct = {', '.join(_label(i) for i in picks)}")
+
+
+def main():
+    import datasource  # both import this module; only the CLI needs the reverse
+    import schema
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='one database file (default: every write source)')
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('list')
+    accept_cmd = sub.add_parser('accept')
+    accept_cmd.add_argument('question_id')
+    accept_cmd.add_argument('letters', nargs='*')
+    sub.add_parser('rebuild')
+    args = parser.parse_args()
+
+    if args.db and not os.path.exists(args.db):
+        sys.exit(f'No database at {args.db}')
+    paths = [args.db] if args.db else [p for p in datasource.write_paths() if os.path.exists(p)]
+    try:
+        for path in paths:
+            datasource.check_writable(path)
+    except ValueError as e:
+        sys.exit(str(e))
+    if not paths:
+        sys.exit('No source database found')
+
+    for path in paths:
+        conn = sqlite3.connect(path)
+        try:
+            schema.migrate(conn)
+            if args.command == 'accept':
+                if conn.execute('SELECT 1 FROM questions WHERE id = ?', (args.question_id,)).fetchone():
+                    accept(conn, args.question_id, args.letters)
+                    return
+            elif args.command == 'rebuild':
+                with conn:
+                    conn.execute('UPDATE questions SET correct_idx = NULL')
+                    resolved, queued = resolve_pending(conn)
+                print(f'{path}: {resolved} questions resolved, {queued} queued for review')
+            else:
+                if len(paths) > 1:
+                    print(f'== {path}')
+                list_queue(conn)
+        finally:
+            conn.close()
+    if args.command == 'accept':
+        sys.exit(f'No question {args.question_id}')
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,19 @@
 from flask import Flask, render_template, abort, send_from_directory, request, jsonify, session, redirect, url_for, make_response
 from flask_mail import Mail, Message
+from jinja2 import FileSystemBytecodeCache
+import hashlib
 import os
 import random
+import secrets
 import utils  # <--- IMPORT YOUR NEW UTILS MODULE
+import assets
+import attempts
+import content_version
+import metrics
+import popularity
+import profiler
+import critical_css
+from compression import CompressionMiddleware
 
 # --- DOTENV ---
 try:
@@ -13,6 +24,28 @@ except ModuleNotFoundError:
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'default-key')
+# Set pages ship stems/options only; answers + explanations load from /api/mcqs/.../answers
+app.config['MCQ_LAZY_ANSWERS'] = os.environ.get('MCQ_LAZY_ANSWERS', 'True').lower() == 'true'
+
+# --- TEMPLATE BYTECODE CACHE (shared by all workers, survives restarts) ---
+JINJA_CACHE_DIR = os.path.join(app.root_path, '.jinja_cache')
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache(JINJA_CACHE_DIR)
+
+# --- INSTRUMENTATION (/metrics + Server-Timing). Registered first so it times the other hooks ---
+metrics.init_app(app)
+
+# --- ON-DEMAND SAMPLING PROFILER (POST /admin/profile, or SIGUSR2 under gunicorn) ---
+profiler.init_app(app)
+
+# --- STATIC ASSETS (asset_url helper + immutable caching) ---
+assets.init_app(app)
+
+# --- RENDER PASS (inline above-the-fold CSS, async-load the rest) ---
+critical_css.init_app(app)
+
+# --- RESPONSE COMPRESSION (br/gzip + precompressed static fast path) ---
+app.wsgi_app = CompressionMiddleware(app.wsgi_app, app.static_folder, app.static_url_path)
 
 # --- MAIL CONFIG ---
 app.config['MAIL_SERVER'] = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
@@ -27,6 +60,49 @@ mail = Mail(app)
 # In-memory store for OTPs (resets on restart)
 user_otps = {} 
 
+def revalidated(html):
+    """
+    HTML response with an ETag and `no-cache`, so browsers and the service
+    worker (stale-while-revalidate) get an empty 304 when nothing changed.
+    """
+    response = make_response(html)
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# --- HOT CONTENT RELOAD (one watcher for all workers, see content_version.py) ---
+content_version.watch_tree(os.path.join(app.root_path, app.template_folder))
+
+@app.before_request
+def _check_content_version():
+    content_version.check()
+
+@app.after_request
+def _content_version_header(response):
+    # The service worker compares this with the version it was built for
+    token = content_version.token()
+    if token:
+        response.headers['X-Content-Version'] = token
+    return response
+
+def _reload_content(changed):
+    """A publish landed: swap in new snapshots now, and forget compiled templates if they moved."""
+    if 'templates' in changed:
+        if app.jinja_env.cache is not None:
+            app.jinja_env.cache.clear()
+        _article_pages.clear()
+        _category_pages.clear()
+        critical_css.reset()
+    if 'data' in changed:
+        warm_content()
+
+content_version.on_change(_reload_content)
+
+def count_view(kind, key):
+    """Counts a page view for popularity, skipping service worker prefetches."""
+    if 'X-Prefetch' not in request.headers:
+        popularity.record_view(kind, key)
+
 # ==========================================
 # 1. MAIN PAGE ROUTES
 # ==========================================
@@ -35,7 +111,11 @@ user_otps = {}
 def home():
     # Fetch articles using Utils (JSON)
     articles = utils.get_all_articles()
-    return render_template('home.html', articles=articles)
+    # Trending comes from the in-memory top-K (refreshed by popularity's flusher)
+    trending_articles = popularity.trending('article', articles, popularity.article_key, 4)
+    trending_sets = popularity.trending('set', utils.get_mcq_set_index(), popularity.set_key, 6)
+    return render_template('home.html', articles=articles,
+                           trending_articles=trending_articles, trending_sets=trending_sets)
 
 # ==========================================
 # CONTEST PAGE ROUTE (TOGGLE BELOW)
@@ -58,7 +138,8 @@ def page_practice_mcqs():
     # Only fetch the first 6 sets (Page 1)
     # This keeps the initial load instant and RAM usage low
     initial_sets = utils.get_paginated_mcq_sets(page=1, per_page=6)
-    return render_template('practice_mcqs.html', initial_sets=initial_sets)
+    return revalidated(render_template('practice_mcqs.html', initial_sets=initial_sets,
+                                       categories=utils.get_category_overview()))
 
 # --- NEW: API FOR "LOAD MORE" BUTTON ---
 @app.route('/api/load-sets')
@@ -66,47 +147,201 @@ def api_load_sets():
     try:
         # Get page number from URL (e.g., ?page=2), default to 2
         page = int(request.args.get('page', 2))
+        # ?sort=popular -> most viewed first (default: category, newest set)
+        sort = request.args.get('sort')
         
         # Fetch the next chunk of sets
-        sets = utils.get_paginated_mcq_sets(page=page, per_page=6)
+        sets = utils.get_paginated_mcq_sets(page=page, per_page=6, sort=sort)
         
         return jsonify({
             'success': True,
-            'sets': sets,
+            'sets': [s.to_dict() for s in sets],
             'has_more': len(sets) == 6 # If we got fewer than 6, we reached the end
         })
     except Exception as e:
+        app.logger.exception("load-sets failed")
+        metrics.record_error('/api/load-sets')
         return jsonify({'success': False, 'error': str(e)})
 
+# slug -> (sets tuple it was rendered from, html). The tuple is replaced when
+# the DB changes, so an identity check is enough to know the page is current.
+_category_pages = {}
+
+@app.route('/mcqs/<category>')
+def mcq_category_page(category):
+    cat = utils.resolve_category(category)
+    if cat is None:
+        abort(404)
+    if cat.slug != category:
+        return redirect(url_for('mcq_category_page', category=cat.slug), code=301)
+
+    sets = utils.get_category_sets(cat)
+    if not sets:
+        abort(404)
+    cached = _category_pages.get(cat.slug)
+    if cached is None or cached[0] is not sets:
+        html = render_template(
+            'mcq_category.html',
+            category=cat.name,
+            sets=sets,
+            question_count=sum(s.question_count for s in sets),
+        )
+        _category_pages[cat.slug] = cached = (sets, html)
+    return revalidated(cached[1])
+
 @app.route('/mcqs/<category>/set-<int:set_num>')
 def mcq_page(category, set_num):
+    # Resolve the slug through the in-memory category map (no string munging in SQL)
+    cat = utils.resolve_category(category)
+    if cat is None:
+        abort(404)
+    if cat.slug != category:
+        # Legacy / differently-cased slug -> canonical URL
+        return redirect(url_for('mcq_page', category=cat.slug, set_num=set_num), code=301)
+
     # Fetch all data for the single set page using Utils (SQLite)
-    data = utils.get_mcq_set_data(category, set_num)
+    data = utils.get_mcq_set_data(cat, set_num)
     
     if not data:
         abort(404)
+    count_view('set', f'{cat.slug}/{set_num}')
 
-    return render_template(
+    answers_url = url_for('api_mcq_answers', category=cat.slug, set_num=set_num)
+    # Warmed into the service worker cache so "Next Set" (and offline checking) is instant
+    prefetch_urls = [answers_url] if app.config['MCQ_LAZY_ANSWERS'] else []
+    if data['has_next']:
+        prefetch_urls.append(url_for('mcq_page', category=cat.slug, set_num=set_num + 1))
+        if app.config['MCQ_LAZY_ANSWERS']:
+            prefetch_urls.append(url_for('api_mcq_answers', category=cat.slug, set_num=set_num + 1))
+
+    return revalidated(render_template(
         'mcq_layout.html', 
+        lazy_answers=app.config['MCQ_LAZY_ANSWERS'],
+        answers_url=answers_url,
+        prefetch_urls=prefetch_urls,
         questions=data['questions'], 
         title=f"{data['clean_category']} - Set {set_num}", 
         category=data['clean_category'],
+        category_slug=data['category_slug'],
         current_tag=data['current_tag'], 
         set_num=set_num, 
         has_next=data['has_next'],
         sidebar_sets=data['sidebar_sets']
+    ))
+
+@app.route('/api/mcqs/<category>/set-<int:set_num>/answers')
+def api_mcq_answers(category, set_num):
+    # Answer key for the lazy set page; fetched on the first "Check Answer" click
+    cat = utils.resolve_category(category)
+    answers = utils.get_mcq_set_answers(cat, set_num) if cat else None
+    if answers is None:
+        return jsonify({'success': False, 'error': 'Set not found'}), 404
+
+    response = jsonify({'success': True, 'answers': answers})
+    response.add_etag()
+    # Revalidate every time; unchanged sets come back as an empty 304
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request)
+
+@app.route('/api/attempts', methods=['POST'])
+def api_attempts():
+    # navigator.sendBeacon target: buffered in memory, bulk-written to attempts.db
+    if (request.content_length or 0) > 64 * 1024:
+        return jsonify({'success': False, 'error': 'Payload too large'}), 413
+    try:
+        rows = attempts.parse_beacon(request.get_data(cache=False), utils.get_answer_indices)
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Malformed beacon'}), 400
+    attempts.record(rows)
+    return '', 204
+
+@app.route('/mcqs/<category>/exam')
+def mcq_exam(category):
+    # Random exam across every set in a category: /mcqs/<category>/exam?n=60&seed=...
+    cat = utils.resolve_category(category)
+    if cat is None:
+        abort(404)
+    n = request.args.get('n', 60, type=int)
+    seed = request.args.get('seed', '')
+    valid_seed = seed.isalnum() and len(seed) <= 32
+    if cat.slug != category or not valid_seed:
+        # Pin a seed in the URL so the exam can be shared / reloaded as-is
+        target = url_for('mcq_exam', category=cat.slug, n=n, seed=seed if valid_seed else secrets.token_hex(4))
+        return redirect(target, code=301 if valid_seed else 302)
+
+    questions = utils.get_exam_questions(cat, n, seed)
+    if not questions:
+        abort(404)
+
+    return render_template(
+        'mcq_layout.html',
+        lazy_answers=app.config['MCQ_LAZY_ANSWERS'],
+        # The ids rendered, so the key matches this page even if the bank changes meanwhile
+        answers_url=url_for('api_exam_answers', category=cat.slug, ids=','.join(q['id'] for q in questions)),
+        questions=questions,
+        title=f"{cat.name} - Practice Exam ({len(questions)} Questions)",
+        category=cat.name,
+        category_slug=cat.slug,
+        current_tag=questions[0]['tag'],
+        set_num=None,
+        has_next=False,
+        new_exam_url=url_for('mcq_exam', category=cat.slug, n=n),
+        sidebar_sets=utils.get_category_sets(cat)[:5]
     )
 
+@app.route('/api/mcqs/<category>/exam/answers')
+def api_exam_answers(category):
+    cat = utils.resolve_category(category)
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    answers = utils.get_exam_answers(cat, ids) if cat and ids else None
+    if answers is None:
+        return jsonify({'success': False, 'error': 'Exam not found'}), 404
+
+    response = jsonify({'success': True, 'answers': answers})
+    response.add_etag()
+    response.headers['Cache-Control'] = 'public, no-cache'
+    return response.make_conditional(request)
+
+# slug -> (Article it was rendered from, html). Dropped per slug when builder.py
+# publishes or deletes that article (utils notifies us from the change log).
+_article_pages = {}
+
+def forget_articles(slugs):
+    """Evicts the rendered page and compiled template of each changed article."""
+    if slugs is None:
+        _article_pages.clear()
+        stale = lambda name: name.startswith('articles/')
+    else:
+        for slug in slugs:
+            _article_pages.pop(slug, None)
+        names = {f'articles/{slug}.html' for slug in slugs}
+        stale = names.__contains__
+    cache = app.jinja_env.cache
+    if cache is not None:
+        for key in cache.keys():
+            if stale(key[1]):
+                try:
+                    del cache[key]
+                except KeyError:
+                    pass
+
+utils.on_article_change(forget_articles)
+
 @app.route('/<slug>')
 def article_detail(slug):
-    # Fetch article by slug using Utils (JSON)
+    # Fetch article by slug using Utils (articles.json + change log)
     article = utils.get_article_by_slug(slug)
     
     if article:
-        try:
-            return render_template(f'articles/{slug}.html', article=article)
-        except:
-            return f"<h1>Error</h1><p>Template for '{slug}' not found.</p>", 404
+        cached = _article_pages.get(slug)
+        if cached is None or cached[0] is not article:
+            try:
+                html = render_template(f'articles/{slug}.html', article=article)
+            except:
+                return f"<h1>Error</h1><p>Template for '{slug}' not found.</p>", 404
+            _article_pages[slug] = cached = (article, html)
+        count_view('article', slug)
+        return revalidated(cached[1])
             
     # Fallback/404
     abort(404)
@@ -207,6 +442,24 @@ def ads_txt():
     # Serves the ads.txt file from the root directory
     return send_from_directory(app.root_path, 'ads.txt')
 
+# Cached by the service worker on install; hashed URLs, so they change per build
+SW_SHELL_ASSETS = (
+    'bundles/global.css', 'bundles/practice_mcqs.css', 'bundles/mcq.css', 'images/logo.png',
+)
+
+@app.route('/sw.js')
+def service_worker():
+    # Served from the root so its scope covers the whole site
+    shell = ['/practice-mcqs'] + [assets.asset_url(name) for name in SW_SHELL_ASSETS]
+    # A publish changes the content version, hence this file, so browsers install a
+    # new worker that starts from an empty page cache
+    content = content_version.token()
+    version = hashlib.sha1('|'.join(shell + [content]).encode()).hexdigest()[:10]
+    response = make_response(render_template('sw.js', shell=shell, version=version, content_version=content))
+    response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
 @app.route('/sitemap.xml')
 def sitemap():
     host = "https://codewme.dev"
@@ -245,5 +498,33 @@ def sitemap():
     response.headers["Content-Type"] = "application/xml"
     return response
 
+# ==========================================
+# 4. WORKER WARMUP
+# ==========================================
+
+def warm_content():
+    """Builds the in-memory content snapshots (each is swapped in whole once built)."""
+    utils.get_all_articles()
+    utils.get_contests_data()
+    utils.get_category_map()
+    utils.get_mcq_set_index()
+    utils.get_category_overview()
+    utils.get_exam_pools()
+
+def warmup():
+    """
+    Compiles every template and primes the data caches, so the first real
+    request does not pay for it. Called from gunicorn's post_worker_init.
+    """
+    # Before building anything: in the master this records the versions the
+    # caches belong to, and a worker forked later (with the master's compiled
+    # templates) first drops whatever changed since then
+    content_version.check()
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+    warm_content()
+    popularity.load()
+
 if __name__ == '__main__':
+    warmup()
     app.run(debug=False)
\ No newline at end of file
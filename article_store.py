@@ -0,0 +1,150 @@
+import json
+import os
+import sys
+
+# articles.json is a snapshot; edits since the last compaction live in an
+# append-only change log next to it (articles.changes.jsonl), one JSON line per
+# put/delete. builder.py appends a single line per publish instead of rewriting
+# the snapshot, and readers (utils) tail the log from where they left off, so a
+# publish costs O(1) on both sides and tells readers exactly which slug changed.
+#
+#   python article_store.py compact [articles.json]
+#
+# folds the log into the snapshot (builder also does this once the log is long).
+
+COMPACT_AT = 200  # log entries before builder folds them into the snapshot
+
+
+def changes_path(snapshot_path):
+    return os.path.splitext(snapshot_path)[0] + '.changes.jsonl'
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class ArticleStore:
+    """
+    slug -> article dict, oldest first internally (new articles are appended,
+    edits keep their place); records() returns them newest first like the snapshot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.log_path = changes_path(path)
+        self.articles = {}
+        self.log_entries = 0
+        self._snapshot_stat = None
+        self._log_stat = None
+        self._log_offset = 0
+
+    # --- READ ---
+
+    def records(self):
+        return list(reversed(self.articles.values()))
+
+    def get(self, slug):
+        return self.articles.get(slug)
+
+    def reload(self):
+        """Reads the snapshot and the whole log. Returns None (everything changed)."""
+        self._snapshot_stat = _stat(self.path)
+        self.articles = {}
+        if self._snapshot_stat is not None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for article in reversed(json.load(f)):
+                    self.articles[article['slug']] = article
+        self.log_entries = 0
+        self._log_offset = 0
+        self._log_stat = None
+        self._read_log()
+        return None
+
+    def refresh(self):
+        """
+        Picks up changes made by other processes. Returns the set of slugs that
+        changed since the last call, or None if everything was reloaded.
+        """
+        snapshot_stat = _stat(self.path)
+        if snapshot_stat != self._snapshot_stat:
+            return self.reload()  # compacted (or replaced by hand)
+        log_stat = _stat(self.log_path)
+        if log_stat == self._log_stat:
+            return set()
+        if log_stat is None or (self._log_stat and log_stat[0] != self._log_stat[0]) \
+                or log_stat[1] < self._log_offset:
+            return self.reload()  # log truncated or replaced
+        return self._read_log()
+
+    def _read_log(self):
+        changed = set()
+        self._log_stat = _stat(self.log_path)
+        if self._log_stat is None:
+            return changed
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._log_offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # a writer is mid-append; pick the rest up next time
+                self._log_offset += len(line)
+                entry = json.loads(line)
+                changed.add(self._apply(entry))
+                self.log_entries += 1
+        return changed
+
+    def _apply(self, entry):
+        if entry['op'] == 'put':
+            article = entry['article']
+            self.articles[article['slug']] = article
+            return article['slug']
+        self.articles.pop(entry['slug'], None)
+        return entry['slug']
+
+    # --- WRITE (builder) ---
+
+    def _append(self, entry):
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        # One write() on an O_APPEND file, so readers see whole lines or nothing
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+        self._apply(entry)
+        self.log_entries += 1
+        self._log_offset += len(line.encode('utf-8'))
+        self._log_stat = _stat(self.log_path)
+
+    def put(self, article):
+        self._append({'op': 'put', 'article': article})
+
+    def delete(self, slug):
+        self._append({'op': 'delete', 'slug': slug})
+
+    def compact(self):
+        """Writes the current state as the new snapshot and empties the log."""
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.records(), f, indent=2)
+        os.replace(tmp_path, self.path)
+        # Readers that replay the old log over the new snapshot just reapply the same puts/deletes
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.reload()
+
+
+def open_store(path):
+    store = ArticleStore(path)
+    store.reload()
+    return store
+
+
+if __name__ == '__main__':
+    # python article_store.py compact [path/to/articles.json]
+    if len(sys.argv) < 2 or sys.argv[1] != 'compact':
+        sys.exit('usage: python article_store.py compact [articles.json]')
+    store = open_store(sys.argv[2] if len(sys.argv) > 2 else 'articles.json')
+    entries = store.log_entries
+    store.compact()
+    print(f'{store.path}: {len(store.articles)} articles, {entries} log entries folded in')
@@ -0,0 +1,126 @@
+"""
+ASGI entry point: serves the same Flask routes under an async server.
+
+    uvicorn asgi:application --workers 4
+
+The event loop owns the sockets, so thousands of idle / slow / keep-alive
+connections cost almost nothing. The blocking part of each request (SQLite,
+file reads, template rendering, SMTP) runs on a bounded thread pool.
+We do not use asgiref's WsgiToAsgi here because it pins every request to a
+single shared thread.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app, warmup
+
+# --- CONFIGURATION ---
+THREADS = int(os.environ.get('ASGI_THREADS', 32))
+
+_executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix='asgi')
+
+
+def build_environ(scope, body):
+    """Translates an ASGI http scope into a WSGI environ."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper()
+        if '_' in name:
+            # X_Forwarded_For would land on X-Forwarded-For's key; gunicorn drops these too
+            continue
+        name = name.replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            # Repeated headers are joined; split Cookie headers need the cookie separator
+            value = environ[name] + ('; ' if name == 'HTTP_COOKIE' else ',') + value
+        environ[name] = value
+    return environ
+
+
+def run_wsgi(environ):
+    """Runs one request through the Flask app (in a pool thread)."""
+    captured = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'], captured['headers'] = status, headers
+        return chunks.append
+
+    result = app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return captured['status'], captured['headers'], b''.join(chunks)
+
+
+async def _read_body(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return bytes(body)
+
+
+async def _lifespan(receive, send):
+    loop = asyncio.get_running_loop()
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await loop.run_in_executor(_executor, warmup)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            _executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] != 'http':
+        return
+
+    body = await _read_body(receive)
+    if body is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    status, headers, payload = await loop.run_in_executor(
+        _executor, run_wsgi, build_environ(scope, body))
+
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+    })
+    await send({'type': 'http.response.body', 'body': payload})
@@ -0,0 +1,233 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import urllib.request
+
+from flask import abort, make_response, request, url_for
+
+# --- OPTIONAL: BROTLI ---
+try:
+    import brotli
+except ModuleNotFoundError:
+    brotli = None
+
+# --- CONFIGURATION ---
+STATIC_DIR = 'static'
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+VENDOR_DIR = os.path.join(STATIC_DIR, 'vendor')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+CDN_ROOT = 'https://cdnjs.cloudflare.com/ajax/libs/'
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE_EXTS = ('.css', '.js', '.svg', '.json', '.txt', '.xml')
+
+# Page bundles: one stylesheet per page instead of one per source file.
+# 'global' stays separate so it is cached once and shared by every page.
+CSS_BUNDLES = {
+    'bundles/global.css': ['styles/global.css'],
+    'bundles/home.css': ['styles/home.css'],
+    'bundles/article.css': ['styles/article.css'],
+    'bundles/mcq.css': ['styles/article.css', 'styles/mcq.css'],
+    'bundles/practice_mcqs.css': ['styles/practice_mcqs.css'],
+    'bundles/online_compiler.css': ['styles/online_compiler.css'],
+    'bundles/contest.css': ['styles/contest.css', 'styles/home.css'],
+    'bundles/registration.css': ['styles/contest.css'],
+}
+
+# Entry scripts/styles we used to pull from cdnjs (logical name -> CDN path).
+VENDOR_FILES = {
+    'vendor/prism.js': 'prism/1.29.0/prism.min.js',
+    'vendor/prism-autoloader.js': 'prism/1.29.0/plugins/autoloader/prism-autoloader.min.js',
+    'vendor/prism-tomorrow.css': 'prism/1.29.0/themes/prism-tomorrow.min.css',
+    'vendor/ace.js': 'ace/1.4.12/ace.js',
+    'vendor/ace-language-tools.js': 'ace/1.4.12/ext-language_tools.min.js',
+}
+
+# Files the libraries load on demand by name (Prism languages, Ace modes).
+# They keep their names and live under a versioned folder instead of a hash.
+PRISM_LANGUAGES = ['markup', 'css', 'clike', 'javascript', 'sql', 'apex', 'java', 'python', 'json', 'bash']
+ACE_MODES = ['python', 'javascript', 'java', 'c_cpp', 'csharp', 'golang', 'rust', 'php', 'swift',
+             'typescript', 'ruby', 'kotlin', 'sh', 'perl', 'r', 'lua', 'haskell', 'scala', 'dart',
+             'pascal', 'elixir', 'julia', 'text']
+VENDOR_DIRS = {
+    'vendor/prism-components/': ('prism/1.29.0/components/',
+                                 [f'prism-{lang}.min.js' for lang in PRISM_LANGUAGES]),
+    'vendor/ace-base/': ('ace/1.4.12/',
+                         ['theme-monokai.js'] + [f'mode-{m}.js' for m in ACE_MODES]),
+}
+
+_manifest = None
+
+# --- BUILD STEP ---
+
+def minify_css(css):
+    """Strips comments and redundant whitespace (safe subset, no rewriting)."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    css = css.replace(';}', '}')
+    return css.strip()
+
+def _write_hashed(logical_name, data):
+    """Writes data under static/dist/ with a content hash in the filename."""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    stem, ext = os.path.splitext(logical_name)
+    rel_path = f'dist/{stem}.{digest}{ext}'
+    out_path = os.path.join(STATIC_DIR, rel_path)
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(data)
+    if ext in COMPRESSIBLE_EXTS:
+        write_compressed_variants(out_path, data)
+    return rel_path
+
+def write_compressed_variants(path, data=None):
+    """Writes .gz (and .br when brotli is installed) next to a static file."""
+    if data is None:
+        with open(path, 'rb') as f:
+            data = f.read()
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+def _download(cdn_path, dest):
+    """Fetches one file from cdnjs into the vendor folder (skips if present)."""
+    if os.path.exists(dest):
+        return True
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    try:
+        with urllib.request.urlopen(CDN_ROOT + cdn_path, timeout=30) as resp:
+            data = resp.read()
+    except Exception as e:
+        print(f"Vendor download failed for {cdn_path}: {e}")
+        return False
+    with open(dest, 'wb') as f:
+        f.write(data)
+    return True
+
+def vendor_js():
+    """Downloads the CDN libraries into static/vendor/ (pinned versions)."""
+    for cdn_path in VENDOR_FILES.values():
+        _download(cdn_path, os.path.join(VENDOR_DIR, cdn_path))
+    for cdn_dir, files in VENDOR_DIRS.values():
+        for name in files:
+            dest = os.path.join(VENDOR_DIR, cdn_dir, name)
+            if _download(cdn_dir + name, dest):
+                write_compressed_variants(dest)
+
+def build():
+    """Bundles CSS, fingerprints images and vendored JS, writes the manifest."""
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+    manifest = {}
+
+    # 1. CSS bundles
+    for name, sources in CSS_BUNDLES.items():
+        parts = []
+        for src in sources:
+            with open(os.path.join(STATIC_DIR, src), 'r', encoding='utf-8') as f:
+                parts.append(minify_css(f.read()))
+        manifest[name] = _write_hashed(name, '\n'.join(parts).encode('utf-8'))
+
+    # 2. Images (icons, logo, article images)
+    images_dir = os.path.join(STATIC_DIR, 'images')
+    if os.path.isdir(images_dir):
+        for fname in sorted(os.listdir(images_dir)):
+            src = os.path.join(images_dir, fname)
+            if os.path.isfile(src):
+                with open(src, 'rb') as f:
+                    manifest[f'images/{fname}'] = _write_hashed(f'images/{fname}', f.read())
+
+    # 3. Vendored JS/CSS (only what was downloaded; the rest falls back to the CDN)
+    vendor_js()
+    for name, cdn_path in VENDOR_FILES.items():
+        src = os.path.join(VENDOR_DIR, cdn_path)
+        if os.path.exists(src):
+            with open(src, 'rb') as f:
+                manifest[name] = _write_hashed(name, f.read())
+    for name, (cdn_dir, files) in VENDOR_DIRS.items():
+        if all(os.path.exists(os.path.join(VENDOR_DIR, cdn_dir, f)) for f in files):
+            manifest[name] = f'vendor/{cdn_dir}'
+
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Built {len(manifest)} assets into {DIST_DIR}")
+    return manifest
+
+# --- RUNTIME (FLASK) ---
+
+def load_manifest():
+    """Reads static/dist/manifest.json once per process."""
+    global _manifest
+    if _manifest is None:
+        _manifest = {}
+        if os.path.exists(MANIFEST_FILE):
+            with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+                _manifest = json.load(f)
+    return _manifest
+
+def asset_url(name):
+    """
+    Jinja helper: returns the fingerprinted URL for a logical asset name.
+    Falls back to the unbuilt source (or the CDN for vendor files) in dev.
+    """
+    built = load_manifest().get(name)
+    if built:
+        return url_for('static', filename=built)
+    if name in VENDOR_FILES:
+        return CDN_ROOT + VENDOR_FILES[name]
+    if name in VENDOR_DIRS:
+        return CDN_ROOT + VENDOR_DIRS[name][0]
+    if name in CSS_BUNDLES:
+        return url_for('asset_bundle', name=name)
+    return url_for('static', filename=name)
+
+def read_bundle(name):
+    """Returns the CSS text of a bundle (built copy if present, else sources)."""
+    built = load_manifest().get(name)
+    if built:
+        with open(os.path.join(STATIC_DIR, built), 'r', encoding='utf-8') as f:
+            return f.read()
+    parts = []
+    for src in CSS_BUNDLES[name]:
+        with open(os.path.join(STATIC_DIR, src), 'r', encoding='utf-8') as f:
+            parts.append(f.read())
+    return '\n'.join(parts)
+
+def bundle_view(name):
+    """Dev fallback: serves an unbuilt CSS bundle by concatenating its sources."""
+    if name not in CSS_BUNDLES:
+        abort(404)
+    response = make_response(read_bundle(name))
+    response.headers['Content-Type'] = 'text/css; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def add_cache_headers(response, path):
+    """Marks fingerprinted/versioned static files (and hash-named article images) as immutable."""
+    if path.startswith(('/static/dist/', '/static/vendor/', '/static/images/opt/')):
+        if response.status_code in (200, 304):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE
+    return response
+
+def init_app(app):
+    """Registers asset_url(), the dev bundle route and the cache headers."""
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.add_url_rule('/assets/<path:name>', 'asset_bundle', bundle_view)
+
+    @app.after_request
+    def _asset_cache_headers(response):
+        return add_cache_headers(response, request.path)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'build':
+        build()
+    else:
+        print("Usage: python assets.py build")
@@ -0,0 +1,217 @@
+import atexit
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import metrics
+
+# --- CONFIGURATION ---
+# Separate file from mcqs.db so beacon writes never take locks the question bank needs.
+ATTEMPTS_DB = os.environ.get('ATTEMPTS_DB', 'attempts.db')
+FLUSH_SECONDS = float(os.environ.get('ATTEMPTS_FLUSH_SECONDS', 2))
+FLUSH_AT = 5000            # flush early once this many attempts are buffered
+MAX_BUFFERED = 200000      # beyond this (DB stuck?) new attempts are dropped and counted
+MAX_PER_BEACON = 200
+MAX_ID_LENGTH = 64
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS attempts (
+        id INTEGER PRIMARY KEY,
+        question_id TEXT NOT NULL,
+        correct INTEGER NOT NULL,
+        selected TEXT,
+        ts INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS question_stats (
+        question_id TEXT PRIMARY KEY,
+        attempts INTEGER NOT NULL,
+        correct INTEGER NOT NULL,
+        last_ts INTEGER NOT NULL
+    );
+'''
+
+_lock = threading.Lock()
+_wake = threading.Event()
+_buffer = []        # (question_id, correct, selected, ts)
+_flusher_pid = None
+
+
+def _connect():
+    conn = sqlite3.connect(ATTEMPTS_DB, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# --- INGEST (request thread: validate against the bank + append, no attempts.db I/O) ---
+
+def parse_beacon(payload, answer_keys):
+    """
+    {"attempts": [{"q": "<question id>", "sel": [0, 2]}, ...]} -> list of rows.
+    `answer_keys(ids)` returns {question id: correct option indices} for the
+    ids that exist in the bank; attempts on any other id are dropped, and an
+    attempt is correct when `sel` is exactly the key (the client's "ok" is
+    ignored). Malformed entries are skipped rather than failing the batch.
+    """
+    data = json.loads(payload)
+    items = data.get('attempts') if isinstance(data, dict) else None
+    if not isinstance(items, list):
+        raise ValueError('expected {"attempts": [...]}')
+    now = int(time.time())
+    selections = []
+    for item in items[:MAX_PER_BEACON]:
+        if not isinstance(item, dict):
+            continue
+        qid = item.get('q')
+        if not isinstance(qid, str) or not qid or len(qid) > MAX_ID_LENGTH:
+            continue
+        sel = item.get('sel')
+        if not isinstance(sel, list) or not 0 < len(sel) <= 10:
+            continue
+        if not all(type(i) is int and 0 <= i < 10 for i in sel):
+            continue
+        selections.append((qid, sorted(set(sel))))
+    if not selections:
+        return []
+    keys = answer_keys({qid for qid, _ in selections})
+    rows = []
+    for qid, sel in selections:
+        key = keys.get(qid)
+        if not key:
+            continue  # not in the bank, or no resolved answer to judge against
+        rows.append((qid, 1 if sel == sorted(key) else 0, ','.join(map(str, sel)), now))
+    return rows
+
+
+def record(rows):
+    """Buffers attempts for the background flusher. Returns how many were accepted."""
+    if not rows:
+        return 0
+    _ensure_flusher()
+    with _lock:
+        room = MAX_BUFFERED - len(_buffer)
+        accepted = rows[:max(room, 0)]
+        _buffer.extend(accepted)
+        size = len(_buffer)
+    if len(accepted) < len(rows):
+        metrics.inc('attempts_dropped_total', (), len(rows) - len(accepted))
+    if size >= FLUSH_AT:
+        _wake.set()
+    return len(accepted)
+
+
+# --- WRITE-BEHIND FLUSHER ---
+
+def flush():
+    """Writes everything buffered in one transaction; aggregates are folded in as well."""
+    with _lock:
+        if not _buffer:
+            return 0
+        batch = _buffer[:]
+        _buffer.clear()
+
+    # Pre-aggregate per question so question_stats gets one upsert per id, not per attempt
+    stats = {}
+    for qid, correct, _, ts in batch:
+        entry = stats.get(qid)
+        if entry is None:
+            stats[qid] = [1, correct, ts]
+        else:
+            entry[0] += 1
+            entry[1] += correct
+            entry[2] = max(entry[2], ts)
+
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    'INSERT INTO attempts (question_id, correct, selected, ts) VALUES (?, ?, ?, ?)', batch)
+                conn.executemany('''
+                    INSERT INTO question_stats (question_id, attempts, correct, last_ts) VALUES (?, ?, ?, ?)
+                    ON CONFLICT (question_id) DO UPDATE SET
+                        attempts = attempts + excluded.attempts,
+                        correct = correct + excluded.correct,
+                        last_ts = MAX(last_ts, excluded.last_ts)
+                ''', [(qid, n, c, ts) for qid, (n, c, ts) in stats.items()])
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        # Put the batch back (in front) and try again next round
+        with _lock:
+            _buffer[:0] = batch[:max(MAX_BUFFERED - len(_buffer), 0)]
+        print(f'[attempts] flush failed, {len(batch)} attempts kept: {e}', file=sys.stderr)
+        return 0
+    metrics.inc('attempts_flushed_total', (), len(batch))
+    return len(batch)
+
+
+def _run_flusher():
+    while True:
+        _wake.wait(FLUSH_SECONDS)
+        _wake.clear()
+        flush()
+
+
+def _ensure_flusher():
+    # Started lazily so it runs in the worker that receives beacons (threads don't survive fork)
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is not None:
+            _buffer.clear()  # inherited from the parent; the parent flushes its own copy
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_run_flusher, name='attempts-flusher', daemon=True).start()
+
+
+atexit.register(flush)
+
+
+# --- READ SIDE ---
+
+def get_question_stats(question_ids):
+    """question id -> {'attempts', 'correct', 'difficulty'} (difficulty = share answered wrong)."""
+    if not question_ids or not os.path.exists(ATTEMPTS_DB):
+        return {}
+    conn = sqlite3.connect(f'file:{ATTEMPTS_DB}?mode=ro', uri=True)
+    try:
+        placeholders = ','.join('?' * len(question_ids))
+        rows = conn.execute(
+            f'SELECT question_id, attempts, correct FROM question_stats WHERE question_id IN ({placeholders})',
+            list(question_ids)).fetchall()
+    finally:
+        conn.close()
+    return {
+        qid: {'attempts': n, 'correct': c, 'difficulty': round(1 - c / n, 3) if n else None}
+        for qid, n, c in rows
+    }
+
+
+if __name__ == '__main__':
+    # python attempts.py report [--min-attempts 20] [--top 20]  -> hardest questions first
+    import argparse
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    rep = sub.add_parser('report')
+    rep.add_argument('--min-attempts', type=int, default=20)
+    rep.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(ATTEMPTS_DB):
+        sys.exit(f'No attempts DB at {ATTEMPTS_DB}')
+    conn = sqlite3.connect(ATTEMPTS_DB)
+    rows = conn.execute('''
+        SELECT question_id, attempts, correct, 1.0 - CAST(correct AS REAL) / attempts AS difficulty
+        FROM question_stats WHERE attempts >= ?
+        ORDER BY difficulty DESC, attempts DESC LIMIT ?
+    ''', (args.min_attempts, args.top)).fetchall()
+    print(f"{'question':12} {'attempts':>9} {'correct':>8} {'wrong %':>8}")
+    for qid, n, c, difficulty in rows:
+        print(f'{qid:12} {n:9d} {c:8d} {difficulty * 100:7.1f}%')
@@ -0,0 +1,368 @@
+import argparse
+import importlib
+import json
+import os
+import sqlite3
+import sys
+import uuid
+
+import answer_key
+import datasource
+import schema
+
+# Bulk export/import of the questions table, streamed one record at a time so
+# memory stays flat whatever the bank size:
+#
+#   python bank.py export questions.ndjson [--category NAME|SLUG] [--set N] [--transform NAME ...]
+#   python bank.py import questions.ndjson [--batch 5000] [--replace] [--transform NAME ...]
+#
+# Files ending in .json are read/written as one JSON array (the old mcqs.json
+# dumps), anything else as NDJSON; '-' is stdin/stdout. A transform is a
+# function record -> record (or None to drop it): either a name from
+# TRANSFORMS or 'module:function' for a plugin outside this file.
+#
+# Without --db, export reads the published bank and import writes each record
+# to datasource.write_path(its category): mcqs.db, or the configured primary
+# and shards (never the promoted snapshot).
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 5000
+READ_CHUNK = 1 << 16
+COLUMNS = ('id', 'set_id', 'category', 'tag', 'description', 'question',
+           'image_url', 'options', 'correct', 'explanation')
+JSON_COLUMNS = ('options', 'correct')  # TEXT in SQLite, lists in the export
+
+
+# --- TRANSFORMS ---
+
+def fix_swapped_fields(record):
+    """
+    Extraction sometimes put the category in `tag` and vice versa; tags are
+    always SALESFORCE here. The mcqs.db equivalent is repair.py's swapped_fields.
+    """
+    tag = (record.get('tag') or '').strip()
+    category = (record.get('category') or '').strip()
+    if tag.upper() != 'SALESFORCE':
+        record['tag'], record['category'] = category, tag
+    if (record.get('tag') or '').upper() == 'SALESFORCE':
+        record['tag'] = 'SALESFORCE'
+    return record
+
+
+def strip_whitespace(record):
+    """Trims surrounding whitespace from every text field and option."""
+    for key, value in record.items():
+        if isinstance(value, str):
+            record[key] = value.strip()
+        elif key in JSON_COLUMNS and isinstance(value, list):
+            record[key] = [v.strip() if isinstance(v, str) else v for v in value]
+    return record
+
+
+TRANSFORMS = {
+    'fix_swapped_fields': fix_swapped_fields,
+    'strip_whitespace': strip_whitespace,
+}
+
+
+def load_transform(name):
+    if name in TRANSFORMS:
+        return TRANSFORMS[name]
+    module_name, sep, func_name = name.partition(':')
+    if not sep:
+        raise ValueError(f"unknown transform {name!r} (built in: {', '.join(TRANSFORMS)}; or module:function)")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def apply_transforms(records, transforms):
+    for record in records:
+        for transform in transforms:
+            record = transform(record)
+            if record is None:
+                break
+        else:
+            yield record
+
+
+# --- READING / WRITING FILES ---
+
+def _is_json_array(path):
+    return path.endswith('.json')
+
+
+def read_records(f, json_array):
+    """Yields dicts from an NDJSON stream or a JSON array, holding one record at a time."""
+    if not json_array:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                print(f'[bank] line {line_no} skipped: {e}', file=sys.stderr)
+        return
+
+    # Incremental array parse: raw_decode one element at a time from a sliding buffer
+    decoder = json.JSONDecoder()
+    buf, pos, eof = '', 0, False
+    expect = '['  # then 'first' (element or ']'), ',' (',' or ']'), 'value' (element)
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_CHUNK)
+        eof = not chunk
+        buf, pos = buf[pos:] + chunk, 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n':
+            pos += 1
+        if pos == len(buf):
+            if not eof:
+                fill()
+                continue
+            if expect == '[':
+                return  # empty file
+            raise ValueError('truncated JSON array (no closing "]")')
+        char = buf[pos]
+        if expect == '[':
+            if char != '[':
+                raise ValueError('expected a JSON array')
+            pos, expect = pos + 1, 'first'
+        elif expect in ('first', ',') and char == ']':
+            return
+        elif expect == ',':
+            if char != ',':
+                raise ValueError('expected "," or "]" between JSON array elements')
+            pos, expect = pos + 1, 'value'
+        else:
+            try:
+                record, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                if eof:
+                    raise
+                fill()  # element continues in the next chunk
+                continue
+            after = end
+            while after < len(buf) and buf[after] in ' \t\r\n':
+                after += 1
+            if not eof and (after == len(buf) or (after == end and buf[end] in '.eE+-0123456789')):
+                fill()  # only a following ',' or ']' proves a number was not cut at the chunk edge
+                continue
+            yield record
+            pos, expect = end, ','
+
+
+class RecordWriter:
+    """Writes records as NDJSON lines or as the elements of one JSON array."""
+
+    def __init__(self, f, json_array):
+        self.f, self.json_array, self.count = f, json_array, 0
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False)
+        if self.json_array:
+            self.f.write(('[\n  ' if self.count == 0 else ',\n  ') + line)
+        else:
+            self.f.write(line + '\n')
+        self.count += 1
+
+    def close(self):
+        if self.json_array:
+            self.f.write('\n]\n' if self.count else '[]\n')
+
+
+def _open(path, mode):
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode, encoding='utf-8', newline='\n' if 'w' in mode else None)
+
+
+# --- EXPORT ---
+
+def _resolve_category(conn, category):
+    """Category name or slug -> id (None if there is no such category)."""
+    row = conn.execute('SELECT id FROM categories WHERE name = ? OR slug = ?',
+                       (category, category.lower())).fetchone()
+    return row[0] if row else None
+
+
+def iter_questions(conn, category=None, set_id=None):
+    """Streams questions as export records, in (category, set, id) order."""
+    where, params = [], []
+    if category is not None:
+        where.append('category_id = ?')
+        params.append(_resolve_category(conn, category))
+    if set_id is not None:
+        where.append('set_id = ?')
+        params.append(set_id)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM questions"
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    sql += ' ORDER BY category_id, set_id, id'
+    for row in conn.execute(sql, params):  # the cursor fetches lazily
+        record = dict(zip(COLUMNS, row))
+        for key in JSON_COLUMNS:
+            record[key] = json.loads(record[key]) if record[key] else []
+        yield record
+
+
+def export(db_path, out_path, category=None, set_id=None, transforms=()):
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    out = _open(out_path, 'w')
+    try:
+        writer = RecordWriter(out, _is_json_array(out_path))
+        for record in apply_transforms(iter_questions(conn, category, set_id), transforms):
+            writer.write(record)
+        writer.close()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        conn.close()
+    return writer.count
+
+
+# --- IMPORT ---
+
+def _row(record, category_ids, conn):
+    """Export record -> questions row (with category_id resolved), or None if unusable."""
+    if not isinstance(record, dict) or not record.get('question'):
+        return None
+    options = record.get('options') or []
+    correct = record.get('correct') or []
+    if not isinstance(options, list) or not isinstance(correct, list):
+        return None
+    category = record.get('category')
+    category_id = None
+    if category:
+        category_id = category_ids.get(category)
+        if category_id is None:
+            category_id = category_ids[category] = schema.get_or_create_category(conn, category)
+    return (
+        str(record.get('id') or uuid.uuid4().hex[:8]), record.get('set_id'), category,
+        record.get('tag'), record.get('description'), record['question'], record.get('image_url') or '',
+        json.dumps(options), json.dumps(correct), record.get('explanation') or '', category_id,
+    )
+
+
+class _Target:
+    """One database being imported into: its connection, pending rows and category ids."""
+
+    def __init__(self, db_path):
+        self.conn = sqlite3.connect(db_path)
+        schema.migrate(self.conn)
+        self.batch, self.category_ids, self.touched = [], {}, set()
+
+
+def import_records(db_path, records, batch_size=BATCH_SIZE, replace=False, log=print):
+    """
+    Writes `records` in transactions of `batch_size` rows per database. With
+    db_path None each record goes to datasource.write_path(its category).
+    Existing ids are kept unless `replace`. category_sets and correct_idx are
+    filled in once at the end. Returns (written, skipped).
+    """
+    verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+    sql = (f"{verb} INTO questions ({', '.join(COLUMNS)}, category_id) "
+           f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})")
+    targets = {}
+    written = skipped = 0
+
+    def target(path):
+        if path not in targets:
+            datasource.check_writable(path)
+            targets[path] = _Target(path)
+        return targets[path]
+
+    def flush(t):
+        nonlocal written
+        before = t.conn.total_changes
+        with t.conn:
+            t.conn.executemany(sql, t.batch)
+        written += t.conn.total_changes - before
+        t.batch.clear()
+
+    try:
+        for record in records:
+            if not isinstance(record, dict):
+                skipped += 1
+                continue
+            t = target(db_path or datasource.write_path(record.get('category')))
+            row = _row(record, t.category_ids, t.conn)
+            if row is None:
+                skipped += 1
+                continue
+            t.batch.append(row)
+            t.touched.add((row[2], row[1]))
+            if len(t.batch) >= batch_size:
+                flush(t)
+                log(f'  {written} rows written...')
+        for path, t in targets.items():
+            if t.batch:
+                flush(t)
+            with t.conn:
+                # A replaced id may have moved sets: only then is the old set unknown
+                schema.refresh_category_sets(t.conn, None if replace else t.touched)
+                _, queued = answer_key.resolve_pending(t.conn)
+            if queued:
+                log(f'  {path}: {queued} questions have answers matching no option (python answer_key.py list)')
+    finally:
+        for t in targets.values():
+            t.conn.close()
+    return written, skipped
+
+
+def filtered(records, category=None, set_id=None):
+    for record in records:
+        if category is not None and category not in (record.get('category'),
+                                                     schema.slugify(record.get('category') or '')):
+            continue
+        if set_id is not None and record.get('set_id') != set_id:
+            continue
+        yield record
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='database file (default: export the published snapshot, '
+                                     'import into the configured sources)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name in ('export', 'import'):
+        cmd = sub.add_parser(name)
+        cmd.add_argument('file', help="NDJSON (or .json array); '-' for stdout/stdin")
+        cmd.add_argument('--category', help='category name or slug')
+        cmd.add_argument('--set', type=int, dest='set_id')
+        cmd.add_argument('--transform', action='append', default=[],
+                         help=f"{' | '.join(TRANSFORMS)} | module:function (repeatable, applied in order)")
+        if name == 'import':
+            cmd.add_argument('--batch', type=int, default=BATCH_SIZE, help='rows per transaction')
+            cmd.add_argument('--replace', action='store_true', help='overwrite questions with the same id')
+    args = parser.parse_args()
+    transforms = [load_transform(name) for name in args.transform]
+
+    if args.command == 'export':
+        db_path = args.db or datasource.current().snapshot
+        if not os.path.exists(db_path):
+            sys.exit(f'No database at {db_path}')
+        count = export(db_path, args.file, args.category, args.set_id, transforms)
+        print(f'Exported {count} questions', file=sys.stderr)
+    else:
+        if args.db:
+            try:
+                datasource.check_writable(args.db)
+            except ValueError as e:
+                sys.exit(str(e))
+        f = _open(args.file, 'r')
+        try:
+            # Transforms first, so a filter sees the repaired category
+            records = apply_transforms(read_records(f, _is_json_array(args.file)), transforms)
+            written, skipped = import_records(args.db, filtered(records, args.category, args.set_id),
+                                              args.batch, args.replace,
+                                              log=lambda msg: print(msg, file=sys.stderr))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        print(f'Imported {written} questions ({skipped} invalid records skipped)', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Sync gunicorn vs the ASGI mode (uvicorn + asgi.py) at high concurrency.
+
+    python bench/asgi_vs_wsgi.py [-c 1000] [-d 10] [--workers 4] [--out bench_results/asgi.json]
+
+Both servers get the same number of processes. Gunicorn uses sync workers
+(its default, one request at a time per worker); uvicorn runs asgi.py with
+ASGI_THREADS threads per process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import loadgen  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = ['/mcqs/salesforce-agentforce/set-1', '/api/load-sets?page=2']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, workers):
+    if kind == 'gunicorn-sync':
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--backlog', '2048',
+               '-b', f'127.0.0.1:{port}', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--workers', str(workers),
+               '--backlog', '2048', '--no-access-log', '--host', '127.0.0.1', '--port', str(port)]
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return proc
+        except Exception:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{kind} did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--concurrency', type=int, default=1000)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    # 1k sockets on the client side alone needs a raised fd limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 8192)), hard))
+
+    results = []
+    for kind in ('gunicorn-sync', 'uvicorn-asgi'):
+        port = free_port()
+        proc = start_server(kind, port, args.workers)
+        try:
+            for path in PATHS:
+                r = asyncio.run(loadgen.run(f'http://127.0.0.1:{port}{path}',
+                                            args.concurrency, args.duration))
+                r['server'] = kind
+                results.append(r)
+                print(f"{kind:14s} {path:38s} rps {r['rps']:8.1f}  p50 {r['p50_ms']:8.1f}ms  "
+                      f"p95 {r['p95_ms']:8.1f}ms  p99 {r['p99_ms']:8.1f}ms  "
+                      f"errors {r['http_errors'] + r['conn_errors']}")
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            proc.wait(timeout=30)
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Diffs two result files written by bench/micro.py or bench/http_routes.py.
+
+    python bench/compare.py bench_results/http-OLD.json bench_results/http-NEW.json [--threshold 10]
+
+Prints the % change per metric and exits with status 1 if anything regressed
+by more than --threshold percent (handy in CI).
+"""
+import argparse
+import json
+import sys
+
+# metric -> True if higher is better
+METRICS = {
+    'micro': {'median_ms': False},
+    'http': {'rps': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False},
+}
+KEYS = {
+    'micro': ('rows', 'case', 'mode'),
+    'http': ('route',),
+}
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=10.0, help='regression threshold in %%')
+    args = parser.parse_args()
+
+    old, new = load(args.old), load(args.new)
+    suite = new['suite']
+    if old['suite'] != suite:
+        sys.exit(f"Cannot compare suite '{old['suite']}' with '{suite}'")
+
+    key_fields = KEYS[suite]
+    old_by_key = {tuple(r[k] for k in key_fields): r for r in old['results']}
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']}  ({suite})")
+
+    regressions = 0
+    for r in new['results']:
+        key = tuple(r[k] for k in key_fields)
+        base = old_by_key.get(key)
+        if base is None:
+            continue
+        for metric, higher_is_better in METRICS[suite].items():
+            a, b = base[metric], r[metric]
+            if not a:
+                continue
+            change = (b - a) / a * 100
+            worse = -change if higher_is_better else change
+            flag = ''
+            if worse > args.threshold:
+                flag = '  << REGRESSION'
+                regressions += 1
+            print(f"  {' / '.join(map(str, key)):60s} {metric:10s} {a:12.3f} -> {b:12.3f}  {change:+7.1f}%{flag}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
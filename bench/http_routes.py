@@ -0,0 +1,94 @@
+"""
+HTTP load against the public routes of a locally started server.
+
+    python bench/http_routes.py [-c 50] [-d 10] [--workers 2] [--server gunicorn|uvicorn] [--out FILE]
+
+Records p50/p95/p99 latency and RPS per route into bench_results/ (commit-stamped),
+so two runs can be diffed with bench/compare.py.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import common  # noqa: E402
+import loadgen  # noqa: E402
+
+ROUTES = [
+    '/',
+    '/practice-mcqs',
+    '/api/load-sets?page=2',
+    '/mcqs/salesforce-agentforce/set-1',
+    '/sitemap.xml',
+]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(server, port, workers):
+    if server == 'gunicorn':
+        cmd = [sys.executable, '-m', 'gunicorn', '-w', str(workers), '--backlog', '2048',
+               '-b', f'127.0.0.1:{port}', 'app:app']
+    else:
+        cmd = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--workers', str(workers),
+               '--no-access-log', '--host', '127.0.0.1', '--port', str(port)]
+    proc = subprocess.Popen(cmd, cwd=common.ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return proc
+        except Exception:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f'{server} did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn'), default='gunicorn')
+    parser.add_argument('--gzip', action='store_true', help='send Accept-Encoding: gzip, br')
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, 8192)), hard))
+    headers = {'Accept-Encoding': 'gzip, br'} if args.gzip else None
+
+    port = free_port()
+    proc = start_server(args.server, port, args.workers)
+    results = []
+    try:
+        for route in ROUTES:
+            r = asyncio.run(loadgen.run(f'http://127.0.0.1:{port}{route}',
+                                        args.concurrency, args.duration, headers))
+            r.update(route=route, server=args.server, workers=args.workers)
+            results.append(r)
+            print(f"{route:38s} rps {r['rps']:8.1f}  p50 {r['p50_ms']:7.2f}ms  "
+                  f"p95 {r['p95_ms']:7.2f}ms  p99 {r['p99_ms']:7.2f}ms  "
+                  f"errors {r['http_errors'] + r['conn_errors']}")
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+
+    common.write_results('http', results, args.out)
+
+
+if __name__ == '__main__':
+    main()
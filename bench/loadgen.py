@@ -0,0 +1,132 @@
+"""
+Minimal HTTP/1.1 load generator (asyncio, no third-party deps).
+
+Opens N concurrent connections, each sending requests back-to-back for a
+fixed duration. Keeps connections alive when the server allows it and
+reconnects when the server closes them (gunicorn sync workers always do).
+    python bench/loadgen.py http://127.0.0.1:8000/api/load-sets -c 1000 -d 10
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def _read_response(reader):
+    """Reads one response. Returns (status, keep_alive)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            k, v = line.split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+    if status in (204, 304):
+        pass  # never has a body
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.read()
+        return status, False
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _worker(host, port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors['http'] += 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            errors['conn'] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def run(url, concurrency=100, duration=10.0, headers=None, body=None):
+    """Runs the load and returns a summary dict (latencies in ms). A `body` makes it a POST."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = dict(headers or {})
+    method = 'GET'
+    if body is not None:
+        method = 'POST'
+        headers.setdefault('Content-Type', 'application/json')
+        headers['Content-Length'] = str(len(body))
+    extra = ''.join(f'{k}: {v}\r\n' for k, v in headers.items())
+    request = f'{method} {path} HTTP/1.1\r\nHost: {host}:{port}\r\n{extra}\r\n'.encode('latin-1') + (body or b'')
+
+    latencies, errors = [], {'http': 0, 'conn': 0}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, request, deadline, latencies, errors) for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'http_errors': errors['http'],
+        'conn_errors': errors['conn'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url')
+    parser.add_argument('-c', '--concurrency', type=int, default=100)
+    parser.add_argument('-d', '--duration', type=float, default=10.0)
+    parser.add_argument('-H', '--header', action='append', default=[], help='"Name: value"')
+    parser.add_argument('--body', default=None, help='POST this body (prefix with @ to read a file)')
+    args = parser.parse_args()
+    headers = dict((k, v.strip()) for k, v in (h.split(':', 1) for h in args.header))
+    body = args.body
+    if body is not None:
+        if body.startswith('@'):
+            with open(body[1:], 'rb') as f:
+                body = f.read()
+        else:
+            body = body.encode()
+    print(json.dumps(asyncio.run(run(args.url, args.concurrency, args.duration, headers, body)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
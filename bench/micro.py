@@ -0,0 +1,93 @@
+"""
+Micro-benchmarks for the utils data layer on synthetic data.
+
+    python bench/micro.py [--sizes 1000 10000 100000 1000000] [--repeat 20] [--out FILE]
+
+For each size a fresh mcqs.db / articles.json is generated in a temp dir and
+utils is pointed at it. "cold" clears utils' in-process caches before every
+call, "warm" measures the steady state a running worker sees.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, os.path.dirname(HERE))
+
+import common  # noqa: E402
+import synthetic  # noqa: E402
+import utils  # noqa: E402
+
+
+def _reset_caches():
+    utils._cache.clear()
+    utils.reset_connections()
+
+
+def measure(fn, repeat, cold):
+    samples = []
+    for _ in range(repeat):
+        if cold:
+            _reset_caches()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'min_ms': round(min(samples), 4),
+        'median_ms': round(statistics.median(samples), 4),
+        'max_ms': round(max(samples), 4),
+    }
+
+
+def bench_size(rows, repeat, workdir):
+    db_path = os.path.join(workdir, f'mcqs_{rows}.db')
+    articles_path = os.path.join(workdir, f'articles_{rows}.json')
+    t0 = time.perf_counter()
+    categories = synthetic.generate_db(db_path, rows)
+    synthetic.generate_articles(articles_path, max(10, rows // 100))
+    print(f"\n== {rows} rows ({len(categories)} categories), generated in {time.perf_counter() - t0:.1f}s")
+
+    utils.DB_NAME, utils.ARTICLES_FILE = db_path, articles_path
+    _reset_caches()
+
+    mid_cat = categories[len(categories) // 2].replace(' ', '-').lower()
+    cases = {
+        'get_paginated_mcq_sets(page=1)': lambda: utils.get_paginated_mcq_sets(page=1, per_page=6),
+        'get_paginated_mcq_sets(page=last)': lambda: utils.get_paginated_mcq_sets(
+            page=max(1, rows // synthetic.QUESTIONS_PER_SET // 6), per_page=6),
+        'get_mcq_set_data(mid category, set 1)': lambda: utils.get_mcq_set_data(utils.resolve_category(mid_cat), 1),
+        'get_all_articles()': utils.get_all_articles,
+        'get_all_sitemap_urls()': utils.get_all_sitemap_urls,
+    }
+
+    results = []
+    for name, fn in cases.items():
+        for mode in ('cold', 'warm'):
+            fn()  # make sure warm really is warm and cold excludes import-time costs
+            stats = measure(fn, repeat, cold=(mode == 'cold'))
+            results.append({'rows': rows, 'case': name, 'mode': mode, **stats})
+            print(f"  {name:40s} {mode:4s}  median {stats['median_ms']:10.3f}ms  min {stats['min_ms']:10.3f}ms")
+    _reset_caches()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            results.extend(bench_size(rows, args.repeat, workdir))
+    common.write_results('micro', results, args.out)
+
+
+if __name__ == '__main__':
+    main()
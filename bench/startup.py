@@ -0,0 +1,80 @@
+"""
+Startup benchmark: import time, warmup time and first-request latency.
+
+Each scenario runs in a fresh interpreter so nothing is shared between runs.
+    python bench/startup.py [--runs 5] [--out bench_results/startup.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line.
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+if sys.argv[1] == "warm":
+    app.warmup()
+t2 = time.perf_counter()
+client = app.app.test_client()
+first = {}
+for url in sys.argv[2:]:
+    s = time.perf_counter()
+    client.get(url)
+    first[url] = (time.perf_counter() - s) * 1000
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "warmup_ms": (t2 - t1) * 1000, "first_request_ms": first}))
+'''
+
+URLS = ['/', '/practice-mcqs', '/mcqs/salesforce-agentforce/set-1', '/quick-text-in-salesforce']
+
+SCENARIOS = {
+    # name: (clear bytecode cache before each run?, call warmup()?)
+    'cold_no_warmup': (True, 'cold'),
+    'cold_warmup': (True, 'warm'),
+    'bytecode_cached_no_warmup': (False, 'cold'),
+    'bytecode_cached_warmup': (False, 'warm'),
+}
+
+def run_once(clear_cache, mode):
+    if clear_cache:
+        shutil.rmtree(os.path.join(ROOT, '.jinja_cache'), ignore_errors=True)
+    out = subprocess.run([sys.executable, '-c', PROBE, mode] + URLS,
+                         cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    results = {}
+    for name, (clear_cache, mode) in SCENARIOS.items():
+        if not clear_cache:
+            run_once(False, 'warm')  # make sure the bytecode cache is populated
+        runs = [run_once(clear_cache, mode) for _ in range(args.runs)]
+        results[name] = {
+            'import_ms': statistics.median(r['import_ms'] for r in runs),
+            'warmup_ms': statistics.median(r['warmup_ms'] for r in runs),
+            'first_request_ms': {
+                url: statistics.median(r['first_request_ms'][url] for r in runs) for url in URLS
+            },
+        }
+        print(f"{name:28s} import {results[name]['import_ms']:7.1f}ms  "
+              f"warmup {results[name]['warmup_ms']:7.1f}ms  "
+              + '  '.join(f"{u} {v:6.1f}ms" for u, v in results[name]['first_request_ms'].items()))
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Synthetic data generators: an mcqs.db and an articles.json of any size.
+
+    python bench/synthetic.py --rows 100000 --db /tmp/mcqs.db --articles /tmp/articles.json
+
+The questions table matches the schema the builder/extractor create;
+rows are grouped 20 per set, as the extractor does.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import schema  # noqa: E402
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS questions (
+        id TEXT PRIMARY KEY,
+        set_id INTEGER,
+        category TEXT,
+        tag TEXT,
+        description TEXT,
+        question TEXT,
+        image_url TEXT,
+        options TEXT,
+        correct TEXT,
+        explanation TEXT
+    )
+'''
+QUESTIONS_PER_SET = 20
+WORDS = ('apex trigger flow record object field layout report dashboard permission '
+         'profile role sharing rule batch queue future callout governor limit agent').split()
+
+
+def _sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def generate_db(path, rows, categories=None, seed=1, batch=10000):
+    """Creates `path` with `rows` questions spread over `categories` categories."""
+    rng = random.Random(seed)
+    if categories is None:
+        categories = max(1, min(200, rows // 2000))
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute(SCHEMA)
+
+    cat_names = [f'Synthetic Category {i}' for i in range(categories)]
+    per_cat = -(-rows // categories)
+    buf = []
+    for i in range(rows):
+        cat = cat_names[i // per_cat]
+        set_id = (i % per_cat) // QUESTIONS_PER_SET + 1
+        options = [_sentence(rng, 5) for _ in range(4)]
+        buf.append((
+            f'q{i:08d}', set_id, cat, 'SALESFORCE', 'Synthetic practice set.',
+            _sentence(rng, 18) + '?', '', json.dumps(options), json.dumps([options[rng.randrange(4)]]),
+            _sentence(rng, 60) + '.',
+        ))
+        if len(buf) >= batch:
+            conn.executemany('INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', buf)
+            buf.clear()
+    if buf:
+        conn.executemany('INSERT INTO questions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', buf)
+    conn.commit()
+    schema.migrate(conn)  # categories + category_id, as the site expects
+    conn.close()
+    return cat_names
+
+
+def generate_articles(path, count, seed=1):
+    """Writes an articles.json with `count` entries in the builder's format."""
+    rng = random.Random(seed)
+    articles = [{
+        'title': _sentence(rng, 6),
+        'slug': f'synthetic-article-{i}',
+        'video_id': '',
+        'placeholder_text': '',
+        'date': 'Dec 4, 2025',
+        'category': 'SALESFORCE',
+        'description': _sentence(rng, 20),
+    } for i in range(count)]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(articles, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--articles-count', type=int, default=None)
+    parser.add_argument('--db', default='synthetic_mcqs.db')
+    parser.add_argument('--articles', default='synthetic_articles.json')
+    args = parser.parse_args()
+    generate_db(args.db, args.rows)
+    generate_articles(args.articles, args.articles_count or max(10, args.rows // 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Per-worker memory under gunicorn, with and without preload_app.
+
+Starts gunicorn with 1, 4 and 16 workers, sends some traffic so every worker
+has loaded its content, then reads /proc/<pid>/smaps_rollup for each worker.
+PSS (proportional set size) is the honest number: shared copy-on-write pages
+are split between the processes that share them.
+    python bench/worker_memory.py [--workers 1 4 16] [--out bench_results/memory.json]
+Linux only.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URLS = ['/', '/practice-mcqs', '/api/load-sets?page=2', '/mcqs/salesforce-agentforce/set-1', '/sitemap.xml']
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def smaps(pid):
+    """Returns {'rss': kB, 'pss': kB, 'private': kB} for one process."""
+    out = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:', 'Private_Clean:', 'Private_Dirty:'):
+                out[parts[0][:-1]] = int(parts[1])
+    return {'rss': out['Rss'], 'pss': out['Pss'],
+            'private': out['Private_Clean'] + out['Private_Dirty']}
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(p) for p in f.read().split()]
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+def measure(workers, preload):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD='1' if preload else '0')
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', 'app:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        for _ in range(workers * 10):
+            for url in URLS:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}{url}').read()
+        time.sleep(0.5)
+        stats = [smaps(pid) for pid in children(proc.pid)]
+        master = smaps(proc.pid)
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=30)
+    n = len(stats)
+    return {
+        'workers': n,
+        'worker_rss_kb': sum(s['rss'] for s in stats) // n,
+        'worker_pss_kb': sum(s['pss'] for s in stats) // n,
+        'worker_private_kb': sum(s['private'] for s in stats) // n,
+        'total_pss_kb': sum(s['pss'] for s in stats) + master['pss'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    results = []
+    for preload in (False, True):
+        for n in args.workers:
+            r = measure(n, preload)
+            r['preload'] = preload
+            results.append(r)
+            print(f"preload={str(preload):5s} workers={n:2d}  per-worker RSS {r['worker_rss_kb']:6d}kB  "
+                  f"PSS {r['worker_pss_kb']:6d}kB  private {r['worker_private_kb']:6d}kB  "
+                  f"total PSS {r['total_pss_kb']:7d}kB")
+
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
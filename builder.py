@@ -3,15 +3,21 @@ from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
 import json
 import os
 import re
-import shutil
 import uuid
 import sqlite3 # <--- ADDED for Database Support
 from datetime import datetime
 
+import answer_key
+import article_store
+import datasource
+import images
+import schema
+
 # --- CONFIGURATION ---
 ARTICLES_DB = 'articles.json'
-MCQS_DB = 'mcqs.db' # <--- UPDATED to Database File
 TEMPLATE_DIR = os.path.join('templates', 'articles')
+BODY_START = '{% block article_body %}'
+BODY_END = '{% endblock %}'
 
 # --- TOOLTIP CLASS ---
 class CreateToolTip(object):
@@ -121,6 +127,12 @@ class ArticleAutomator:
         style.configure("Treeview", rowheight=30, font=("Segoe UI", 10))
         style.configure("Treeview.Heading", font=("Segoe UI", 10, "bold"))
 
+        # articles.json + append-only change log (publishing appends one line)
+        self.store = article_store.open_store(ARTICLES_DB)
+        # Which article template uses which image (kept current on publish/delete)
+        self.image_refs = images.RefIndex.load()
+        self.image_refs.verify()
+
         # --- TABS ---
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill=tk.BOTH, expand=True)
@@ -383,6 +395,9 @@ class ArticleAutomator:
         
         tk.Button(top_bar, text="✏️ Edit", command=self.edit_mcq, bg=self.BTN_PRIMARY, fg="white", relief="flat", padx=15).pack(side=tk.LEFT, padx=5)
         tk.Button(top_bar, text="🗑️ Delete", command=self.delete_mcq, bg=self.BTN_DANGER, fg="white", relief="flat", padx=15).pack(side=tk.LEFT, padx=5)
+        if datasource.current().split:
+            # Saves go to the primary/shard files; the site only sees them once promoted
+            tk.Button(top_bar, text="🚀 Publish MCQs", command=self.publish_mcqs, bg=self.BTN_SUCCESS, fg="white", relief="flat", padx=15).pack(side=tk.LEFT, padx=5)
 
         # Treeview
         columns = ("Set", "Tag", "Title", "Question")
@@ -469,15 +484,16 @@ class ArticleAutomator:
         tk.Button(popup, text="🔗 Paste Image URL", command=from_url, **btn_style).pack(fill=tk.X, padx=20, pady=5)
 
     def _insert_image_file(self):
-        file_path = filedialog.askopenfilename(title="Select Image", filetypes=[("Image Files", "*.png *.jpg *.jpeg *.gif *.webp")])
+        file_path = filedialog.askopenfilename(title="Select Image", filetypes=[("Image Files", "*.png *.jpg *.jpeg *.gif *.webp *.avif")])
         if not file_path: return
-        dest_dir = os.path.join('static', 'images')
-        os.makedirs(dest_dir, exist_ok=True)
-        filename = os.path.basename(file_path)
-        dest_path = os.path.join(dest_dir, filename)
-        try: shutil.copy2(file_path, dest_path)
-        except: pass
-        self._insert_image_html(f"{{{{ url_for('static', filename='images/{filename}') }}}}")
+        # Resized AVIF/WebP variants + fallback under static/images/opt/ (same file twice = same copy)
+        try: entry = images.ingest(file_path)
+        except Exception as e:
+            messagebox.showerror("Image Error", f"Could not process image: {e}")
+            return
+        caption = simpledialog.askstring("Image Caption", "Enter caption (optional):") or ""
+        picture = images.picture_html(entry, caption, lambda name: f"{{{{ url_for('static', filename='images/opt/{name}') }}}}")
+        self.editor.insert(tk.INSERT, f'\n<figure>\n{picture}\n    <figcaption class="img-caption">{caption}</figcaption>\n</figure>\n')
 
     def _insert_image_url(self):
         url = simpledialog.askstring("Image URL", "Paste the full image URL:")
@@ -485,7 +501,7 @@ class ArticleAutomator:
 
     def _insert_image_html(self, src):
         caption = simpledialog.askstring("Image Caption", "Enter caption (optional):") or ""
-        html = f'\n<figure>\n    <img src="{src}" class="article-img" alt="{caption}">\n    <figcaption class="img-caption">{caption}</figcaption>\n</figure>\n'
+        html = f'\n<figure>\n    <img src="{src}" class="article-img" alt="{caption}" loading="lazy" decoding="async">\n    <figcaption class="img-caption">{caption}</figcaption>\n</figure>\n'
         self.editor.insert(tk.INSERT, html)
 
     def wrap_alignment(self, align):
@@ -500,11 +516,26 @@ class ArticleAutomator:
     # --- DATA MANAGEMENT (ARTICLES) ---
 
     def load_articles_list(self):
+        # Full rebuild: startup and the Refresh button (picks up edits from other processes)
+        self.store.refresh()
         for row in self.tree.get_children(): self.tree.delete(row)
-        if os.path.exists(ARTICLES_DB):
-            with open(ARTICLES_DB, 'r') as f:
-                articles = json.load(f)
-                for art in articles: self.tree.insert("", tk.END, values=(art.get('date'), art.get('title'), art.get('slug')))
+        for art in self.store.records():
+            self.tree.insert("", tk.END, iid=art['slug'], values=(art.get('date'), art.get('title'), art.get('slug')))
+
+    def _show_article_row(self, art):
+        # In-place update: edited rows keep their position, new ones go on top
+        values = (art.get('date'), art.get('title'), art.get('slug'))
+        if self.tree.exists(art['slug']):
+            self.tree.item(art['slug'], values=values)
+        else:
+            self.tree.insert("", 0, iid=art['slug'], values=values)
+
+    def _save_articles(self, change):
+        # One appended log line per change; fold into articles.json once the log is long
+        self.store.refresh()  # another builder may have appended since
+        change()
+        if self.store.log_entries >= article_store.COMPACT_AT:
+            self.store.compact()
 
     def clear_form(self):
         self.var_title.set("")
@@ -521,10 +552,8 @@ class ArticleAutomator:
     def edit_selected(self):
         sel = self.tree.selection()
         if not sel: return
-        slug = self.tree.item(sel[0])['values'][2]
-        with open(ARTICLES_DB, 'r') as f:
-            articles = json.load(f)
-            article = next((a for a in articles if a['slug'] == slug), None)
+        slug = sel[0]
+        article = self.store.get(slug)
         if not article: return
         self.clear_form()
         self.var_title.set(article['title'])
@@ -537,43 +566,36 @@ class ArticleAutomator:
         if os.path.exists(html_path):
             with open(html_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-                match = re.search(r'{% block article_body %}(.*?){% endblock %}', content, re.DOTALL)
-                if match:
-                    self.editor.delete("1.0", tk.END)
-                    self.editor.insert("1.0", match.group(1).strip())
+            # The body is the last block publish_article writes: slice between the markers
+            start = content.find(BODY_START)
+            end = content.rfind(BODY_END)
+            if start >= 0 and end > start:
+                self.editor.delete("1.0", tk.END)
+                self.editor.insert("1.0", content[start + len(BODY_START):end].strip())
         self.notebook.select(self.tab_editor)
 
     def delete_selected(self):
         sel = self.tree.selection()
         if not sel: return
-        item = self.tree.item(sel[0])['values']
-        slug, title = item[2], item[1]
+        slug = sel[0]
+        title = self.tree.item(slug)['values'][1]
         if not messagebox.askyesno("Confirm", f"Delete '{title}'?"): return
         
-        # 1. Update JSON
-        if os.path.exists(ARTICLES_DB):
-            with open(ARTICLES_DB, 'r') as f: articles = json.load(f)
-            articles = [a for a in articles if a['slug'] != slug]
-            with open(ARTICLES_DB, 'w') as f: json.dump(articles, f, indent=2)
+        # 1. Update the article store (the site drops just this slug)
+        if self.store.get(slug):
+            self._save_articles(lambda: self.store.delete(slug))
         
         # 2. Delete HTML & Images
         html_path = os.path.join(TEMPLATE_DIR, f"{slug}.html")
         if os.path.exists(html_path):
             try:
-                with open(html_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                images = re.findall(r"filename='images/([^']+)'", content)
-                for img in images:
-                    img_path = os.path.join('static', 'images', img)
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-
                 os.remove(html_path)
+                # Only images no other template references (uploads are shared by hash)
+                images.release(self.image_refs.drop(html_path), self.image_refs.referenced())
             except Exception as e:
                 messagebox.showerror("Error", f"Could not delete file: {e}")
         
-        self.load_articles_list()
+        self.tree.delete(slug)
         messagebox.showinfo("Deleted", "Article removed successfully.")
 
     def publish_article(self):
@@ -590,45 +612,48 @@ class ArticleAutomator:
             "category": self.var_category.get(),
             "description": self.txt_desc.get("1.0", tk.END).strip()
         }
-        if not os.path.exists(ARTICLES_DB): articles = []
-        else:
-            with open(ARTICLES_DB, 'r') as f: articles = json.load(f)
-        idx = next((i for i, item in enumerate(articles) if item["slug"] == slug), -1)
-        if idx >= 0: articles[idx] = data
-        else: articles.insert(0, data)
-        with open(ARTICLES_DB, 'w') as f: json.dump(articles, f, indent=2)
-        
         html_content = f"""{{% extends 'article_layout.html' %}}
 {{% block title %}}{data['title']} - CodeWme{{% endblock %}}
 {{% block meta_description %}}{data['description']}{{% endblock %}}
 {{% block article_header %}}{data['title']}{{% endblock %}}
 {{% block video_id %}}{data['video_id']}{{% endblock %}}
-{{% block article_body %}}
+{BODY_START}
 {self.editor.get("1.0", tk.END)}
-{{% endblock %}}"""
+{BODY_END}"""
         os.makedirs(TEMPLATE_DIR, exist_ok=True)
-        with open(os.path.join(TEMPLATE_DIR, f"{slug}.html"), 'w', encoding='utf-8') as f: f.write(html_content)
+        html_path = os.path.join(TEMPLATE_DIR, f"{slug}.html")
+        with open(html_path, 'w', encoding='utf-8') as f: f.write(html_content)
+        # Images this edit removed from the article go too, unless used elsewhere
+        dropped = self.image_refs.update(html_path)
+        if dropped:
+            images.release(dropped, self.image_refs.referenced())
+        # Template first, then the log entry: the site re-renders once it sees the entry
+        self._save_articles(lambda: self.store.put(data))
+        self._show_article_row(data)
         messagebox.showinfo("Success", f"Article Saved: {slug}")
-        self.load_articles_list()
 
     # ==========================================
     # LOGIC METHODS (MCQ) - UPDATED FOR DB
     # ==========================================
     def load_mcq_list(self):
         for row in self.tree_mcq.get_children(): self.tree_mcq.delete(row)
-        if not os.path.exists(MCQS_DB): return
-        
-        # --- DB CHANGE: Read from SQLite ---
-        try:
-            conn = sqlite3.connect(MCQS_DB)
-            conn.row_factory = sqlite3.Row
-            # Fetch all questions sorted by category and set
-            cursor = conn.execute("SELECT id, set_id, category, tag, question FROM questions ORDER BY category, set_id")
-            for q in cursor:
-                self.tree_mcq.insert("", tk.END, iid=q['id'], values=(q['set_id'], q['tag'], q['category'], q['question']))
-            conn.close()
-        except Exception as e:
-            print(f"Error loading MCQs: {e}")
+        self.mcq_sources = {}  # question id -> database file it lives in
+
+        # --- DB CHANGE: Read from SQLite (every primary/shard file, see datasource.py) ---
+        for path, _ in datasource.current().sources():
+            if not os.path.exists(path): continue
+            try:
+                conn = sqlite3.connect(path)
+                conn.row_factory = sqlite3.Row
+                # Fetch all questions sorted by category and set
+                cursor = conn.execute("SELECT id, set_id, category, tag, question FROM questions ORDER BY category, set_id")
+                for q in cursor:
+                    if q['id'] in self.mcq_sources: continue
+                    self.mcq_sources[q['id']] = path
+                    self.tree_mcq.insert("", tk.END, iid=q['id'], values=(q['set_id'], q['tag'], q['category'], q['question']))
+                conn.close()
+            except Exception as e:
+                print(f"Error loading MCQs from {path}: {e}")
 
     # Only resets specific fields (keeps Category, Tag, Set & Description)
     def clear_question_fields_only(self):
@@ -690,8 +715,10 @@ class ArticleAutomator:
             options_json = json.dumps(options)
             correct_json = json.dumps(correct_list)
             
-            conn = sqlite3.connect(MCQS_DB)
+            target = datasource.write_path(current_cat)
+            conn = datasource.connect_source(target)  # migrated: categories table + triggers that fill category_id
             cursor = conn.cursor()
+            touched = {(current_cat, current_set), schema.set_of(conn, q_id)} - {None}
             
             # Insert or Replace the question
             cursor.execute('''
@@ -718,13 +745,21 @@ class ArticleAutomator:
                 WHERE set_id = ? AND category = ?
             ''', (current_tag, current_desc, current_set, current_cat))
             
+            schema.refresh_category_sets(conn, touched)  # browse pages read this aggregate
+            answer_key.resolve_pending(conn)     # correct -> option indices for the page
             conn.commit()
             conn.close()
 
+            # Moved to a category routed to another file: drop the old copy there
+            previous = self.mcq_sources.get(q_id)
+            if previous and previous != target:
+                self._delete_mcq_from(previous, q_id)
+
             # 5. UI Updates
             self.load_mcq_list()
             timestamp = datetime.now().strftime("%H:%M:%S")
-            self.lbl_mcq_status.config(text=f"✅ Saved to DB! ({timestamp})", fg=self.BTN_SUCCESS)
+            where = f" {target}, publish to go live" if datasource.current().split else " DB!"
+            self.lbl_mcq_status.config(text=f"✅ Saved to{where} ({timestamp})", fg=self.BTN_SUCCESS)
             self.clear_question_fields_only()
             self.txt_mcq_question.focus_set()
             
@@ -738,7 +773,7 @@ class ArticleAutomator:
 
         # --- DB CHANGE: Read single row from SQLite ---
         try:
-            conn = sqlite3.connect(MCQS_DB)
+            conn = sqlite3.connect(self.mcq_sources.get(q_id, datasource.current().primary))
             conn.row_factory = sqlite3.Row
             found = conn.execute("SELECT * FROM questions WHERE id = ?", (q_id,)).fetchone()
             conn.close()
@@ -761,11 +796,13 @@ class ArticleAutomator:
             for i, txt in enumerate(opts):
                 if i < 5: self.mcq_opts[i].set(txt)
             
-            correct_data = json.loads(found['correct'])
-            if correct_data:
-                for i, txt in enumerate(opts):
-                    if txt in correct_data:
-                        self.mcq_var_correct_flags[i].set(True)
+            # Option indices resolved on save (answer_key.py), so drifted answer text still ticks the right box
+            if 'correct_idx' in found.keys() and found['correct_idx'] is not None:
+                correct_idx = json.loads(found['correct_idx'])
+            else:
+                correct_idx = answer_key.resolve(opts, answer_key.json_field(found['correct']))[0]
+            for i in correct_idx:
+                if i < 5: self.mcq_var_correct_flags[i].set(True)
                 
             self.lbl_mcq_status.config(text="Editing Question...", fg="blue")
             
@@ -781,17 +818,30 @@ class ArticleAutomator:
 
         # --- DB CHANGE: Delete from SQLite ---
         try:
-            conn = sqlite3.connect(MCQS_DB)
-            conn.execute("DELETE FROM questions WHERE id = ?", (q_id,))
-            conn.commit()
-            conn.close()
-                
+            self._delete_mcq_from(self.mcq_sources.get(q_id, datasource.current().primary), q_id)
             self.load_mcq_list()
             self.clear_question_fields_only()
             self.lbl_mcq_status.config(text="Question Deleted from DB.", fg="red")
         except Exception as e:
             messagebox.showerror("Database Error", f"Could not delete question: {e}")
 
+    def _delete_mcq_from(self, path, q_id):
+        conn = datasource.connect_source(path)
+        touched = {schema.set_of(conn, q_id)} - {None}
+        conn.execute("DELETE FROM questions WHERE id = ?", (q_id,))
+        schema.refresh_category_sets(conn, touched)
+        conn.commit()
+        conn.close()
+
+    def publish_mcqs(self):
+        try:
+            results = datasource.promote(log=print)
+        except Exception as e:
+            messagebox.showerror("Publish Error", f"Could not publish MCQs: {e}")
+            return
+        total = sum(copied for copied, _ in results.values())
+        self.lbl_mcq_status.config(text=f"🚀 Published {total} questions to the site.", fg=self.BTN_SUCCESS)
+
 if __name__ == "__main__":
     root = tk.Tk()
     app = ArticleAutomator(root)
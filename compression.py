@@ -0,0 +1,225 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
+
+# --- OPTIONAL: BROTLI ---
+try:
+    import brotli
+except ModuleNotFoundError:
+    brotli = None
+
+# --- CONFIGURATION ---
+MIN_SIZE = 500            # Bytes. Smaller bodies are not worth the CPU/headers.
+CACHE_ENTRIES = 512       # Compressed bodies kept per worker (LRU)
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5        # Dynamic responses; static files are built at quality 11
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/json', 'application/xml',
+    'application/javascript', 'image/svg+xml',
+)
+IMMUTABLE_PREFIXES = ('dist/', 'vendor/')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+
+def negotiate(accept_encoding):
+    """Picks 'br', 'gzip' or None from an Accept-Encoding header."""
+    accepted = parse_accept_header(accept_encoding or '')
+    if brotli and accepted['br'] > 0:
+        return 'br'
+    if accepted['gzip'] > 0:
+        return 'gzip'
+    return None
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _add_vary(headers, field):
+    """
+    Merges `field` into the response's Vary header(s) instead of replacing
+    them, so e.g. Flask's "Vary: Cookie" on session responses survives.
+    """
+    values = []
+    for k, v in headers:
+        if k.lower() == 'vary':
+            values += [f.strip() for f in v.split(',') if f.strip()]
+    if '*' not in values and field.lower() not in (f.lower() for f in values):
+        values.append(field)
+    return [(k, v) for k, v in headers if k.lower() != 'vary'] + [('Vary', ', '.join(values))]
+
+
+def _etag_with_suffix(headers, encoding):
+    """
+    Gives the compressed representation its own validator ("abc" -> "abc-br"),
+    so caches never treat the br, gzip and identity bodies as the same entity.
+    """
+    return [(k, v[:-1] + f'-{encoding}"' if k.lower() == 'etag' and v.endswith('"') else v)
+            for k, v in headers]
+
+def _strip_etag_suffix(if_none_match, encoding):
+    """If-None-Match with our -<encoding> suffix removed, or None if no tag had it."""
+    suffix = f'-{encoding}"'
+    tags = [t.strip() for t in if_none_match.split(',')]
+    if not any(t.endswith(suffix) for t in tags):
+        return None
+    return ', '.join(t[:-len(suffix)] + '"' if t.endswith(suffix) else t for t in tags)
+
+
+class CompressionMiddleware:
+    """
+    Negotiates br/gzip for every response.
+    - /static/ files with a prebuilt .br/.gz sibling are sent straight from disk.
+    - Other compressible responses are compressed once per content version:
+      the result is cached under (encoding, ETag), or a body digest when the
+      view did not set an ETag. The compressed body is sent with the view's
+      ETag plus an encoding suffix.
+    - Every compressible response carries Vary: Accept-Encoding, compressed or not.
+    """
+
+    def __init__(self, app, static_folder, static_url_path='/static', min_size=MIN_SIZE):
+        self.app = app
+        self.static_folder = static_folder
+        self.static_prefix = static_url_path.rstrip('/') + '/'
+        self.min_size = min_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        encoding = negotiate(environ.get('HTTP_ACCEPT_ENCODING'))
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if method not in ('GET', 'HEAD'):
+            return self.app(environ, start_response)
+        if encoding is None or environ.get('HTTP_RANGE'):
+            def identity(status, headers, exc_info=None):
+                if self._should_compress(status, headers) or status.startswith('304'):
+                    headers = _add_vary(headers, 'Accept-Encoding')
+                return start_response(status, headers, exc_info)
+            return self.app(environ, identity)
+
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.static_prefix):
+            served = self._serve_precompressed(environ, start_response, path, encoding)
+            if served is not None:
+                return served
+
+        # The client's validator for this encoding carries our suffix; the view
+        # only knows its own ETag
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        suffixed = if_none_match and _strip_etag_suffix(if_none_match, encoding)
+        if suffixed:
+            environ['HTTP_IF_NONE_MATCH'] = suffixed
+
+        captured = {}
+
+        def capture(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            return lambda chunk: captured.setdefault('written', []).append(chunk)
+
+        app_iter = self.app(environ, capture)
+        status, headers = captured['status'], captured['headers']
+        compressible = self._should_compress(status, headers)
+        if compressible or status.startswith('304'):  # a 304 has no Content-Type to go by
+            headers = _add_vary(headers, 'Accept-Encoding')
+        if suffixed and status.startswith('304'):
+            headers = _etag_with_suffix(headers, encoding)  # a 304 for the compressed representation
+        if not compressible or 'written' in captured:
+            start_response(status, headers, captured['exc_info'])
+            if 'written' in captured:
+                return captured['written'] + list(app_iter)
+            return app_iter
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        if len(body) < self.min_size:
+            start_response(status, headers)
+            return [body]
+
+        payload = self._compressed(body, encoding, headers)
+        headers = _etag_with_suffix([(k, v) for k, v in headers if k.lower() != 'content-length'], encoding)
+        headers += [
+            ('Content-Encoding', encoding),
+            ('Content-Length', str(len(payload))),
+        ]
+        start_response(status, headers)
+        return [b''] if method == 'HEAD' else [payload]
+
+    # --- HELPERS ---
+
+    def _should_compress(self, status, headers):
+        if not status.startswith('200'):
+            return False
+        lowered = {k.lower(): v for k, v in headers}
+        if 'content-encoding' in lowered:
+            return False
+        ctype = lowered.get('content-type', '')
+        return ctype.startswith(COMPRESSIBLE_TYPES)
+
+    def _compressed(self, body, encoding, headers):
+        etag = next((v for k, v in headers if k.lower() == 'etag'), None)
+        cache_control = next((v for k, v in headers if k.lower() == 'cache-control'), '')
+        if 'no-store' in cache_control:
+            return compress(body, encoding)
+
+        key = (encoding, etag or hashlib.sha1(body).hexdigest())
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self._cache.move_to_end(key)
+                return payload
+
+        payload = compress(body, encoding)
+        with self._lock:
+            self._cache[key] = payload
+            if len(self._cache) > CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+        return payload
+
+    def _serve_precompressed(self, environ, start_response, path, encoding):
+        """Sends static/<file>.br or .gz directly when it exists."""
+        rel_path = path[len(self.static_prefix):]
+        full_path = safe_join(self.static_folder, rel_path)
+        if not full_path or not os.path.isfile(full_path):
+            return None
+        ext = '.br' if encoding == 'br' else '.gz'
+        variant = full_path + ext
+        if not os.path.isfile(variant):
+            return None
+
+        stat = os.stat(variant)
+        etag = f'"{int(stat.st_mtime)}-{stat.st_size}-{encoding}"'
+        cache_control = IMMUTABLE_CACHE if rel_path.startswith(IMMUTABLE_PREFIXES) else 'no-cache'
+        ctype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        if ctype.startswith('text/') or ctype in ('application/javascript', 'image/svg+xml'):
+            ctype += '; charset=utf-8'
+        headers = [
+            ('Content-Type', ctype),
+            ('Content-Encoding', encoding),
+            ('Vary', 'Accept-Encoding'),
+            ('Cache-Control', cache_control),
+            ('ETag', etag),
+        ]
+
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers)
+            return [b'']
+
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+        if environ.get('REQUEST_METHOD') == 'HEAD':
+            return [b'']
+        with open(variant, 'rb') as f:
+            return [f.read()]
@@ -0,0 +1,255 @@
+import ctypes
+import ctypes.util
+import hashlib
+import mmap
+import os
+import select
+import signal
+import struct
+import threading
+import time
+
+# One content-version watcher for all workers. It watches the published data
+# files (articles, contests, mcqs.db) and the template tree, with inotify on
+# Linux and mtime polling elsewhere, and writes a version per group into a few
+# bytes of shared memory. Under gunicorn the master forks the watcher in
+# when_ready() and every worker inherits the mapping, so a worker learns about
+# a publish by reading 8 bytes instead of stat()ing files on every call:
+#
+#   - utils trusts its in-memory snapshots while the data version is unchanged
+#     and re-checks (then swaps in new ones) once it moves;
+#   - app.py drops compiled templates and rendered pages when templates move;
+#   - token() goes into sw.js and an X-Content-Version header, so the service
+#     worker's page cache turns over on every publish.
+#
+# Outside gunicorn the first versions() call starts a watcher thread in-process.
+# Without a live watcher (its heartbeat stopped) versions() returns None and
+# callers fall back to checking the files themselves.
+
+# --- CONFIGURATION ---
+POLL_SECONDS = float(os.environ.get('CONTENT_POLL_SECONDS', 1))
+DEBOUNCE_SECONDS = 0.05  # a publish touches several files; report them as one change
+STALE_AFTER = 5.0        # heartbeat age at which the watcher is presumed dead
+
+GROUPS = ('data', 'templates')
+
+# Shared layout: data version, templates version, watcher pid, heartbeat (time.time())
+_LAYOUT = struct.Struct('<QQqd')
+_shared = mmap.mmap(-1, _LAYOUT.size)  # anonymous + MAP_SHARED: inherited across fork
+_files = []      # 'data' group: individual files
+_trees = []      # 'templates' group: directories, recursively
+_callbacks = []
+_seen = None     # versions this process last acted on
+_thread_pid = None
+_start_lock = threading.Lock()
+
+
+def watch_files(*paths):
+    """Adds published data files to the 'data' group (before the watcher starts)."""
+    for path in paths:
+        if path not in _files:
+            _files.append(path)
+
+
+def watch_tree(path):
+    """Adds a directory (recursively) to the 'templates' group."""
+    if path not in _trees:
+        _trees.append(path)
+
+
+def on_change(callback):
+    """Registers callback(changed groups) for check() to run when a version moves."""
+    _callbacks.append(callback)
+
+
+# --- READING (every request) ---
+
+def _read():
+    while True:
+        first = _LAYOUT.unpack_from(_shared)
+        if _LAYOUT.unpack_from(_shared) == first:  # not torn by a concurrent write
+            return first
+
+
+def versions():
+    """{'data': int, 'templates': int}, or None when no watcher is keeping them current."""
+    data, templates, pid, heartbeat = _read()
+    if not pid:
+        _start_thread()
+        data, templates, pid, heartbeat = _read()
+    if not pid or time.time() - heartbeat > STALE_AFTER:
+        return None
+    return {'data': data, 'templates': templates}
+
+
+def version(group='data'):
+    current = versions()
+    return current[group] if current else None
+
+
+def token():
+    """Short string that changes whenever any watched content does ('' without a watcher)."""
+    current = versions()
+    if not current:
+        return ''
+    return f"{current['data'] ^ current['templates']:016x}"[:12]
+
+
+def check():
+    """Runs the on_change callbacks if a version moved since this process last looked."""
+    global _seen
+    current = versions()
+    if current is None or current == _seen:
+        return
+    previous, _seen = _seen, current
+    if previous is None:
+        return  # first look; app.warmup() makes it before any cache is built
+    changed = {group for group in GROUPS if current[group] != previous[group]}
+    for callback in _callbacks:
+        callback(changed)
+
+
+# --- COMPUTING VERSIONS (watcher only) ---
+
+def _stamp(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return b'-'
+    return f'{st.st_ino}:{st.st_mtime_ns}:{st.st_size}'.encode()
+
+
+def _tree_dirs():
+    return [dirpath for root in _trees for dirpath, _, _ in os.walk(root)]
+
+
+def _compute():
+    data = hashlib.blake2b(digest_size=8)
+    for path in _files:
+        data.update(path.encode() + b'=' + _stamp(path) + b';')
+    templates = hashlib.blake2b(digest_size=8)
+    for root in _trees:
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                templates.update(path.encode() + b'=' + _stamp(path) + b';')
+    return int.from_bytes(data.digest(), 'little'), int.from_bytes(templates.digest(), 'little')
+
+
+def _publish(pid, current=None):
+    """Writes the versions (computed unless given) and a fresh heartbeat; returns the versions."""
+    data, templates = current or _compute()
+    _LAYOUT.pack_into(_shared, 0, data, templates, pid, time.time())
+    return data, templates
+
+
+# --- INOTIFY (Linux) ---
+
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x2, 0x4, 0x8
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x40, 0x80, 0x100, 0x200
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct('iIII')
+
+
+class _Inotify:
+    """Just enough of inotify(7) through libc: directory watches and event names."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}  # wd -> (directory, names of interest or None for every file)
+
+    def add(self, directory, names=None):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), _MASK)
+        if wd >= 0:
+            self.watches[wd] = (directory, names)
+
+    def wait(self, timeout):
+        """True if something we care about changed within `timeout` seconds."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        relevant = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return relevant
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+                name = buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0').decode()
+                offset += _EVENT.size + length
+                names = self.watches.get(wd, (None, None))[1]  # unknown wd: queue overflow, rescan
+                if names is None or name in names:
+                    relevant = True
+
+
+def _inotify_for_watched():
+    """An _Inotify on the data files' directories and the template tree, or None if unavailable."""
+    try:
+        inotify = _Inotify()
+    except (OSError, AttributeError):
+        return None
+    by_dir = {}
+    for path in _files:
+        by_dir.setdefault(os.path.dirname(os.path.abspath(path)), set()).add(os.path.basename(path))
+    for directory, names in by_dir.items():
+        inotify.add(directory, names)
+    for directory in _tree_dirs():
+        inotify.add(directory)
+    return inotify
+
+
+def _watch_loop(pid, alive=lambda: True):
+    inotify = _inotify_for_watched()
+    current = _publish(pid)
+    while alive():
+        if inotify is None:
+            time.sleep(POLL_SECONDS)
+            current = _publish(pid)  # polling: every cycle re-stats everything
+        elif inotify.wait(POLL_SECONDS):
+            time.sleep(DEBOUNCE_SECONDS)
+            inotify.wait(0)  # swallow the rest of the burst
+            for directory in _tree_dirs():
+                inotify.add(directory)  # new template subfolders; re-adding is a no-op
+            current = _publish(pid)
+        else:
+            _publish(pid, current)  # quiet interval: heartbeat only, no stat()s
+
+
+# --- STARTING ---
+
+def start_process():
+    """
+    Forks a dedicated watcher (gunicorn master, before workers are forked).
+    It exits when its parent does.
+    """
+    parent = os.getpid()
+    pid = os.fork()
+    if pid:
+        _publish(pid)  # valid versions before the first worker reads them
+        return pid
+    try:
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGQUIT,
+                    signal.SIGUSR1, signal.SIGUSR2, signal.SIGCHLD, signal.SIGTTIN,
+                    signal.SIGTTOU, signal.SIGWINCH):
+            signal.signal(sig, signal.SIG_DFL)  # the parent's handlers are gunicorn's
+        _watch_loop(os.getpid(), alive=lambda: os.getppid() == parent)
+    finally:
+        os._exit(0)
+
+
+def _start_thread():
+    """Fallback for a single process (flask run, uvicorn): a watcher thread in this process."""
+    global _thread_pid
+    with _start_lock:
+        if _thread_pid == os.getpid() or _read()[2]:
+            return
+        _thread_pid = os.getpid()
+        _publish(_thread_pid)
+    threading.Thread(target=_watch_loop, args=(_thread_pid,), name='content-watcher', daemon=True).start()
@@ -0,0 +1,133 @@
+import re
+
+import assets
+
+# --- CONFIGURATION ---
+# Roughly one mobile/desktop viewport worth of markup after <body>.
+FOLD_BYTES = 12000
+CACHE_ENTRIES = 256  # distinct (bundle, fold markup) pairs kept; oldest dropped first
+
+LINK_RE = re.compile(r'<link rel="stylesheet" href="([^"]+)">')
+CLASS_RE = re.compile(r'class="([^"]*)"')
+ID_RE = re.compile(r'id="([^"]*)"')
+SELECTOR_CLASS_RE = re.compile(r'\.([A-Za-z_][\w-]*)')
+SELECTOR_ID_RE = re.compile(r'#([A-Za-z_][\w-]*)')
+
+# (bundle name, fold classes, fold ids) -> critical CSS string. Keyed by what is
+# above the fold, not by endpoint: every article shares one endpoint but not its markup.
+_critical_cache = {}
+_bundle_by_url = None
+
+
+def reset():
+    """Forgets computed critical CSS (templates or bundles changed)."""
+    _critical_cache.clear()
+
+# --- CSS PARSING ---
+
+def split_rules(css):
+    """Splits CSS into top-level (prelude, body) pairs. Nested blocks stay in body."""
+    rules = []
+    i, n = 0, len(css)
+    while i < n:
+        brace = css.find('{', i)
+        if brace == -1:
+            break
+        depth, j = 1, brace + 1
+        while j < n and depth:
+            if css[j] == '{':
+                depth += 1
+            elif css[j] == '}':
+                depth -= 1
+            j += 1
+        rules.append((css[i:brace].strip(), css[brace + 1:j - 1]))
+        i = j
+    return rules
+
+def _selector_visible(selector, classes, ids):
+    """A selector is critical if every class/id it names appears above the fold."""
+    for part in selector.split(','):
+        need_classes = SELECTOR_CLASS_RE.findall(part)
+        need_ids = SELECTOR_ID_RE.findall(part)
+        if all(c in classes for c in need_classes) and all(i in ids for i in need_ids):
+            return True
+    return False
+
+def extract_critical(css, classes, ids):
+    """Keeps only the rules that can style the given above-the-fold markup."""
+    out = []
+    for prelude, body in split_rules(assets.minify_css(css)):
+        if prelude.startswith('@media'):
+            inner = extract_critical(body, classes, ids)
+            if inner:
+                out.append(f'{prelude}{{{inner}}}')
+        elif prelude.startswith('@'):
+            # @keyframes etc. are not needed for first paint
+            continue
+        elif _selector_visible(prelude, classes, ids):
+            out.append(f'{prelude}{{{body}}}')
+    return ''.join(out)
+
+# --- RENDER PASS ---
+
+def _fold_tokens(html):
+    """Collects class names and ids used in the first FOLD_BYTES of <body>."""
+    start = html.find('<body')
+    fold = html[start:start + FOLD_BYTES] if start != -1 else html[:FOLD_BYTES]
+    classes, ids = set(), set()
+    for value in CLASS_RE.findall(fold):
+        classes.update(value.split())
+    ids.update(ID_RE.findall(fold))
+    return classes, ids
+
+def _bundles_by_url():
+    """Maps each bundle's public URL back to its logical name."""
+    global _bundle_by_url
+    if _bundle_by_url is None:
+        _bundle_by_url = {assets.asset_url(name): name for name in assets.CSS_BUNDLES}
+    return _bundle_by_url
+
+def optimize_html(html):
+    """
+    Inlines critical CSS for each local stylesheet and turns the <link> into an
+    async preload, so first paint no longer waits on the stylesheet round-trip.
+    """
+    by_url = _bundles_by_url()
+    links = [m for m in LINK_RE.finditer(html) if m.group(1) in by_url]
+    if not links:
+        return html
+
+    classes, ids = _fold_tokens(html)
+    classes, ids = frozenset(classes), frozenset(ids)
+    critical_parts = []
+    for m in links:
+        key = (by_url[m.group(1)], classes, ids)
+        if key not in _critical_cache:
+            if len(_critical_cache) >= CACHE_ENTRIES:
+                _critical_cache.pop(next(iter(_critical_cache)), None)
+            _critical_cache[key] = extract_critical(assets.read_bundle(key[0]), classes, ids)
+        critical_parts.append(_critical_cache[key])
+
+    def deferred(m):
+        href = m.group(1)
+        return (f'<link rel="preload" href="{href}" as="style" '
+                f'onload="this.onload=null;this.rel=\'stylesheet\'">'
+                f'<noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+    first = links[0].start()
+    head, rest = html[:first], html[first:]
+    rest = LINK_RE.sub(lambda m: deferred(m) if m.group(1) in by_url else m.group(0), rest)
+    return f'{head}<style>{"".join(critical_parts)}</style>\n    {rest}'
+
+def init_app(app):
+    """Registers the after_request pass (disable with CRITICAL_CSS = False)."""
+    app.config.setdefault('CRITICAL_CSS', True)
+
+    @app.after_request
+    def _inline_critical_css(response):
+        if (not app.config['CRITICAL_CSS'] or response.status_code != 200
+                or response.mimetype != 'text/html' or response.direct_passthrough):
+            return response
+        html = response.get_data(as_text=True)
+        response.set_data(optimize_html(html))
+        return response
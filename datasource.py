@@ -0,0 +1,309 @@
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import answer_key
+import schema
+
+# Where the question bank lives. Without a datasources.json everything is the
+# single mcqs.db, read by the site and written in place by builder.py and the
+# extractor, exactly as before. With one, writers and readers are split:
+#
+#   {
+#     "snapshot": "mcqs.db",                 what the site reads (immutable, replaced by promote)
+#     "primary": "data/primary.db",          default write target
+#     "shards": {                            categories routed to their own files
+#       "data/salesforce.db": ["Salesforce Agentforce", "Salesforce Admin"]
+#     }
+#   }
+#
+# builder.py, the extractor and `bank.py import` write to write_path(category),
+# repair.py and answer_key.py work on every write_paths() file, and all of them
+# refuse the snapshot itself (check_writable); the site never sees the sources.
+# promote() attaches every source, copies the categories routed to it into a
+# fresh file and os.replace()s it over the snapshot, so readers (opened with
+# immutable=1, no locking at all) move from one complete database to the next
+# and a long extraction into a shard never touches them.
+#
+#   python datasource.py status
+#   python datasource.py split [mcqs.db]   # first switch: copy an existing bank into the sources
+#   python datasource.py promote
+
+# --- CONFIGURATION ---
+CONFIG_FILE = os.environ.get('DATASOURCES', 'datasources.json')
+DB_NAME = 'mcqs.db'  # the whole bank when there is no config
+
+# Every stored column; category_id is re-derived in the target database
+COLUMNS = ('id', 'set_id', 'category', 'tag', 'description', 'question',
+           'image_url', 'options', 'correct', 'explanation', 'correct_idx')
+
+
+class DataSources:
+    """Parsed datasources.json: snapshot path, primary path, category name -> shard path."""
+
+    def __init__(self, snapshot=DB_NAME, primary=None, shards=None):
+        self.snapshot = snapshot
+        self.primary = primary or snapshot
+        self.shard_of = {}
+        for path, categories in (shards or {}).items():
+            for category in categories:
+                self.shard_of[category] = path
+
+    @property
+    def split(self):
+        """True when writers and the site use different files (promote() publishes)."""
+        return self.primary != self.snapshot or bool(self.shard_of)
+
+    def write_path(self, category):
+        return self.shard_of.get(category, self.primary)
+
+    def sources(self):
+        """[(path, categories it owns or None for 'everything not sharded')], primary first."""
+        shards = {}
+        for category, path in self.shard_of.items():
+            shards.setdefault(path, []).append(category)
+        return [(self.primary, None)] + [(path, sorted(cats)) for path, cats in shards.items()]
+
+
+_config = None
+
+
+def load(path=CONFIG_FILE):
+    if not os.path.exists(path):
+        return DataSources()
+    with open(path, 'r', encoding='utf-8') as f:
+        raw = json.load(f)
+    base = os.path.dirname(path)  # relative paths are relative to the config file
+
+    def resolve(p):
+        return os.path.join(base, p) if p else p
+
+    shards = {resolve(p): categories for p, categories in (raw.get('shards') or {}).items()}
+    return DataSources(resolve(raw.get('snapshot', DB_NAME)), resolve(raw.get('primary')), shards)
+
+
+def current():
+    """The process-wide configuration (read once)."""
+    global _config
+    if _config is None:
+        _config = load()
+    return _config
+
+
+def write_path(category):
+    """The database file that questions of `category` are written to."""
+    return current().write_path(category)
+
+
+def write_paths(config=None):
+    """Every database file writers may modify: the primary, then each shard."""
+    return [path for path, _ in (config or current()).sources()]
+
+
+def check_writable(path, config=None):
+    """
+    Raises ValueError for the promoted snapshot of a split configuration: the
+    site has it open immutable and the next promote() would replace the edit.
+    """
+    config = config or current()
+    if config.split and os.path.abspath(path) == os.path.abspath(config.snapshot):
+        raise ValueError(f'{path} is the promoted snapshot; write to the sources instead '
+                         f"({', '.join(write_paths(config))}) and run `python datasource.py promote`")
+
+
+def read_uri(path):
+    """
+    sqlite URI for a read-only handle. A promoted snapshot is never modified
+    in place, so it is opened immutable: no locks, no journal checks.
+    """
+    uri = f'file:{path}?mode=ro'
+    return uri + '&immutable=1' if current().split else uri
+
+
+def connect_source(path):
+    """Read-write connection to a source database, created and migrated if needed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    schema.migrate(conn)
+    return conn
+
+
+# --- COPYING BETWEEN DATABASES ---
+
+def _route_filter(config, categories, column='category'):
+    """WHERE clause (and params) selecting the rows a source owns."""
+    if categories is not None:
+        return f"{column} IN ({', '.join('?' * len(categories))})", list(categories)
+    sharded = list(config.shard_of)
+    if not sharded:
+        return '1', []
+    return f"({column} IS NULL OR {column} NOT IN ({', '.join('?' * len(sharded))}))", sharded
+
+
+def _copy_attached(conn, config, categories):
+    """
+    Copies the questions routed to `categories` (see DataSources.sources) from
+    the database attached as `src` into main, reusing main's categories where
+    the names match. Returns (copied, skipped).
+    """
+    where, params = _route_filter(config, categories)
+    tables = {r[0] for r in conn.execute("SELECT name FROM src.sqlite_master WHERE type = 'table'")}
+    if 'questions' not in tables:
+        return 0, 0
+    src_columns = {r[1] for r in conn.execute('PRAGMA src.table_info(questions)')}
+    select = ', '.join(f'q.{c}' if c in src_columns else 'NULL' for c in COLUMNS)
+    if 'categories' in tables:
+        conn.execute(f'''INSERT OR IGNORE INTO main.categories (name, slug)
+            SELECT name, slug FROM src.categories
+            WHERE name IN (SELECT DISTINCT category FROM src.questions WHERE {where})''', params)
+    # Rows whose category did not come across (unmigrated source, slug clash) get
+    # category_id NULL and the insert trigger creates the category
+    before = conn.total_changes
+    conn.execute(f'''INSERT OR IGNORE INTO main.questions ({', '.join(COLUMNS)}, category_id)
+        SELECT {select}, c.id FROM src.questions q LEFT JOIN main.categories c ON c.name = q.category
+        WHERE {_route_filter(config, categories, 'q.category')[0]}''', params)
+    copied = conn.total_changes - before
+    matched = conn.execute(f'SELECT COUNT(*) FROM src.questions WHERE {where}', params).fetchone()[0]
+    return copied, matched - copied
+
+
+def _fsync(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def promote(config=None, log=print):
+    """
+    Builds a new snapshot from the sources and atomically swaps it in.
+    Readers holding the old file keep a consistent view until they reopen.
+    Returns {source path: (copied, skipped)}.
+    """
+    config = config or current()
+    if not config.split:
+        raise ValueError(f'{config.snapshot} is read and written in place; nothing to promote '
+                         f'(configure a primary/shards in {CONFIG_FILE})')
+    start = time.perf_counter()
+    tmp_path = f'{config.snapshot}.{os.getpid()}.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    result = {}
+    conn = sqlite3.connect(f'file:{tmp_path}', uri=True, isolation_level=None, timeout=30)
+    try:
+        # Nobody else sees this file until the rename and a crash only leaves
+        # the .tmp behind, so skip the journal entirely
+        conn.execute('PRAGMA journal_mode = OFF')
+        conn.execute('PRAGMA synchronous = OFF')
+        schema.migrate(conn)
+        for path, categories in config.sources():
+            if not os.path.exists(path):
+                log(f'  {path}: missing, skipped')
+                continue
+            conn.execute('ATTACH DATABASE ? AS src', (f'file:{path}?mode=ro',))
+            try:
+                conn.execute('BEGIN')  # one read transaction per source: a consistent copy
+                result[path] = _copy_attached(conn, config, categories)
+                conn.execute('COMMIT')
+            finally:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                conn.execute('DETACH DATABASE src')
+            log(f'  {path}: {result[path][0]} questions' +
+                (f' ({result[path][1]} duplicate ids skipped)' if result[path][1] else ''))
+        conn.execute('BEGIN')
+        schema.refresh_category_sets(conn)
+        answer_key.resolve_pending(conn)
+        conn.execute('COMMIT')
+        problem = conn.execute('PRAGMA quick_check').fetchone()[0]
+        if problem != 'ok':
+            raise RuntimeError(f'new snapshot failed quick_check: {problem}')
+    except BaseException:
+        conn.close()
+        os.remove(tmp_path)
+        raise
+    conn.close()
+
+    _fsync(tmp_path)
+    os.replace(tmp_path, config.snapshot)
+    _fsync(os.path.dirname(os.path.abspath(config.snapshot)))
+    log(f'Promoted {config.snapshot} in {time.perf_counter() - start:.1f}s')
+    return result
+
+
+def split(source_path, config=None, log=print):
+    """Copies an existing single-file bank into the configured primary/shards (existing ids are kept)."""
+    config = config or current()
+    for path, categories in config.sources():
+        if os.path.abspath(path) == os.path.abspath(source_path):
+            continue
+        conn = connect_source(path)
+        try:
+            conn.execute('ATTACH DATABASE ? AS src', (source_path,))
+            with conn:
+                copied, skipped = _copy_attached(conn, config, categories)
+                schema.refresh_category_sets(conn)
+                answer_key.resolve_pending(conn)
+            conn.execute('DETACH DATABASE src')
+        finally:
+            conn.close()
+        log(f'  {path}: {copied} questions copied, {skipped} already there')
+
+
+def status(config=None):
+    config = config or current()
+    if not config.split:
+        print(f'Single database: {config.snapshot} (no {CONFIG_FILE})')
+        return
+    try:
+        snapshot_mtime = os.stat(config.snapshot).st_mtime
+        print(f'snapshot {config.snapshot}: promoted {time.ctime(snapshot_mtime)}')
+    except FileNotFoundError:
+        snapshot_mtime = None
+        print(f'snapshot {config.snapshot}: not promoted yet')
+    for path, categories in config.sources():
+        owns = ', '.join(categories) if categories is not None else 'every other category'
+        if not os.path.exists(path):
+            print(f'  {path} ({owns}): missing')
+            continue
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            count = conn.execute('SELECT COUNT(*) FROM questions').fetchone()[0]
+        except sqlite3.OperationalError:
+            count = 0
+        finally:
+            conn.close()
+        pending = snapshot_mtime is None or os.stat(path).st_mtime > snapshot_mtime
+        print(f"  {path} ({owns}): {count} questions{', changed since promote' if pending else ''}")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command')
+    sub.add_parser('status')
+    split_cmd = sub.add_parser('split')
+    split_cmd.add_argument('source', nargs='?', default=DB_NAME)
+    sub.add_parser('promote')
+    args = parser.parse_args()
+
+    if args.command == 'promote':
+        try:
+            promote()
+        except ValueError as e:
+            sys.exit(str(e))
+    elif args.command == 'split':
+        if not os.path.exists(args.source):
+            sys.exit(f'No database at {args.source}')
+        split(args.source)
+    else:
+        status()
+
+
+if __name__ == '__main__':
+    main()
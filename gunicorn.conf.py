@@ -0,0 +1,47 @@
+# Gunicorn picks this file up automatically from the working directory.
+import gc
+import os
+
+# Import app.py once in the master and fork workers from it. The content
+# snapshots and compiled templates built in when_ready() are then shared
+# copy-on-write instead of being rebuilt (and duplicated) in every worker.
+# Set GUNICORN_PRELOAD=0 to fall back to per-worker imports.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+if preload_app:
+    # Avoid collections in the master while the snapshots are being built;
+    # a GC pass would touch every object header and un-share the pages.
+    gc.disable()
+
+def when_ready(server):
+    """Master: build the read-only snapshots, then freeze them out of the GC."""
+    if not server.cfg.preload_app:
+        return
+    import content_version
+    import utils
+    from app import warmup
+    content_version.start_process()  # first: workers inherit its shared versions
+    warmup()
+    utils.reset_connections()  # never carry an open SQLite handle across fork
+    gc.freeze()
+    gc.enable()  # frozen objects are skipped by later collections
+
+def post_fork(server, worker):
+    """Worker: fresh SQLite handles, normal GC for per-request garbage."""
+    import utils
+    utils.reset_connections()
+    gc.enable()
+
+def post_worker_init(worker):
+    """Pre-compile templates and load content before the worker takes traffic."""
+    import profiler
+    from app import warmup
+    warmup()
+    profiler.install_signal_handler()  # kill -USR2 <worker pid> -> profiles/
+
+def worker_exit(server, worker):
+    """Write out any buffered attempt beacons and view counts before the worker goes away."""
+    import attempts
+    import popularity
+    attempts.flush()
+    popularity.flush()
@@ -0,0 +1,448 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+
+import datasource
+
+# --- OPTIONAL: PILLOW (without it images are stored as-is, deduplicated by hash) ---
+try:
+    from PIL import Image, ImageOps, features
+except ModuleNotFoundError:
+    Image = None
+
+# builder.py ingests every uploaded image here instead of copying the original.
+# Each upload becomes <hash>-<width>.<avif|webp|jpg|png> at a few widths under
+# static/images/opt/; the hash is of the source bytes, so uploading the same
+# file twice reuses the first copy. Names never change content, so the files
+# are served as immutable (see assets.add_cache_headers).
+
+# --- CONFIGURATION ---
+IMAGES_DIR = os.path.join('static', 'images')
+OPT_DIR = os.path.join(IMAGES_DIR, 'opt')
+TEMPLATES_DIR = 'templates'
+ARTICLE_TEMPLATES = os.path.join(TEMPLATES_DIR, 'articles')
+ROOT_DIRS = (TEMPLATES_DIR, os.path.join('static', 'styles'), os.path.join('static', 'js'))
+REFS_FILE = 'image_refs.json'  # reference index, rebuilt from the templates if missing
+# digest -> stored files. Rewritten on every ingest, so it lives outside static/
+# (everything under opt/ is public and served as immutable)
+MANIFEST_FILE = 'image_manifest.json'
+OLD_MANIFEST_FILE = os.path.join(OPT_DIR, 'manifest.json')
+WIDTHS = (480, 960, 1440)
+MODERN_FORMATS = ('avif', 'webp')  # best first; each is skipped if Pillow can't encode it
+QUALITY = {'avif': 55, 'webp': 80, 'jpeg': 82}
+SIZES = '(max-width: 900px) 100vw, 900px'  # article column width
+PASSTHROUGH_EXTS = ('.gif', '.svg')       # animations / vectors are kept as uploaded
+
+_REFERENCE = re.compile(r"filename='images/([^']+)'")
+_ANY_REFERENCE = re.compile(r"images/([\w./-]+\.\w+)")
+
+
+def _move_old_manifest():
+    """Moves a manifest written by an older version out of static/."""
+    if os.path.exists(OLD_MANIFEST_FILE) and not os.path.exists(MANIFEST_FILE):
+        os.replace(OLD_MANIFEST_FILE, MANIFEST_FILE)
+
+
+def _load_manifest():
+    _move_old_manifest()
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest):
+    tmp_path = MANIFEST_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_FILE)
+
+
+# --- INGEST ---
+
+def ingest(path):
+    """
+    Stores the image at `path` and returns its manifest entry:
+    {'width', 'height', 'fallback': name, 'variants': {'avif': [[w, name], ...], ...}}.
+    Names are relative to OPT_DIR. A file already ingested is not processed again.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    manifest = _load_manifest()
+    entry = manifest.get(digest)
+    if entry and all(os.path.exists(os.path.join(OPT_DIR, name)) for name in _entry_files(entry)):
+        return entry
+
+    os.makedirs(OPT_DIR, exist_ok=True)
+    ext = os.path.splitext(path)[1].lower()
+    if Image is None or ext in PASSTHROUGH_EXTS:
+        entry = _store_original(data, digest, ext)
+    else:
+        entry = _store_variants(path, digest)
+    manifest[digest] = entry
+    _save_manifest(manifest)
+    return entry
+
+
+def _store_original(data, digest, ext):
+    name = f'{digest}{ext}'
+    with open(os.path.join(OPT_DIR, name), 'wb') as f:
+        f.write(data)
+    width = height = None
+    if Image is not None and ext != '.svg':
+        with Image.open(os.path.join(OPT_DIR, name)) as img:
+            width, height = img.size
+    return {'width': width, 'height': height, 'fallback': name, 'variants': {}}
+
+
+def _store_variants(path, digest):
+    with Image.open(path) as src:
+        img = ImageOps.exif_transpose(src)
+        img.load()
+    has_alpha = img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
+    img = img.convert('RGBA' if has_alpha else 'RGB')
+    width, height = img.size
+
+    widths = sorted({w for w in WIDTHS if w < width} | {min(width, WIDTHS[-1])})
+    resized = {}
+    for w in widths:
+        resized[w] = img if w == width else img.resize((w, max(1, round(height * w / width))), Image.LANCZOS)
+
+    variants = {}
+    for fmt in MODERN_FORMATS:
+        if not features.check(fmt):
+            continue
+        variants[fmt] = []
+        for w in widths:
+            name = f'{digest}-{w}.{fmt}'
+            resized[w].save(os.path.join(OPT_DIR, name), fmt.upper(), quality=QUALITY[fmt])
+            variants[fmt].append([w, name])
+
+    # For browsers without AVIF/WebP: the largest width as PNG (transparency) or JPEG
+    top = widths[-1]
+    if has_alpha:
+        fallback = f'{digest}-{top}.png'
+        resized[top].save(os.path.join(OPT_DIR, fallback), 'PNG', optimize=True)
+    else:
+        fallback = f'{digest}-{top}.jpg'
+        resized[top].save(os.path.join(OPT_DIR, fallback), 'JPEG', quality=QUALITY['jpeg'],
+                          optimize=True, progressive=True)
+    out_w, out_h = resized[top].size
+    return {'width': out_w, 'height': out_h, 'fallback': fallback, 'variants': variants}
+
+
+def _entry_files(entry):
+    yield entry['fallback']
+    for sources in entry['variants'].values():
+        for _, name in sources:
+            yield name
+
+
+def picture_html(entry, alt, url):
+    """
+    <picture> markup for an ingested image. `url(name)` turns an OPT_DIR file
+    name into whatever goes in src/srcset (builder passes a url_for expression).
+    """
+    lines = ['<picture>']
+    for fmt, sources in entry['variants'].items():
+        srcset = ', '.join(f'{url(name)} {w}w' for w, name in sources)
+        lines.append(f'    <source type="image/{fmt}" srcset="{srcset}" sizes="{SIZES}">')
+    size = f' width="{entry["width"]}" height="{entry["height"]}"' if entry['width'] else ''
+    lines.append(f'    <img src="{url(entry["fallback"])}"{size} class="article-img" alt="{alt}" '
+                 f'loading="lazy" decoding="async">')
+    lines.append('</picture>')
+    return '\n'.join(lines)
+
+
+# --- REFERENCE INDEX (article template -> images it uses) ---
+# Built once by scanning templates/articles/*.html, then kept current by
+# builder.py on every publish/delete, so nothing rescans the whole tree.
+# Images used outside articles (base.html icons, CSS) are found by a small
+# scan of the non-article templates and stylesheets: ROOT_DIRS.
+
+
+def _scan(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sorted(set(_REFERENCE.findall(f.read())))
+
+
+class RefIndex:
+    """{template path: {'mtime_ns', 'images'}} persisted to REFS_FILE."""
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    @classmethod
+    def load(cls):
+        if not os.path.exists(REFS_FILE):
+            index = cls({})
+            index.rebuild()
+            return index
+        with open(REFS_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self):
+        tmp_path = REFS_FILE + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, REFS_FILE)
+
+    def rebuild(self):
+        self.entries = {}
+        if os.path.isdir(ARTICLE_TEMPLATES):
+            for fname in sorted(os.listdir(ARTICLE_TEMPLATES)):
+                if fname.endswith('.html'):
+                    self.update(os.path.join(ARTICLE_TEMPLATES, fname), save=False)
+        self.save()
+
+    def verify(self):
+        """Rescans only templates added, changed or removed behind our back (stat per file)."""
+        on_disk = set()
+        if os.path.isdir(ARTICLE_TEMPLATES):
+            on_disk = {os.path.join(ARTICLE_TEMPLATES, f) for f in os.listdir(ARTICLE_TEMPLATES)
+                       if f.endswith('.html')}
+        stale = [p for p in self.entries if p not in on_disk]
+        for path in stale:
+            del self.entries[path]
+        changed = bool(stale)
+        for path in on_disk:
+            entry = self.entries.get(path)
+            if entry is None or entry['mtime_ns'] != os.stat(path).st_mtime_ns:
+                self.update(path, save=False)
+                changed = True
+        if changed:
+            self.save()
+
+    def images_of(self, path):
+        entry = self.entries.get(os.path.normpath(path))
+        return set(entry['images']) if entry else set()
+
+    def update(self, path, save=True):
+        """Re-reads one template; returns the images it no longer references."""
+        path = os.path.normpath(path)
+        before = self.images_of(path)
+        images = _scan(path)
+        self.entries[path] = {'mtime_ns': os.stat(path).st_mtime_ns, 'images': images}
+        if save:
+            self.save()
+        return before - set(images)
+
+    def drop(self, path):
+        """Forgets a deleted template; returns the images it referenced."""
+        entry = self.entries.pop(os.path.normpath(path), None)
+        self.save()
+        return set(entry['images']) if entry else set()
+
+    def referenced(self):
+        """Every image some article, root template/stylesheet or MCQ (image_url) still uses."""
+        used = _root_references() | _question_references()
+        for entry in self.entries.values():
+            used.update(entry['images'])
+        return used
+
+
+def _root_references():
+    used = set()
+    for top in ROOT_DIRS:
+        for root, dirs, files in os.walk(top):
+            if os.path.abspath(root) == os.path.abspath(ARTICLE_TEMPLATES):
+                dirs[:] = []  # covered by the index
+                continue
+            for fname in files:
+                if fname.endswith(('.html', '.js', '.css')):
+                    with open(os.path.join(root, fname), 'r', encoding='utf-8') as f:
+                        used.update(_ANY_REFERENCE.findall(f.read()))
+    return used
+
+
+def _question_references():
+    """Images named in questions.image_url, across the snapshot and every write source."""
+    config = datasource.current()
+    used = set()
+    for path in dict.fromkeys([config.snapshot] + datasource.write_paths(config)):
+        if not os.path.exists(path):
+            continue
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        try:
+            for (url,) in conn.execute("SELECT DISTINCT image_url FROM questions WHERE image_url LIKE '%images/%'"):
+                used.update(_ANY_REFERENCE.findall(url))
+        except sqlite3.OperationalError:
+            pass  # no questions table yet
+        finally:
+            conn.close()
+    return used
+
+
+# --- DELETE (only what nothing else still uses) ---
+
+def release(names, still_used):
+    """
+    Deletes the images in `names` (paths relative to static/images) unless they
+    are in `still_used`. An optimized image goes as a whole: all its variants
+    are removed only when none of them is referenced anywhere else.
+    Returns the number of bytes freed.
+    """
+    manifest = _load_manifest()
+    changed = False
+    freed = 0
+    for name in set(names):
+        if not name.startswith('opt/'):
+            if name not in still_used:
+                freed += _remove(os.path.join(IMAGES_DIR, name))
+            continue
+        digest = os.path.basename(name).split('-')[0].split('.')[0]
+        entry = manifest.get(digest)
+        files = list(_entry_files(entry)) if entry else [os.path.basename(name)]
+        if any(f'opt/{f}' in still_used for f in files):
+            continue
+        for f in files:
+            freed += _remove(os.path.join(OPT_DIR, f))
+        if manifest.pop(digest, None):
+            changed = True
+    if changed:
+        _save_manifest(manifest)
+    return freed
+
+
+def _remove(path):
+    if not os.path.exists(path):
+        return 0
+    size = os.path.getsize(path)
+    os.remove(path)
+    return size
+
+
+def _stored_images():
+    """Every image file under static/images, as names relative to it."""
+    _move_old_manifest()  # so gc/dedup never count it as an image
+    names = []
+    for root, _, files in os.walk(IMAGES_DIR):
+        for fname in files:
+            path = os.path.join(root, fname)
+            names.append(os.path.relpath(path, IMAGES_DIR).replace(os.sep, '/'))
+    return sorted(names)
+
+
+# --- GC / DEDUP ---
+
+def gc(delete=False):
+    """Unreferenced image files -> [(name, bytes)]; removed (with their manifest entries) if `delete`."""
+    index = RefIndex.load()
+    index.verify()
+    used = index.referenced()
+    manifest = _load_manifest()
+    live = set()
+    for digest, entry in manifest.items():
+        files = [f'opt/{f}' for f in _entry_files(entry)]
+        if any(f in used for f in files):
+            live.update(files)
+    garbage = [(n, os.path.getsize(os.path.join(IMAGES_DIR, n)))
+               for n in _stored_images() if n not in used and n not in live]
+    if delete and garbage:
+        release([n for n, _ in garbage], used | live)
+        # Manifest entries whose files are all gone
+        manifest = _load_manifest()
+        gone = [d for d, e in manifest.items()
+                if not any(os.path.exists(os.path.join(OPT_DIR, f)) for f in _entry_files(e))]
+        if gone:
+            for digest in gone:
+                del manifest[digest]
+            _save_manifest(manifest)
+    return garbage
+
+
+def dedup(link=False):
+    """
+    Groups byte-identical image files. By default references to duplicates are
+    rewritten in the article templates to one canonical copy (an opt/ name if
+    there is one) and the duplicates are left for gc; with `link` the duplicates
+    are replaced by hard links instead and templates stay untouched.
+    Returns [(canonical, [duplicates])].
+    """
+    by_hash = {}
+    for name in _stored_images():
+        with open(os.path.join(IMAGES_DIR, name), 'rb') as f:
+            by_hash.setdefault(hashlib.sha256(f.read()).hexdigest(), []).append(name)
+    groups = []
+    for names in by_hash.values():
+        if len(names) < 2:
+            continue
+        names.sort(key=lambda n: (not n.startswith('opt/'), n))
+        groups.append((names[0], names[1:]))
+    if not groups:
+        return groups
+
+    if link:
+        for canonical, dups in groups:
+            src = os.path.join(IMAGES_DIR, canonical)
+            for dup in dups:
+                dest = os.path.join(IMAGES_DIR, dup)
+                if os.path.samefile(src, dest):
+                    continue
+                os.remove(dest)
+                os.link(src, dest)
+        return groups
+
+    index = RefIndex.load()
+    index.verify()
+    renames = {dup: canonical for canonical, dups in groups for dup in dups}
+    for path, entry in list(index.entries.items()):
+        if not renames.keys() & set(entry['images']):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        content = _REFERENCE.sub(lambda m: f"filename='images/{renames.get(m.group(1), m.group(1))}'", content)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        index.update(path, save=False)
+    index.save()
+    return groups
+
+
+def ingest_cli(files):
+    for source in files:
+        entry = ingest(source)
+        stored = sum(os.path.getsize(os.path.join(OPT_DIR, n)) for n in _entry_files(entry))
+        print(f'{source}: {os.path.getsize(source)} bytes -> {stored} bytes in {len(list(_entry_files(entry)))} files')
+        print(picture_html(entry, '', lambda n: f'/static/images/opt/{n}'))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    ing = sub.add_parser('ingest', help='store images, print the <picture> markup builder would insert')
+    ing.add_argument('files', nargs='+')
+    sub.add_parser('reindex', help='rebuild the reference index from templates/articles')
+    collect = sub.add_parser('gc', help='list (or --delete) images no template references')
+    collect.add_argument('--delete', action='store_true')
+    dup = sub.add_parser('dedup', help='point references to identical images at one copy')
+    dup.add_argument('--link', action='store_true', help='hard-link duplicates instead of rewriting templates')
+    args = parser.parse_args()
+
+    if args.command == 'reindex':
+        index = RefIndex({})
+        index.rebuild()
+        print(f'{len(index.entries)} templates, {len(index.referenced())} referenced images')
+    elif args.command == 'gc':
+        garbage = gc(delete=args.delete)
+        for name, size in garbage:
+            print(f'{size:10d}  {name}')
+        verb = 'Removed' if args.delete else 'Unreferenced (run with --delete to remove)'
+        print(f'{verb}: {len(garbage)} files, {sum(size for _, size in garbage)} bytes')
+    elif args.command == 'dedup':
+        groups = dedup(link=args.link)
+        for canonical, dups in groups:
+            print(f"{canonical} <- {', '.join(dups)}")
+        if groups and not args.link:
+            print('References rewritten; run `python images.py gc --delete` to drop the duplicates.')
+        print(f'{sum(len(d) for _, d in groups)} duplicate files')
+    else:
+        ingest_cli(args.files)
+
+
+if __name__ == '__main__':
+    main()
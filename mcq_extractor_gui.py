@@ -8,7 +8,10 @@ import os
 import time
 import uuid
 import re
-import sqlite3  # <--- ADDED: Database support
+
+import answer_key
+import datasource
+import schema
 
 # --- BACKEND LOGIC ---
 
@@ -210,7 +213,7 @@ class MCQExtractorApp:
         self.root.geometry("750x800")
         
         self.pdf_path = tk.StringVar()
-        self.db_path = tk.StringVar(value="mcqs.db") # <--- CHANGED: Default to .db
+        self.db_path = tk.StringVar()  # empty: the category's primary/shard file (datasource.py)
         
         self.start_set_id = tk.IntVar(value=1)
         self.category = tk.StringVar(value="General Knowledge")
@@ -246,6 +249,8 @@ class MCQExtractorApp:
         # <--- CHANGED: Label and Command for Database
         ttk.Button(frame_files, text="Select Database Output", command=self.browse_db).grid(row=1, column=0, pady=5, sticky="w")
         ttk.Entry(frame_files, textvariable=self.db_path, width=50).grid(row=1, column=1, padx=5, sticky="ew")
+        ttk.Label(frame_files, text="Leave empty to write where the category is routed (see datasource.py).",
+                  foreground="gray").grid(row=2, column=1, padx=5, sticky="w")
         frame_files.columnconfigure(1, weight=1)
 
         frame_meta = ttk.LabelFrame(self.root, text="Metadata Configuration", padding=10)
@@ -308,27 +313,13 @@ class MCQExtractorApp:
             self.log(f"Queued {len(model_queue)} models (Vision First, Unsupported Last).")
 
             # <--- ADDED: Database Connection Logic
-            db_file = self.db_path.get()
+            # With datasources.json this is a primary/shard file, so the live site's
+            # snapshot is untouched until someone promotes
+            db_file = self.db_path.get().strip() or datasource.write_path(self.category.get())
             self.log(f"Connecting to database: {db_file}")
-            conn = sqlite3.connect(db_file)
+            # Ensure Table Exists (plus the categories table / category_id triggers)
+            conn = datasource.connect_source(db_file)
             cursor = conn.cursor()
-            
-            # Ensure Table Exists
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS questions (
-                    id TEXT PRIMARY KEY,
-                    set_id INTEGER,
-                    category TEXT,
-                    tag TEXT,
-                    description TEXT,
-                    question TEXT,
-                    image_url TEXT,
-                    options TEXT,
-                    correct TEXT,
-                    explanation TEXT
-                )
-            ''')
-            conn.commit()
 
             self.log("Chunking PDF...")
             reader = PdfReader(self.pdf_path.get())
@@ -354,6 +345,7 @@ class MCQExtractorApp:
                 
                 if extracted_list:
                     self.log(f"  > Success! {len(extracted_list)} questions found. Inserting into DB...")
+                    touched = set()
                     
                     for q in extracted_list:
                         set_offset = new_q_count // 20
@@ -383,9 +375,14 @@ class MCQExtractorApp:
                                 q.get("explanation", "")
                             ))
                             new_q_count += 1
+                            touched.add((self.category.get(), current_set_id))
                         except Exception as insert_err:
                             self.log(f"  ⚠️ Insert Error: {insert_err}")
                     
+                    schema.refresh_category_sets(conn, touched)  # keep the browse pages in step
+                    _, queued = answer_key.resolve_pending(conn)
+                    if queued:
+                        self.log(f"  ⚠️ {queued} answers match no option; see: python answer_key.py list")
                     conn.commit() # Commit after every chunk
                 
                 try: os.remove(chunk_path)
@@ -0,0 +1,264 @@
+import bisect
+import hmac
+import os
+import sqlite3
+import threading
+import time
+
+from flask import abort, make_response, request, before_render_template, template_rendered
+
+import querylog
+
+# --- CONFIGURATION ---
+PREFIX = 'codewme'
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # /metrics is disabled unless this is set (sent as Authorization: Bearer)
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# name -> {labels tuple: Histogram}; name -> {labels tuple: float}
+_histograms = {}
+_counters = {}
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect.bisect_left(BUCKETS, value)
+        if i < len(BUCKETS):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+def observe(name, labels, value):
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        hist = series.get(labels)
+        if hist is None:
+            hist = series[labels] = Histogram()
+        hist.observe(value)
+
+
+def inc(name, labels, amount=1):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+
+# --- PER-REQUEST STATE (thread-local, no Flask context needed) ---
+
+class RequestStats:
+    __slots__ = ('start', 'sql_count', 'sql_time', 'tpl_time', 'tpl_started', 'cache_hits', 'cache_misses')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.tpl_time = 0.0
+        self.tpl_started = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+def current():
+    """Stats for the request running on this thread (None outside a request)."""
+    return getattr(_local, 'stats', None)
+
+
+def record_sql(elapsed):
+    stats = current()
+    if stats is not None:
+        stats.sql_count += 1
+        stats.sql_time += elapsed
+
+
+_cache_labels = {}
+
+def record_cache(cache, hit):
+    labels = _cache_labels.get((cache, hit))
+    if labels is None:
+        labels = _cache_labels[(cache, hit)] = (('cache', cache), ('result', 'hit' if hit else 'miss'))
+    inc('cache_requests_total', labels)
+    stats = current()
+    if stats is not None:
+        if hit:
+            stats.cache_hits += 1
+        else:
+            stats.cache_misses += 1
+
+
+# --- SQLITE INSTRUMENTATION ---
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Times execute + fetch calls (SQLite does most SELECT work while fetching)."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_sql(elapsed)
+            querylog.observe(self, sql, parameters, elapsed)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            _add_sql_time(self, time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(size if size is not None else self.arraysize)
+        finally:
+            _add_sql_time(self, time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            _add_sql_time(self, time.perf_counter() - start)
+
+
+def _add_sql_time(cursor, elapsed):
+    stats = current()
+    if stats is not None:
+        stats.sql_time += elapsed
+    querylog.add_fetch(cursor, elapsed)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose conn.execute() shortcut goes through InstrumentedCursor."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+
+# --- PROMETHEUS TEXT FORMAT ---
+
+def _fmt_labels(labels, extra=()):
+    pairs = tuple(labels) + tuple(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs) + '}'
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            lines.append(f'# TYPE {PREFIX}_{name} histogram')
+            for labels, hist in series.items():
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f'{PREFIX}_{name}_bucket{_fmt_labels(labels, (("le", bound),))} {cumulative}')
+                lines.append(f'{PREFIX}_{name}_bucket{_fmt_labels(labels, (("le", "+Inf"),))} {hist.count}')
+                lines.append(f'{PREFIX}_{name}_sum{_fmt_labels(labels)} {hist.sum}')
+                lines.append(f'{PREFIX}_{name}_count{_fmt_labels(labels)} {hist.count}')
+        for name, series in sorted(_counters.items()):
+            lines.append(f'# TYPE {PREFIX}_{name} counter')
+            for labels, value in series.items():
+                lines.append(f'{PREFIX}_{name}{_fmt_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- FLASK WIRING ---
+
+def init_app(app):
+    """
+    Per-request timing: route latency, SQL count/time, template time, cache hits.
+    Exposed at /metrics (Prometheus text) and as a Server-Timing header.
+    Metrics are per process; scrape each worker or aggregate upstream.
+    Register this before other after_request hooks so its timing covers them.
+    """
+    app.config.setdefault('METRICS_ENABLED', True)
+
+    @app.before_request
+    def _start_timer():
+        if app.config['METRICS_ENABLED']:
+            _local.stats = RequestStats()
+
+    # (rule, method, status) -> label tuples, so the hot path allocates nothing new
+    label_cache = {}
+
+    @app.after_request
+    def _record_request(response):
+        stats = getattr(_local, 'stats', None)
+        if stats is None:
+            return response
+        _local.stats = None
+        elapsed = time.perf_counter() - stats.start
+        req = request._get_current_object()
+        route = req.url_rule.rule if req.url_rule else 'unmatched'
+        key = (route, req.method, response.status_code)
+        labels = label_cache.get(key)
+        if labels is None:
+            labels = label_cache[key] = (
+                (('route', route), ('method', req.method), ('status', response.status_code)),
+                (('route', route),),
+            )
+        with _lock:
+            series = _histograms.setdefault('http_request_duration_seconds', {})
+            hist = series.get(labels[0])
+            if hist is None:
+                hist = series[labels[0]] = Histogram()
+            hist.observe(elapsed)
+            if stats.sql_count:
+                queries = _counters.setdefault('sql_queries_total', {})
+                queries[labels[1]] = queries.get(labels[1], 0) + stats.sql_count
+                seconds = _counters.setdefault('sql_seconds_total', {})
+                seconds[labels[1]] = seconds.get(labels[1], 0) + stats.sql_time
+        response.headers['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.2f}, '
+            f'db;dur={stats.sql_time * 1000:.2f};desc="{stats.sql_count} queries", '
+            f'tpl;dur={stats.tpl_time * 1000:.2f}, '
+            f'cache;desc="{stats.cache_hits} hit {stats.cache_misses} miss"'
+        )
+        return response
+
+    def _template_start(sender, template, context, **extra):
+        stats = current()
+        if stats is not None:
+            stats.tpl_started.append(time.perf_counter())
+
+    def _template_done(sender, template, context, **extra):
+        stats = current()
+        if stats is not None and stats.tpl_started:
+            elapsed = time.perf_counter() - stats.tpl_started.pop()
+            stats.tpl_time += elapsed
+            observe('template_render_seconds', (('template', template.name),), elapsed)
+
+    before_render_template.connect(_template_start, app, weak=False)
+    template_rendered.connect(_template_done, app, weak=False)
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        if not METRICS_TOKEN:
+            abort(404)
+        # Header only: a query-string token would end up in access and proxy logs
+        scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.encode(), METRICS_TOKEN.encode()):
+            abort(403)
+        response = make_response(render_prometheus())
+        response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+
+def record_error(route):
+    inc('errors_total', (('route', route),))
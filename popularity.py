@@ -0,0 +1,238 @@
+import atexit
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# --- CONFIGURATION ---
+POPULARITY_DB = os.environ.get('POPULARITY_DB', 'popularity.db')
+FLUSH_SECONDS = float(os.environ.get('POPULARITY_FLUSH_SECONDS', 10))
+HALF_LIFE_SECONDS = float(os.environ.get('POPULARITY_HALF_LIFE_DAYS', 3)) * 86400
+TOP_K = 50
+DECAY = math.log(2) / HALF_LIFE_SECONDS
+# Scores are stored relative to an epoch: a view at time t adds exp(DECAY * (t - epoch)).
+# Ranking by that is the same as ranking by the decayed score, and it only ever grows,
+# so a view is one addition. Past this exponent everything is rebased to a new epoch.
+REBASE_EXPONENT = 200.0
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS views (
+        kind TEXT NOT NULL,
+        key TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        score REAL NOT NULL,
+        PRIMARY KEY (kind, key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_views_kind_score ON views (kind, score DESC);
+    CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value REAL NOT NULL);
+'''
+
+_lock = threading.Lock()
+_pending = {}           # (kind, key) -> [views, weight relative to _epoch]
+_epoch = None           # this process's copy of meta.epoch
+_top = {}               # kind -> tuple of keys, most popular first (at most TOP_K)
+_flusher_pid = None
+
+
+def _connect():
+    conn = sqlite3.connect(POPULARITY_DB, timeout=10)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _db_epoch(conn):
+    row = conn.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()
+    if row:
+        return row[0]
+    now = time.time()
+    conn.execute("INSERT INTO meta (name, value) VALUES ('epoch', ?)", (now,))
+    return now
+
+
+# --- HOT PATH (per request: one dict update under a lock) ---
+
+def record_view(kind, key):
+    """Counts one view of an 'article' (slug) or 'set' ('<category slug>/<set num>')."""
+    global _epoch
+    _ensure_flusher()
+    now = time.time()
+    with _lock:
+        if _epoch is None:
+            _epoch = now  # reconciled with the DB's epoch at flush time
+        weight = math.exp(DECAY * (now - _epoch))
+        entry = _pending.get((kind, key))
+        if entry is None:
+            _pending[(kind, key)] = [1, weight]
+        else:
+            entry[0] += 1
+            entry[1] += weight
+
+
+# --- PERIODIC FLUSH + TOP-K REFRESH ---
+
+def flush():
+    """Folds pending views into the DB in one transaction, then reloads the top-K lists."""
+    global _epoch
+    with _lock:
+        batch, local_epoch = dict(_pending), _epoch
+        _pending.clear()
+
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                epoch = _db_epoch(conn)
+                if time.time() - epoch > REBASE_EXPONENT / DECAY:
+                    new_epoch = time.time()
+                    conn.execute('UPDATE views SET score = score * ?', (math.exp(DECAY * (epoch - new_epoch)),))
+                    conn.execute("UPDATE meta SET value = ? WHERE name = 'epoch'", (new_epoch,))
+                    epoch = new_epoch
+                if batch:
+                    # Weights were taken against this process's epoch; convert to the DB's
+                    scale = math.exp(DECAY * (local_epoch - epoch))
+                    conn.executemany('''
+                        INSERT INTO views (kind, key, total, score) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (kind, key) DO UPDATE SET
+                            total = total + excluded.total,
+                            score = score + excluded.score
+                    ''', [(kind, key, n, w * scale) for (kind, key), (n, w) in batch.items()])
+
+            top = {}
+            for kind in ('article', 'set'):
+                rows = conn.execute('SELECT key FROM views WHERE kind = ? ORDER BY score DESC LIMIT ?',
+                                    (kind, TOP_K)).fetchall()
+                top[kind] = tuple(r[0] for r in rows)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        with _lock:
+            for k, (n, w) in batch.items():
+                entry = _pending.setdefault(k, [0, 0.0])
+                entry[0] += n
+                entry[1] += w
+        print(f'[popularity] flush failed, will retry: {e}', file=sys.stderr)
+        return
+
+    with _lock:
+        if _epoch != epoch:
+            # Re-express anything recorded since the copy in the DB's epoch
+            scale = math.exp(DECAY * (_epoch - epoch)) if _epoch is not None else 1.0
+            for entry in _pending.values():
+                entry[1] *= scale
+            _epoch = epoch
+        for kind, keys in top.items():
+            if _top.get(kind) != keys:
+                _top[kind] = keys  # same tuple object when unchanged keeps rankings cached
+
+
+def _run_flusher():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        flush()
+
+
+def _ensure_flusher():
+    """Starts this process's flusher, which also keeps _top current for readers."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid == os.getpid():
+            return
+        if _flusher_pid is not None:
+            _pending.clear()  # inherited across fork; the parent flushes its own copy
+        _flusher_pid = os.getpid()
+    threading.Thread(target=_run_flusher, name='popularity-flusher', daemon=True).start()
+
+
+def _reset_lock_in_child():
+    global _lock
+    _lock = threading.Lock()  # a parent's flusher may have held it at fork time
+
+
+os.register_at_fork(after_in_child=_reset_lock_in_child)
+
+
+def load():
+    """
+    Loads the current top-K without waiting for the first flush (worker
+    warmup) and starts the refresher, so a worker that only serves rankings
+    and never records a view still sees them move.
+    """
+    _ensure_flusher()
+    if os.path.exists(POPULARITY_DB):
+        flush()
+
+
+# --- READ SIDE (all in memory) ---
+
+def top(kind, limit=TOP_K):
+    """Most popular keys of `kind`, best first."""
+    _ensure_flusher()
+    return _top.get(kind, ())[:limit]
+
+
+def set_key(mcq_set):
+    return f'{mcq_set.url_slug}/{mcq_set.set_num}'
+
+
+def article_key(article):
+    return article.slug
+
+
+# kind -> (items, top tuple, trending head, full ranking). `items` are the cached
+# tuples from utils and the top tuple is replaced on every flush, so identity
+# checks tell us when to rebuild; otherwise a ranking costs nothing per request.
+_rankings = {}
+
+def _ranking(kind, items, key):
+    _ensure_flusher()  # read-only workers need the refresher too, not just record_view()
+    top_keys = _top.get(kind, ())
+    cached = _rankings.get(kind)
+    if cached and cached[0] is items and cached[1] is top_keys:
+        return cached
+    by_key = {key(item): item for item in items}
+    head = tuple(by_key[k] for k in top_keys if k in by_key)
+    picked = set(map(id, head))
+    ranked = head + tuple(item for item in items if id(item) not in picked)
+    _rankings[kind] = cached = (items, top_keys, head, ranked)
+    return cached
+
+
+def trending(kind, items, key, limit):
+    """The most viewed of `items` (only ones with views), best first."""
+    return _ranking(kind, items, key)[2][:limit]
+
+
+def rank(kind, items, key):
+    """All of `items`: top-K by score first, then the rest in their given order."""
+    return _ranking(kind, items, key)[3]
+
+
+atexit.register(flush)
+
+
+if __name__ == '__main__':
+    # python popularity.py report [--top 20]  -> current decayed scores
+    import argparse
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    rep = sub.add_parser('report')
+    rep.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(POPULARITY_DB):
+        sys.exit(f'No popularity DB at {POPULARITY_DB}')
+    conn = sqlite3.connect(POPULARITY_DB)
+    row = conn.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()
+    decay = math.exp(-DECAY * (time.time() - row[0])) if row else 1.0
+    for kind in ('article', 'set'):
+        print(f"{kind + 's':40} {'views':>8} {'score':>10}")
+        for key, total, score in conn.execute(
+                'SELECT key, total, score FROM views WHERE kind = ? ORDER BY score DESC LIMIT ?', (kind, args.top)):
+            print(f'{key:40} {total:8d} {score * decay:10.2f}')
+        print()
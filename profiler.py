@@ -0,0 +1,217 @@
+import hmac
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+from flask import abort, jsonify, request
+
+# --- CONFIGURATION ---
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles'))
+PROFILER_TOKEN = os.environ.get('PROFILER_TOKEN')  # /admin/profile is disabled unless this is set (sent as Authorization: Bearer)
+DEFAULT_HZ = 100
+DEFAULT_SECONDS = 30
+MAX_HZ = 1000
+MAX_SECONDS = 300
+MAX_DEPTH = 128
+
+# thread ident -> route rule of the request it is serving (only filled while sampling)
+_routes = {}
+_session = None
+_session_lock = threading.Lock()
+
+
+def _frame_name(code):
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class Session:
+    """One sampling run: a daemon thread that walks request threads' stacks at `hz`."""
+
+    def __init__(self, seconds, hz, out_dir=PROFILE_DIR):
+        self.seconds = seconds
+        self.hz = hz
+        self.out_dir = out_dir
+        self.prefix = os.path.join(out_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}')
+        self.samples = {}  # route -> {stack tuple (root first): count}
+        self.total = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+    def _run(self):
+        interval = 1.0 / self.hz
+        deadline = time.monotonic() + self.seconds
+        own = threading.get_ident()
+        try:
+            while not self.stopped.is_set() and time.monotonic() < deadline:
+                self._sample(own)
+                self.stopped.wait(interval)
+            self.write()
+        finally:
+            _finish(self)
+
+    def _sample(self, own):
+        frames = sys._current_frames()
+        for ident, route in list(_routes.items()):
+            if ident == own:
+                continue
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_DEPTH:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            per_route = self.samples.setdefault(route, {})
+            key = tuple(stack)
+            per_route[key] = per_route.get(key, 0) + 1
+            self.total += 1
+
+    def write(self):
+        """<prefix>.collapsed (all routes, route as the root frame) + <prefix>.speedscope.json."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        with open(self.prefix + '.collapsed', 'w', encoding='utf-8') as f:
+            for route, stacks in sorted(self.samples.items()):
+                for stack, count in stacks.items():
+                    f.write(';'.join((route,) + stack) + f' {count}\n')
+
+        frames, index = [], {}
+        profiles = []
+        for route, stacks in sorted(self.samples.items()):
+            samples, weights = [], []
+            for stack, count in stacks.items():
+                ids = []
+                for name in stack:
+                    if name not in index:
+                        index[name] = len(frames)
+                        frames.append({'name': name})
+                    ids.append(index[name])
+                samples.append(ids)
+                weights.append(count)
+            profiles.append({
+                'type': 'sampled', 'name': route, 'unit': 'none',
+                'startValue': 0, 'endValue': sum(weights),
+                'samples': samples, 'weights': weights,
+            })
+        with open(self.prefix + '.speedscope.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                '$schema': 'https://www.speedscope.app/file-format-schema.json',
+                'name': os.path.basename(self.prefix),
+                'shared': {'frames': frames},
+                'profiles': profiles,
+            }, f)
+
+    def describe(self):
+        return {
+            'pid': os.getpid(),
+            'hz': self.hz,
+            'seconds': self.seconds,
+            'collapsed': self.prefix + '.collapsed',
+            'speedscope': self.prefix + '.speedscope.json',
+        }
+
+
+def _finish(session):
+    global _session
+    with _session_lock:
+        if _session is session:
+            _session = None
+            _routes.clear()
+
+
+def start(seconds=DEFAULT_SECONDS, hz=DEFAULT_HZ, blocking=True):
+    """
+    Starts a sampling run in this process. Returns None if one is already
+    running (or, with blocking=False, if another thread is starting one).
+    """
+    global _session
+    seconds = max(1, min(int(seconds), MAX_SECONDS))
+    hz = max(1, min(int(hz), MAX_HZ))
+    if not _session_lock.acquire(blocking):
+        return None
+    try:
+        if _session is not None:
+            return None
+        _session = Session(seconds, hz)
+        _session.start()
+        return _session
+    finally:
+        _session_lock.release()
+
+
+def install_signal_handler(signum=signal.SIGUSR2):
+    """
+    `kill -USR2 <worker pid>` profiles that worker for PROFILE_SECONDS (default 30s).
+    Must run in the worker's main thread after the server has set up its own
+    signals (gunicorn: post_worker_init).
+    """
+    def _handler(signum, frame):
+        # Runs on the main thread, which (sync workers) may be inside start() for
+        # POST /admin/profile holding _session_lock: waiting here would deadlock
+        session = start(int(os.environ.get('PROFILE_SECONDS', DEFAULT_SECONDS)),
+                        int(os.environ.get('PROFILE_HZ', DEFAULT_HZ)), blocking=False)
+        if session is not None:
+            print(f'[profiler] sampling pid {os.getpid()} -> {session.prefix}.*', file=sys.stderr)
+        else:
+            print(f'[profiler] pid {os.getpid()} is already running or starting a profile; signal ignored', file=sys.stderr)
+
+    signal.signal(signum, _handler)
+
+
+# --- FLASK WIRING ---
+
+def init_app(app):
+    """
+    Tags request threads with their route while a session runs (a dict write per
+    request otherwise skipped), and adds POST /admin/profile?seconds=&hz= which
+    profiles the worker that happens to receive it.
+    """
+    @app.before_request
+    def _tag_thread():
+        if _session is not None:
+            rule = request.url_rule
+            _routes[threading.get_ident()] = rule.rule if rule else 'unmatched'
+
+    @app.teardown_request
+    def _untag_thread(exc):
+        if _routes:
+            _routes.pop(threading.get_ident(), None)
+
+    @app.route('/admin/profile', methods=['POST'])
+    def admin_profile():
+        if not PROFILER_TOKEN:
+            abort(404)
+        scheme, _, supplied = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not hmac.compare_digest(supplied.encode(), PROFILER_TOKEN.encode()):
+            abort(403)
+        session = start(request.args.get('seconds', DEFAULT_SECONDS, type=int),
+                        request.args.get('hz', DEFAULT_HZ, type=int))
+        if session is None:
+            return jsonify({'error': 'a profile is already running in this worker', 'pid': os.getpid()}), 409
+        return jsonify(session.describe()), 202
+
+
+if __name__ == '__main__':
+    # Merge several .collapsed files (e.g. one per worker) for flamegraph.pl / speedscope.
+    if len(sys.argv) < 2:
+        sys.exit('usage: python profiler.py merge FILE.collapsed [...] > merged.collapsed')
+    if sys.argv[1] == 'merge':
+        merged = {}
+        for path in sys.argv[2:]:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    merged[stack] = merged.get(stack, 0) + int(count)
+        for stack, count in sorted(merged.items()):
+            print(f'{stack} {count}')
+    else:
+        sys.exit(f'Unknown command: {sys.argv[1]}')
@@ -0,0 +1,150 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Fed by metrics.InstrumentedCursor. The first run of each distinct statement
+# captures its EXPLAIN QUERY PLAN (full table scans are logged as warnings);
+# any execution whose execute+fetch time crosses SLOW_QUERY_MS is logged with
+# its parameters. Both go to SLOW_QUERY_LOG as JSON lines shared by all workers.
+#
+#   python querylog.py report [--log FILE] [--top 20]
+#
+# ranks statements by total logged time. SLOW_QUERY_MS=0 logs every execution.
+
+# --- CONFIGURATION ---
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 50))
+SLOW_QUERY_LOG = os.environ.get(
+    'SLOW_QUERY_LOG', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs', 'slow_queries.jsonl'))
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+logger = logging.getLogger(__name__)
+_lock = threading.Lock()
+_normalized = {}  # raw sql -> whitespace-collapsed statement
+_plans = {}       # statement -> list of plan detail strings
+
+
+def _normalize(sql):
+    key = _normalized.get(sql)
+    if key is None:
+        key = _normalized[sql] = ' '.join(sql.split())
+    return key
+
+
+def is_full_scan(detail):
+    """'SCAN questions' (3.36+) / 'SCAN TABLE questions' read every row; index scans don't count."""
+    return detail.startswith('SCAN') and 'INDEX' not in detail
+
+
+def _write(record):
+    record['ts'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    record['pid'] = os.getpid()
+    line = json.dumps(record, default=str) + '\n'
+    try:
+        with _lock:
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG), exist_ok=True)
+            with open(SLOW_QUERY_LOG, 'a', encoding='utf-8') as f:
+                f.write(line)
+    except OSError:
+        logger.exception('could not write %s', SLOW_QUERY_LOG)
+
+
+def _capture_plan(connection, statement, sql, parameters):
+    if not statement.upper().startswith(EXPLAINABLE):
+        return
+    try:
+        # A plain sqlite3.Cursor so the EXPLAIN itself isn't instrumented.
+        rows = sqlite3.Cursor(connection).execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+    except sqlite3.Error as e:
+        logger.debug('EXPLAIN failed for %s: %s', statement, e)
+        return
+    plan = [row[3] for row in rows]
+    _plans[statement] = plan
+    scans = [d for d in plan if is_full_scan(d)]
+    if scans:
+        logger.warning('full table scan: %s -> %s', statement, '; '.join(scans))
+    _write({'type': 'plan', 'sql': statement, 'plan': plan, 'full_scan': bool(scans)})
+
+
+def observe(cursor, sql, parameters, elapsed):
+    statement = _normalize(sql)
+    if statement not in _plans:
+        _plans[statement] = None  # claim it before EXPLAIN so concurrent threads don't repeat it
+        _capture_plan(cursor.connection, statement, sql, parameters)
+    # [statement, params, elapsed so far, already logged]
+    cursor._querylog = state = [statement, parameters, elapsed, False]
+    _check(state)
+
+
+def add_fetch(cursor, elapsed):
+    state = getattr(cursor, '_querylog', None)
+    if state is not None:
+        state[2] += elapsed
+        _check(state)
+
+
+def _check(state):
+    if state[3] or state[2] * 1000 < SLOW_QUERY_MS:
+        return
+    state[3] = True
+    statement, parameters, elapsed = state[0], state[1], state[2]
+    plan = _plans.get(statement) or []
+    logger.warning('slow query (%.1f ms): %s %r', elapsed * 1000, statement, parameters)
+    _write({
+        'type': 'slow', 'sql': statement, 'params': list(parameters) if parameters else [],
+        'ms': round(elapsed * 1000, 3), 'full_scan': any(is_full_scan(d) for d in plan),
+    })
+
+
+# --- REPORT ---
+
+def report(path, top):
+    statements = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            entry = statements.setdefault(record['sql'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                                                          'plan': [], 'full_scan': False, 'example': None})
+            if record['type'] == 'plan':
+                entry['plan'] = record['plan']
+                entry['full_scan'] = record['full_scan']
+            elif record['type'] == 'slow':
+                entry['count'] += 1
+                entry['total_ms'] += record['ms']
+                if record['ms'] >= entry['max_ms']:
+                    entry['max_ms'] = record['ms']
+                    entry['example'] = record['params']
+
+    ranked = sorted(statements.items(), key=lambda item: item[1]['total_ms'], reverse=True)
+    print(f"{'total ms':>10} {'count':>6} {'avg ms':>8} {'max ms':>8}  statement")
+    for sql, e in ranked[:top]:
+        avg = e['total_ms'] / e['count'] if e['count'] else 0.0
+        flag = '  [FULL SCAN]' if e['full_scan'] else ''
+        print(f"{e['total_ms']:10.1f} {e['count']:6d} {avg:8.2f} {e['max_ms']:8.2f}  {sql}{flag}")
+        for detail in e['plan']:
+            print(f"{'':37}plan: {detail}")
+        if e['example'] is not None:
+            print(f"{'':37}slowest params: {e['example']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    rep = sub.add_parser('report', help='worst statements by total time')
+    rep.add_argument('--log', default=SLOW_QUERY_LOG)
+    rep.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+    if not os.path.exists(args.log):
+        sys.exit(f'No slow-query log at {args.log}')
+    report(args.log, args.top)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+class Record:
+    """
+    Compact, read-only row for the in-memory content snapshots.
+    Uses __slots__ (no per-instance __dict__) so thousands of them stay small
+    and, once gc.freeze()'d in the gunicorn master, are shared copy-on-write.
+    Supports both r.field (templates) and r['field'] / r.get() (old dict code).
+    """
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Article(Record):
+    __slots__ = ('title', 'slug', 'video_id', 'date', 'category', 'description', 'placeholder_text')
+
+
+class Contest(Record):
+    __slots__ = ('id', 'title', 'tag', 'description', 'start_date', 'end_date', 'image_url', 'price')
+
+
+class McqSet(Record):
+    __slots__ = ('category', 'set_num', 'tag', 'description', 'url_slug', 'question_count')
+
+
+class Category(Record):
+    __slots__ = ('id', 'name', 'slug')
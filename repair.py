@@ -0,0 +1,239 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import answer_key
+import datasource
+import schema
+
+# Declarative data repairs for mcqs.db. Each rule is a WHERE clause over
+# `questions` plus either column rewrites (an UPDATE), a delete, or nothing
+# (report only). Every rule is a single set-based statement, rules run in
+# order inside one transaction, and a dry run rolls that transaction back, so
+# the report always shows exactly what --apply would do (later rules see the
+# effect of earlier ones).
+#
+#   python repair.py [--db PATH] [--rule NAME ...] [--samples 3]   # dry run
+#   python repair.py --apply
+#
+# Without --db every datasource.write_paths() file is repaired in turn: mcqs.db,
+# or the configured primary and shards. The promoted snapshot is refused, the
+# fixes reach the site with the next promote.
+#
+# For JSON dumps use `bank.py import --transform fix_swapped_fields`.
+
+# --- CONFIGURATION ---
+KNOWN_TAGS = ('SALESFORCE',)  # tag values extraction is allowed to produce
+LETTER_PREFIX = "[A-Ea-e][.)] *"  # GLOB for options written as 'A. text' / 'b) text'
+
+_KNOWN_TAGS_SQL = ', '.join(f"'{t}'" for t in KNOWN_TAGS)
+
+
+def _json_array(select_expr, source, where='1'):
+    """SQL rebuilding a JSON array from the elements `e` of `source`, in their original order."""
+    return (f'(SELECT json_group_array({select_expr}) FROM '
+            f'(SELECT key, value FROM json_each({source}) WHERE {where} ORDER BY key) AS e)')
+
+# The option a correct value `e` names, ignoring case/outer spaces and an 'A. ' prefix on the answer
+_MATCHING_OPTION = f'''(SELECT o.value FROM json_each(questions.options) o
+        WHERE lower(trim(o.value)) = lower(trim(e.value))
+           OR (e.value GLOB '{LETTER_PREFIX}' AND lower(trim(o.value)) = lower(trim(substr(e.value, 4))))
+        ORDER BY o.key LIMIT 1)'''
+# Most rows have one answer: '["X"]' is fine if '"X"' occurs in the options text, a
+# plain substring test that spares the json_each join on clean rows.
+_CORRECT_NOT_IN_OPTIONS = '''json_valid(correct) AND json_type(correct) = 'array'
+    AND (json_array_length(correct) <> 1 OR instr(options, substr(correct, 2, length(correct) - 2)) = 0)
+    AND EXISTS (
+        SELECT 1 FROM json_each(questions.correct) c
+        WHERE c.value NOT IN (SELECT value FROM json_each(questions.options)))'''
+
+RULES = (
+    {
+        'name': 'swapped_fields',
+        'description': 'category holds the tag and tag holds the category: swap them back',
+        'where': f"upper(trim(category)) IN ({_KNOWN_TAGS_SQL}) AND upper(trim(tag)) NOT IN ({_KNOWN_TAGS_SQL})",
+        'set': {'tag': 'category', 'category': 'tag'},  # SET reads the old values, so this swaps
+    },
+    {
+        'name': 'tag_case',
+        'description': 'tags are upper case without surrounding spaces',
+        'where': 'tag IS NOT NULL AND tag <> upper(trim(tag))',
+        'set': {'tag': 'upper(trim(tag))'},
+    },
+    {
+        'name': 'correct_not_array',
+        'description': 'correct stored as a single answer (JSON string or bare text): wrap it in a list',
+        'where': "substr(ltrim(correct), 1, 1) <> '[' AND CASE WHEN json_valid(correct) "
+                 "THEN json_type(correct) = 'text' ELSE trim(correct) <> '' END",
+        'set': {'correct': "json_array(CASE WHEN json_valid(correct) THEN json_extract(correct, '$') ELSE correct END)"},
+    },
+    {
+        'name': 'option_letter_prefix',
+        'description': "options carry their own 'A. ' labels (the page adds them): strip them",
+        # Cheap test first: the first option's third character is '.' or ')'
+        'where': f'''substr(ltrim(options, '[ '), 3, 1) IN ('.', ')')
+            AND json_valid(options) AND json_array_length(options) > 0 AND NOT EXISTS (
+            SELECT 1 FROM json_each(questions.options) WHERE value NOT GLOB '{LETTER_PREFIX}')''',
+        'set': {'options': _json_array('trim(substr(value, 4))', 'questions.options')},
+    },
+    {
+        'name': 'empty_options',
+        'description': 'blank option strings are dropped',
+        # A blank element shows up in the JSON text as "" or as a quote followed by a space
+        'where': '''(instr(options, '""') > 0 OR instr(options, '" ') > 0) AND json_valid(options)
+            AND EXISTS (SELECT 1 FROM json_each(questions.options) WHERE trim(value) = '')''',
+        'set': {'options': _json_array('value', 'questions.options', "trim(value) <> ''")},
+    },
+    {
+        'name': 'correct_text_mismatch',
+        'description': 'correct values that differ from an option only by case/spacing/letter prefix',
+        'where': _CORRECT_NOT_IN_OPTIONS,
+        'set': {'correct': _json_array(f'COALESCE({_MATCHING_OPTION}, value)', 'questions.correct')},
+    },
+    {
+        'name': 'correct_unresolved',
+        'description': 'REPORT ONLY: correct answers still not among the options (or none given)',
+        'where': f"NOT json_valid(correct) OR json_array_length(correct) = 0 OR ({_CORRECT_NOT_IN_OPTIONS})",
+    },
+    {
+        'name': 'too_few_options',
+        'description': 'REPORT ONLY: fewer than two options',
+        'where': 'NOT json_valid(options) OR json_array_length(options) < 2',
+    },
+    {
+        'name': 'duplicate_questions',
+        'description': 'same category, question text and options: keep the first row',
+        'where': '''rowid NOT IN (
+            SELECT MIN(rowid) FROM questions GROUP BY category_id, lower(trim(question)), options)''',
+        'delete': True,
+        'whole_table': True,  # a row's match depends on other rows
+    },
+)
+
+
+def _sample(conn, rule, limit):
+    """Up to `limit` (id, [(column, before, after)]) from the rows in temp._hits."""
+    columns = list(rule.get('set', {}))
+    if columns:
+        select = ', '.join(f'{c}, {expr}' for c, expr in rule['set'].items())
+    else:
+        select = 'question'
+    rows = conn.execute(f"SELECT id, {select} FROM questions WHERE rowid IN (SELECT rowid FROM temp._hits) "
+                        f"LIMIT ?", (limit,)).fetchall()
+    samples = []
+    for row in rows:
+        if columns:
+            changes = [(c, row[1 + 2 * i], row[2 + 2 * i]) for i, c in enumerate(columns)]
+        else:
+            changes = [('question', row[1], None)]
+        samples.append((row[0], changes))
+    return samples
+
+
+def run(conn, rules=RULES, apply=False, samples=3):
+    """
+    Runs `rules` in one transaction; commits only if `apply`.
+    Returns [(rule, rows affected or matched, samples, seconds)].
+
+    One scan collects every row any per-row rule matches (temp._candidates);
+    each rule then only looks at those, and fixes only ever touch them, so
+    the table is read once instead of once per rule. whole_table rules
+    (duplicates) still see every row.
+    """
+    conn.execute('PRAGMA temp_store = MEMORY')
+    report = []
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        per_row = [r for r in rules if not r.get('whole_table')]
+        start = time.perf_counter()
+        conn.execute('DROP TABLE IF EXISTS temp._candidates')
+        conn.execute('CREATE TEMP TABLE _candidates (id INTEGER PRIMARY KEY)')
+        if per_row:
+            conn.execute('INSERT INTO temp._candidates SELECT rowid FROM questions WHERE ' +
+                         ' OR '.join(f"({r['where']})" for r in per_row))
+        report.append(({'name': 'scan', 'description': 'rows matching any per-row rule'},
+                       conn.execute('SELECT COUNT(*) FROM temp._candidates').fetchone()[0], [],
+                       time.perf_counter() - start))
+
+        for rule in rules:
+            start = time.perf_counter()
+            scope = '' if rule.get('whole_table') else 'rowid IN (SELECT id FROM temp._candidates) AND '
+            conn.execute('DROP TABLE IF EXISTS temp._hits')
+            conn.execute(f"CREATE TEMP TABLE _hits AS SELECT rowid FROM questions WHERE {scope}({rule['where']})")
+            count = conn.execute('SELECT COUNT(*) FROM temp._hits').fetchone()[0]
+            examples = _sample(conn, rule, samples) if samples and count else []
+            if count and rule.get('delete'):
+                conn.execute('DELETE FROM questions WHERE rowid IN (SELECT rowid FROM temp._hits)')
+            elif count and rule.get('set'):
+                assignments = ', '.join(f'{c} = {expr}' for c, expr in rule['set'].items())
+                conn.execute(f'UPDATE questions SET {assignments} WHERE rowid IN (SELECT rowid FROM temp._hits)')
+            report.append((rule, count, examples, time.perf_counter() - start))
+        schema.refresh_category_sets(conn)
+        answer_key.resolve_pending(conn)  # rewritten answers/options get new indices
+        conn.execute('COMMIT' if apply else 'ROLLBACK')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.execute('DROP TABLE IF EXISTS temp._hits')
+        conn.execute('DROP TABLE IF EXISTS temp._candidates')
+    return report
+
+
+def print_report(report, applied):
+    for rule, count, examples, seconds in report:
+        fixes = rule.get('set') or rule.get('delete')
+        if not fixes:
+            verb = 'found'
+        else:
+            verb = 'deleted' if rule.get('delete') else 'fixed'
+            if not applied:
+                verb = 'would be ' + verb
+        print(f"{rule['name']:22} {count:8d} {verb:16} ({seconds * 1000:.0f} ms)  {rule['description']}")
+        for qid, changes in examples:
+            for column, before, after in changes:
+                if rule.get('delete') or not fixes:
+                    print(f'    {qid}  {column}: {before!r}')
+                else:
+                    print(f'    {qid}  {column}: {before!r}\n    {"":{len(qid)}}  {"":{len(column)}}  -> {after!r}')
+    if not applied:
+        print('\nDry run: nothing was changed. Re-run with --apply to write these fixes.')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', help='one database file (default: every write source)')
+    parser.add_argument('--apply', action='store_true', help='commit the fixes (default: dry run)')
+    parser.add_argument('--rule', action='append', choices=[r['name'] for r in RULES],
+                        help='run only these rules (repeatable, still in the standard order)')
+    parser.add_argument('--samples', type=int, default=3, help='example rows shown per rule')
+    args = parser.parse_args()
+
+    paths = [args.db] if args.db else datasource.write_paths()
+    try:
+        for path in paths:
+            datasource.check_writable(path)
+    except ValueError as e:
+        sys.exit(str(e))
+    if args.db and not os.path.exists(args.db):
+        sys.exit(f'No database at {args.db}')
+    rules = [r for r in RULES if not args.rule or r['name'] in args.rule]
+    for path in paths:
+        if not os.path.exists(path):
+            print(f'{path}: missing, skipped')
+            continue
+        if len(paths) > 1:
+            print(f'== {path}')
+        conn = sqlite3.connect(path, isolation_level=None)  # transactions are managed by run()
+        try:
+            schema.migrate(conn)
+            report = run(conn, rules, apply=args.apply, samples=args.samples)
+        finally:
+            conn.close()
+        print_report(report, args.apply)
+
+
+if __name__ == '__main__':
+    main()
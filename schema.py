@@ -0,0 +1,209 @@
+import sqlite3
+import sys
+
+import answer_key
+
+# Shared by the site (utils), builder.py and mcq_extractor_gui.py, so every
+# writer leaves mcqs.db in the same shape. migrate() is idempotent and cheap
+# once applied; writers run it right after opening a read-write connection.
+# The site never migrates (on a big bank that is seconds of writes inside a
+# request): it only checks is_current(), and deploys run `python schema.py`.
+
+# Bumped whenever migrate() gains a step; kept in PRAGMA user_version so a
+# read-only handle can tell a migrated file from an older one.
+SCHEMA_VERSION = 1
+
+QUESTIONS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS questions (
+        id TEXT PRIMARY KEY,
+        set_id INTEGER,
+        category TEXT,
+        tag TEXT,
+        description TEXT,
+        question TEXT,
+        image_url TEXT,
+        options TEXT,
+        correct TEXT,
+        explanation TEXT,
+        category_id INTEGER REFERENCES categories(id),
+        correct_idx TEXT
+    )
+'''
+
+CATEGORIES_TABLE = '''
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        slug TEXT NOT NULL UNIQUE
+    )
+'''
+
+# Set lookups are point queries on (category_id, set_id); the sidebar's
+# DISTINCT set_id ... ORDER BY set_id DESC is answered from the same index.
+QUESTIONS_INDEX = 'CREATE INDEX IF NOT EXISTS idx_questions_category_set ON questions (category_id, set_id)'
+
+# correct_idx is `correct` resolved to option indices (answer_key.py); NULL
+# means "not resolved yet", and this partial index lists exactly those rows.
+UNRESOLVED_INDEX = 'CREATE INDEX IF NOT EXISTS idx_questions_unresolved ON questions (id) WHERE correct_idx IS NULL'
+
+# Answers answer_key.resolve() could not match to any option, for a human to settle
+ANSWER_REVIEW_TABLE = '''
+    CREATE TABLE IF NOT EXISTS answer_review (
+        question_id TEXT PRIMARY KEY,
+        unmatched TEXT NOT NULL,
+        suggestion INTEGER,
+        score REAL,
+        queued_at TEXT NOT NULL
+    )
+'''
+
+# One row per (category, set): what the browse pages list. Kept current by
+# refresh_category_sets() after every write, so readers never GROUP BY questions.
+CATEGORY_SETS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS category_sets (
+        category_id INTEGER NOT NULL REFERENCES categories(id),
+        set_id INTEGER NOT NULL,
+        question_count INTEGER NOT NULL,
+        tag TEXT,
+        description TEXT,
+        PRIMARY KEY (category_id, set_id)
+    )
+'''
+
+# Writers keep inserting the category *name*; these triggers resolve it to a
+# categories row (creating one on first use) so category_id is never stale.
+# The slug expression must stay in step with slugify() below.
+_RESOLVE_CATEGORY = '''
+        INSERT INTO categories (name, slug)
+        SELECT NEW.category,
+               CASE WHEN EXISTS (SELECT 1 FROM categories WHERE slug = s)
+                    THEN s || '-' || (SELECT COALESCE(MAX(id), 0) + 1 FROM categories)
+                    ELSE s END
+        FROM (SELECT lower(replace(trim(NEW.category), ' ', '-')) AS s)
+        WHERE NOT EXISTS (SELECT 1 FROM categories WHERE name = NEW.category);
+        UPDATE questions SET category_id = (SELECT id FROM categories WHERE name = NEW.category)
+        WHERE rowid = NEW.rowid;
+'''
+TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS questions_category_insert
+        AFTER INSERT ON questions
+        WHEN NEW.category IS NOT NULL AND NEW.category_id IS NULL
+        BEGIN {_RESOLVE_CATEGORY} END''',
+    f'''CREATE TRIGGER IF NOT EXISTS questions_category_update
+        AFTER UPDATE OF category ON questions
+        WHEN NEW.category IS NOT NULL AND NEW.category IS NOT OLD.category
+        BEGIN {_RESOLVE_CATEGORY} END''',
+    # Edited options/answers need resolving again (answer_key.resolve_pending)
+    '''CREATE TRIGGER IF NOT EXISTS questions_answers_update
+        AFTER UPDATE OF options, correct ON questions
+        WHEN NEW.correct_idx IS NOT NULL
+        BEGIN UPDATE questions SET correct_idx = NULL WHERE rowid = NEW.rowid; END''',
+)
+
+
+def slugify(name):
+    """'Salesforce Agentforce' -> 'salesforce-agentforce' (the URLs the site already uses)."""
+    return name.strip(' ').replace(' ', '-').lower()
+
+
+def get_or_create_category(conn, name):
+    """Returns the categories.id for `name`, adding it (with a unique slug) if new."""
+    row = conn.execute('SELECT id FROM categories WHERE name = ?', (name,)).fetchone()
+    if row:
+        return row[0]
+    slug = slugify(name)
+    if conn.execute('SELECT 1 FROM categories WHERE slug = ?', (slug,)).fetchone():
+        next_id = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM categories').fetchone()[0]
+        slug = f'{slug}-{next_id}'
+    return conn.execute('INSERT INTO categories (name, slug) VALUES (?, ?)', (name, slug)).lastrowid
+
+
+def refresh_category_sets(conn, sets=None):
+    """
+    Recomputes category_sets from questions. Call before committing a write.
+    `sets` limits it to the (category name, set_id) pairs the write touched,
+    before and after, each a point query on idx_questions_category_set; None
+    rebuilds the whole table (migrations, bulk imports, repairs, promote).
+    """
+    if sets is None:
+        conn.execute('DELETE FROM category_sets')
+        conn.execute('''
+            INSERT INTO category_sets (category_id, set_id, question_count, tag, description)
+            SELECT category_id, set_id, COUNT(*), MAX(tag), MAX(description)
+            FROM questions
+            WHERE category_id IS NOT NULL
+            GROUP BY category_id, set_id
+        ''')
+        return
+    for name, set_id in set(sets):
+        row = conn.execute('SELECT id FROM categories WHERE name = ?', (name,)).fetchone()
+        if row is None:
+            continue
+        conn.execute('DELETE FROM category_sets WHERE category_id = ? AND set_id = ?', (row[0], set_id))
+        conn.execute('''
+            INSERT INTO category_sets (category_id, set_id, question_count, tag, description)
+            SELECT category_id, set_id, COUNT(*), MAX(tag), MAX(description)
+            FROM questions
+            WHERE category_id = ? AND set_id = ?
+            GROUP BY category_id, set_id
+        ''', (row[0], set_id))
+
+
+def set_of(conn, question_id):
+    """The (category name, set_id) a stored question belongs to, or None if there is no such row."""
+    return conn.execute('SELECT category, set_id FROM questions WHERE id = ?', (question_id,)).fetchone()
+
+
+def migrate(conn):
+    """Brings a questions-only mcqs.db up to the categories schema (no-op once done)."""
+    conn.execute(CATEGORIES_TABLE)
+    conn.execute(QUESTIONS_TABLE)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(questions)')}
+    if 'category_id' not in columns:
+        conn.execute('ALTER TABLE questions ADD COLUMN category_id INTEGER REFERENCES categories(id)')
+    if 'correct_idx' not in columns:
+        conn.execute('ALTER TABLE questions ADD COLUMN correct_idx TEXT')
+
+    pending = conn.execute(
+        'SELECT DISTINCT category FROM questions WHERE category_id IS NULL AND category IS NOT NULL'
+    ).fetchall()
+    for (name,) in pending:
+        cat_id = get_or_create_category(conn, name)
+        conn.execute('UPDATE questions SET category_id = ? WHERE category = ? AND category_id IS NULL',
+                     (cat_id, name))
+
+    conn.execute(QUESTIONS_INDEX)
+    conn.execute(UNRESOLVED_INDEX)
+    conn.execute(ANSWER_REVIEW_TABLE)
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+    has_aggregate = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'category_sets'").fetchone()
+    if not has_aggregate or pending:
+        conn.execute(CATEGORY_SETS_TABLE)
+        refresh_category_sets(conn)
+    answer_key.resolve_pending(conn)  # backfills correct_idx on first run
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    conn.commit()
+
+
+def is_current(conn):
+    """True if the database was brought up to SCHEMA_VERSION by migrate() (no writes)."""
+    return conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION
+
+
+if __name__ == '__main__':
+    # python schema.py [path/to/mcqs.db]   (default: every write source, see datasource.py)
+    import datasource
+    config = datasource.current()
+    paths = sys.argv[1:] or datasource.write_paths(config)
+    for db_path in paths:
+        conn = sqlite3.connect(db_path)
+        migrate(conn)
+        print(f'{db_path}: schema version {SCHEMA_VERSION}')
+        for row in conn.execute('SELECT id, slug, name FROM categories ORDER BY id'):
+            print('', *row, sep='\t')
+        conn.close()
+    if config.split and not sys.argv[1:]:
+        print(f'Run `python datasource.py promote` to publish the migrated schema to {config.snapshot}')
@@ -0,0 +1,142 @@
+// CodeWme service worker (rendered by app.py at /sw.js).
+// - App shell (practice page + CSS) is cached on install.
+// - Practice pages and answer keys: stale-while-revalidate, using the server's ETags.
+// - Fingerprinted static files (/static/dist/, /static/vendor/, /static/images/opt/): cache-first.
+// - Pages ask us to prefetch the next set via postMessage({type: 'prefetch', urls}).
+// - The page cache is per content version: a publish changes this file, and the new
+//   worker starts from an empty page cache instead of serving pre-publish copies.
+
+const VERSION = {{ version | tojson }};
+const CONTENT_VERSION = {{ content_version | tojson }};
+const SHELL_CACHE = 'codewme-shell-' + VERSION;
+const PAGE_CACHE = 'codewme-pages-' + (CONTENT_VERSION || 'v1');
+const STATIC_CACHE = 'codewme-static-v1';
+const SHELL_URLS = {{ shell | tojson }};
+const MAX_PAGES = 80;
+
+const SWR_PREFIXES = ['/mcqs/', '/api/mcqs/', '/practice-mcqs'];
+const STATIC_PREFIXES = ['/static/dist/', '/static/vendor/', '/static/images/opt/'];
+
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE)
+            .then(cache => cache.addAll(SHELL_URLS))
+            .then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(keys
+                .filter(key => (key.startsWith('codewme-shell-') && key !== SHELL_CACHE) ||
+                               (key.startsWith('codewme-pages-') && key !== PAGE_CACHE))
+                .map(key => caches.delete(key))))
+            .then(() => self.clients.claim())
+    );
+});
+
+async function trimPages() {
+    const cache = await caches.open(PAGE_CACHE);
+    const keys = await cache.keys();
+    // Cache keys come back in insertion order: drop the oldest
+    for (let i = 0; i < keys.length - MAX_PAGES; i++) {
+        await cache.delete(keys[i]);
+    }
+}
+
+// Fetches `url`, sending the cached copy's ETag. A 304 keeps the cached copy;
+// a fresh 200 replaces it. Resolves to whichever response is current.
+async function revalidate(url, cached, prefetch) {
+    const headers = {};
+    // Prefetches are not views: the server leaves them out of popularity counts
+    if (prefetch) headers['X-Prefetch'] = '1';
+    const etag = cached && cached.headers.get('ETag');
+    if (etag) headers['If-None-Match'] = etag;
+
+    const response = await fetch(url, { headers, credentials: 'same-origin', cache: 'no-store' });
+    // Published since this worker was built: fetch the new sw.js (and its fresh page cache)
+    const served = response.headers.get('X-Content-Version');
+    if (served && CONTENT_VERSION && served !== CONTENT_VERSION) self.registration.update();
+    if (response.status === 304 && cached) return cached;
+    // Legacy slugs / unseeded exams redirect: hand the redirect to the page, don't cache it
+    if (response.redirected) return Response.redirect(response.url, 302);
+    if (response.ok) {
+        const cache = await caches.open(PAGE_CACHE);
+        await cache.put(url, response.clone());
+        trimPages();
+    }
+    return response;
+}
+
+async function staleWhileRevalidate(event) {
+    const url = event.request.url;
+    const cached = await caches.match(url);
+    const network = revalidate(url, cached);
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (err) {
+        return offlineResponse(event.request);
+    }
+}
+
+async function cacheFirst(request) {
+    const cached = await caches.match(request);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(STATIC_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+async function networkWithFallback(request) {
+    try {
+        return await fetch(request);
+    } catch (err) {
+        return (await caches.match(request)) || offlineResponse(request);
+    }
+}
+
+function offlineResponse(request) {
+    if (request.mode === 'navigate') {
+        return caches.match('/practice-mcqs').then(page => page || new Response(
+            '<h1>You are offline</h1><p>Sets you have opened before are still available.</p>',
+            { status: 503, headers: { 'Content-Type': 'text/html; charset=utf-8' } }
+        ));
+    }
+    return new Response(JSON.stringify({ success: false, error: 'offline' }),
+        { status: 503, headers: { 'Content-Type': 'application/json' } });
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (url.origin !== self.location.origin) return;
+
+    if (STATIC_PREFIXES.some(p => url.pathname.startsWith(p))) {
+        event.respondWith(cacheFirst(request));
+    } else if (SWR_PREFIXES.some(p => url.pathname.startsWith(p))) {
+        event.respondWith(staleWhileRevalidate(event));
+    } else if (request.mode === 'navigate') {
+        event.respondWith(networkWithFallback(request));
+    }
+});
+
+self.addEventListener('message', event => {
+    const data = event.data || {};
+    if (data.type !== 'prefetch' || !Array.isArray(data.urls)) return;
+    event.waitUntil(Promise.all(data.urls.map(async path => {
+        const url = new URL(path, self.location.origin).href;
+        if (await caches.match(url)) return;  // already cached; SWR refreshes it on use
+        try {
+            await revalidate(url, null, true);
+        } catch (err) { /* offline: try again next page view */ }
+    })));
+});
@@ -0,0 +1,18 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import schema  # noqa: E402
+
+
+@pytest.fixture
+def bank():
+    """An empty, migrated in-memory question bank."""
+    conn = sqlite3.connect(':memory:', isolation_level=None)
+    schema.migrate(conn)
+    yield conn
+    conn.close()
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+import answer_key
+
+OPTIONS = ['Apex', 'Flow', 'Process Builder', 'Workflow']
+
+
+@pytest.mark.parametrize('options, correct, indices', [
+    # exact, then ignoring case/spacing/trailing dot
+    (OPTIONS, ['Flow'], [1]),
+    (OPTIONS, ['  Flow  '], [1]),
+    (OPTIONS, ['process builder.'], [2]),
+    (OPTIONS, ['Workflow', 'Apex'], [0, 3]),
+    # label prefixes on either side
+    (['A. Apex', 'B. Flow'], ['Flow'], [1]),
+    (OPTIONS, ['b. flow'], [1]),
+    (OPTIONS, ['C) Process Builder'], [2]),
+    ([' A. Yes ', 'B. No'], ['A. Yes'], [0]),
+    # a bare option letter
+    (OPTIONS, ['B'], [1]),
+    (OPTIONS, ['d)'], [3]),
+    # scalar `correct` counts as one answer
+    (OPTIONS, 'Flow', [1]),
+    # typo close to exactly one option
+    (['Dynamic grounding', 'Static grounding'], ['Dynamic groundin'], [0]),
+])
+def test_resolve_matches(options, correct, indices):
+    assert answer_key.resolve(options, correct) == (indices, [])
+
+
+@pytest.mark.parametrize('options, correct, suggestion', [
+    # letter beyond the options
+    (['Apex', 'Flow'], ['E'], 0),
+    # near ties: the best option does not beat the runner-up by FUZZY_MARGIN
+    (['Record-triggered flow', 'Record-triggered flows', 'Screen flow'], ['Record triggered flow'], 0),
+    (['Apex class', 'Apex classes'], ['Apex clas'], 0),
+    # nothing to match against
+    ('not a list', ['Apex'], None),
+])
+def test_resolve_misses(options, correct, suggestion):
+    indices, misses = answer_key.resolve(options, correct)
+    assert indices == []
+    assert len(misses) == 1
+    assert misses[0][0] == correct[0]
+    assert misses[0][1] == suggestion
+
+
+@pytest.mark.parametrize('correct', [[], None, 42])
+def test_resolve_no_answer(correct):
+    assert answer_key.resolve(OPTIONS, correct) == ([], [])
+
+
+@pytest.mark.parametrize('text, value', [
+    ('["A", "B"]', ['A', 'B']),
+    ('"Flow"', 'Flow'),
+    ('Flow', 'Flow'),  # bare text, not JSON
+    ('', []),
+    (None, []),
+])
+def test_json_field(text, value):
+    assert answer_key.json_field(text) == value
+
+
+def _insert(conn, qid, options, correct):
+    conn.execute('INSERT INTO questions (id, set_id, category, question, options, correct) '
+                 'VALUES (?, 1, ?, ?, ?, ?)', (qid, 'Apex', qid, json.dumps(options), correct))
+
+
+def test_resolve_pending_fills_and_queues(bank):
+    _insert(bank, 'ok', OPTIONS, '["flow"]')
+    _insert(bank, 'scalar', OPTIONS, '"B"')
+    _insert(bank, 'miss', OPTIONS, '["Visualforce"]')
+    _insert(bank, 'none', OPTIONS, '[]')
+
+    assert answer_key.resolve_pending(bank) == (2, 2)
+    stored = dict(bank.execute('SELECT id, correct_idx FROM questions'))
+    assert stored == {'ok': '[1]', 'scalar': '[1]', 'miss': '[]', 'none': '[]'}
+    queued = dict(bank.execute('SELECT question_id, unmatched FROM answer_review'))
+    assert queued == {'miss': '["Visualforce"]', 'none': '[]'}
+
+    # Fixing the answer resets correct_idx (trigger) and clears the review entry
+    bank.execute("""UPDATE questions SET correct = '["Apex"]' WHERE id = 'miss'""")
+    assert answer_key.resolve_pending(bank) == (1, 0)
+    assert bank.execute("SELECT correct_idx FROM questions WHERE id = 'miss'").fetchone() == ('[0]',)
+    assert [r[0] for r in bank.execute('SELECT question_id FROM answer_review')] == ['none']
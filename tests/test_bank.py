@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+import bank
+
+RECORDS = [{'id': 'q1', 'options': ['A', 'B']}, {'id': 'q2', 'question': 'x ] y, "z"'}]
+ARRAY = '[\n  {"id": "q1", "options": ["A", "B"]},\n  {"id": "q2", "question": "x ] y, \\"z\\""}\n]\n'
+
+
+def _read(text, chunk, monkeypatch, json_array=True):
+    monkeypatch.setattr(bank, 'READ_CHUNK', chunk)
+    return list(bank.read_records(io.StringIO(text), json_array))
+
+
+@pytest.mark.parametrize('chunk', [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize('text, records', [
+    (ARRAY, RECORDS),
+    ('[1, 23, 456, -7.25e3]', [1, 23, 456, -7250.0]),  # numbers cut at a chunk edge
+    ('[ "a b" ,\ttrue ,\r\n null ]', ['a b', True, None]),
+    ('[]', []),
+    (' \n[\n]\n', []),
+    ('', []),
+])
+def test_read_json_array(text, records, chunk, monkeypatch):
+    assert _read(text, chunk, monkeypatch) == records
+
+
+@pytest.mark.parametrize('chunk', [1, 5, 1 << 16])
+@pytest.mark.parametrize('text', [
+    '[{"id": "q1"}',           # no closing bracket
+    '[{"id": "q1"}, {"id": ',  # cut inside an element
+    '[{"id": "q1"},',          # cut after a comma
+    '[1, 2,]',                 # trailing comma
+    '[1 2]',                   # missing comma
+    '{"id": "q1"}',            # not an array
+])
+def test_read_json_array_rejects(text, chunk, monkeypatch):
+    with pytest.raises(ValueError):
+        _read(text, chunk, monkeypatch)
+
+
+def test_read_ndjson_skips_bad_lines(monkeypatch, capsys):
+    text = '{"id": "q1"}\n\n  \nnot json\n{"id": "q2"}'
+    assert _read(text, 4, monkeypatch, json_array=False) == [{'id': 'q1'}, {'id': 'q2'}]
+    assert 'line 4 skipped' in capsys.readouterr().err
+
+
+def test_writer_round_trip(monkeypatch):
+    for json_array in (True, False):
+        out = io.StringIO()
+        writer = bank.RecordWriter(out, json_array)
+        for record in RECORDS:
+            writer.write(record)
+        writer.close()
+        assert _read(out.getvalue(), 5, monkeypatch, json_array) == RECORDS
+
+
+@pytest.mark.parametrize('record, expected', [
+    ({'tag': 'Apex', 'category': 'SALESFORCE'}, {'tag': 'SALESFORCE', 'category': 'Apex'}),
+    ({'tag': 'salesforce', 'category': 'Apex'}, {'tag': 'SALESFORCE', 'category': 'Apex'}),
+    ({'tag': 'SALESFORCE', 'category': 'Apex'}, {'tag': 'SALESFORCE', 'category': 'Apex'}),
+])
+def test_fix_swapped_fields(record, expected):
+    assert bank.fix_swapped_fields(dict(record)) == expected
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import repair
+
+RULES = {rule['name']: rule for rule in repair.RULES}
+
+
+def _insert(conn, qid, category='Apex', tag='SALESFORCE', question=None,
+            options=('Apex', 'Flow', 'Workflow'), correct=('Flow',)):
+    conn.execute(
+        'INSERT INTO questions (id, set_id, category, tag, question, options, correct) VALUES (?, 1, ?, ?, ?, ?, ?)',
+        (qid, category, tag, question or f'Question {qid}?',
+         options if isinstance(options, str) else json.dumps(list(options)),
+         correct if isinstance(correct, str) else json.dumps(list(correct))))
+
+
+def _raw(conn, qid):
+    return conn.execute('SELECT category, tag, options, correct FROM questions WHERE id = ?', (qid,)).fetchone()
+
+
+def _row(conn, qid):
+    category, tag, options, correct = _raw(conn, qid)
+    return {'category': category, 'tag': tag, 'options': json.loads(options), 'correct': json.loads(correct)}
+
+
+def _counts(report):
+    return {rule['name']: count for rule, count, _, _ in report}
+
+
+# (rule, columns of the broken row, what the row looks like after --apply)
+FIXES = [
+    ('swapped_fields', {'category': 'SALESFORCE', 'tag': 'Apex'}, {'category': 'Apex', 'tag': 'SALESFORCE'}),
+    ('tag_case', {'tag': ' salesforce '}, {'tag': 'SALESFORCE'}),
+    ('correct_not_array', {'correct': '"Flow"'}, {'correct': ['Flow']}),
+    ('correct_not_array', {'correct': 'Flow'}, {'correct': ['Flow']}),
+    ('option_letter_prefix', {'options': ['A. Apex', 'B) Flow', 'c. Workflow']},
+     {'options': ['Apex', 'Flow', 'Workflow']}),
+    ('empty_options', {'options': ['Apex', '', 'Flow', ' ']}, {'options': ['Apex', 'Flow']}),
+    ('correct_text_mismatch', {'correct': [' flow ']}, {'correct': ['Flow']}),
+    ('correct_text_mismatch', {'correct': ['B. Flow', 'Apex']}, {'correct': ['Flow', 'Apex']}),
+]
+
+
+@pytest.mark.parametrize('name, broken, fixed', FIXES)
+def test_rule_fixes_row(bank, name, broken, fixed):
+    _insert(bank, 'clean')
+    _insert(bank, 'broken', **broken)
+    report = repair.run(bank, [RULES[name]], apply=True, samples=1)
+
+    assert _counts(report)[name] == 1
+    row = _row(bank, 'broken')
+    assert {key: row[key] for key in fixed} == fixed
+    assert _raw(bank, 'clean') == ('Apex', 'SALESFORCE', '["Apex", "Flow", "Workflow"]', '["Flow"]')
+
+
+@pytest.mark.parametrize('name, row', [
+    ('correct_unresolved', {'correct': ['Visualforce']}),
+    ('correct_unresolved', {'correct': []}),
+    ('too_few_options', {'options': ['Apex']}),
+    ('too_few_options', {'options': 'not json'}),
+])
+def test_report_only_rules(bank, name, row):
+    _insert(bank, 'clean')
+    _insert(bank, 'odd', **row)
+    before = _raw(bank, 'odd')
+    report = repair.run(bank, [RULES[name]], apply=True, samples=1)
+
+    assert _counts(report)[name] == 1
+    assert _raw(bank, 'odd') == before
+
+
+def test_duplicates_keep_first(bank):
+    _insert(bank, 'first', question='Same?')
+    _insert(bank, 'second', question='  same? ')
+    _insert(bank, 'other_category', category='Flow', question='Same?')
+    report = repair.run(bank, [RULES['duplicate_questions']], apply=True)
+
+    assert _counts(report)['duplicate_questions'] == 1
+    assert [r[0] for r in bank.execute('SELECT id FROM questions ORDER BY id')] == ['first', 'other_category']
+
+
+def test_dry_run_changes_nothing(bank):
+    _insert(bank, 'broken', category='SALESFORCE', tag='apex', correct='"Flow"')
+    before = _raw(bank, 'broken')
+    report = repair.run(bank, apply=False)
+
+    assert _counts(report)['swapped_fields'] == 1
+    assert _raw(bank, 'broken') == before
+
+
+def test_rules_run_in_order(bank):
+    # Prefix stripping happens first, so the label-free answer then matches an option
+    _insert(bank, 'q', options=['A. Apex', 'B. Flow'], correct='"b. flow"')
+    report = repair.run(bank, apply=True)
+
+    counts = _counts(report)
+    assert counts['correct_not_array'] == counts['option_letter_prefix'] == counts['correct_text_mismatch'] == 1
+    assert counts['correct_unresolved'] == 0
+    assert _row(bank, 'q')['options'] == ['Apex', 'Flow'] and _row(bank, 'q')['correct'] == ['Flow']
+    assert bank.execute("SELECT correct_idx FROM questions WHERE id = 'q'").fetchone() == ('[1]',)
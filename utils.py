@@ -1,64 +1,259 @@
 import sqlite3
 import json
 import os
+import random
+import threading
 from datetime import datetime
 
+import answer_key
+import article_store
+import content_version
+import datasource
+import metrics
+import popularity
+import schema
+from records import Article, Category, Contest, McqSet
+
 # --- CONFIGURATION ---
-DB_NAME = 'mcqs.db'
+DB_NAME = datasource.current().snapshot  # what the site reads (see datasource.py)
 ARTICLES_FILE = 'articles.json'
 CONTESTS_FILE = 'contests.json'
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    if not os.path.exists(DB_NAME):
+# The published files. While content_version's data version is unchanged the
+# snapshots below are trusted without touching the disk; once it moves, each
+# one is re-checked (and rebuilt if its file changed) on next use.
+_WATCHED = {ARTICLES_FILE, article_store.changes_path(ARTICLES_FILE), CONTESTS_FILE, DB_NAME}
+content_version.watch_files(*sorted(_WATCHED))
+
+def _content_version(path):
+    """The shared data version if `path` is watched (None: check the file itself)."""
+    return content_version.version() if path in _WATCHED else None
+
+# In-process cache: key -> ((inode, mtime) of the source, value, content version
+# it was last checked at). Entries are rebuilt when the underlying file changes
+# or is replaced (a promoted snapshot), so callers always see the latest
+# published content.
+_cache = {}
+
+def _cached_by_mtime(key, path, loader, default=None):
+    """Returns loader() cached until the file at `path` is modified."""
+    seen = _content_version(path)
+    hit = _cache.get(key)
+    if hit and seen is not None and hit[2] == seen:
+        metrics.record_cache(key, True)
+        return hit[1]
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return default
+    mtime = (st.st_ino, st.st_mtime_ns)
+    if hit and hit[0] == mtime:
+        _cache[key] = (mtime, hit[1], seen)
+        metrics.record_cache(key, True)
+        return hit[1]
+    metrics.record_cache(key, False)
+    value = loader()
+    _cache[key] = (mtime, value, seen)
+    return value
+
+# Per-thread read-only handle, reused across requests. SQLite handles must not
+# cross a fork, so it is reopened whenever the process id changes; it is also
+# reopened when DB_NAME is a different file (datasource.promote() renamed a new
+# snapshot over it), while the old handle still reads the old, complete file.
+_local = threading.local()
+
+def get_read_connection():
+    """Returns this thread's cached read-only connection (do not close it)."""
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.conn, _local.pid, _local.ino, _local.seen = None, os.getpid(), None, None
+    seen = _content_version(DB_NAME)
+    if _local.conn is not None and seen is not None and seen == _local.seen:
+        return _local.conn
+    try:
+        ino = os.stat(DB_NAME).st_ino
+    except FileNotFoundError:
         return None
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row # Allows accessing columns by name (row['id'])
-    return conn
+    if _local.conn is not None and _local.ino != ino:
+        _local.conn.close()
+        _local.conn = None
+    if _local.conn is None:
+        conn = sqlite3.connect(datasource.read_uri(DB_NAME), uri=True, factory=metrics.InstrumentedConnection)
+        conn.row_factory = sqlite3.Row
+        _local.conn, _local.ino = conn, ino
+    _local.seen = seen
+    return _local.conn
+
+def reset_connections():
+    """Closes this process's handle (before fork) or forgets an inherited one (after)."""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.pid == os.getpid():
+        conn.close()
+    _local.conn, _local.pid, _local.ino, _local.seen = None, os.getpid(), None, None
+
+# --- ARTICLE HELPERS (articles.json + change log, see article_store.py) ---
+# path -> [store, articles tuple (newest first), {slug: Article}, content version].
+# A publish only rebuilds the Article for the slug it touched; the check per call
+# is two stats, skipped entirely while the shared data version is unchanged.
+_article_state = {}
+_article_lock = threading.Lock()
+_article_listeners = []
+
+def on_article_change(callback):
+    """Registers callback(slugs) for published article changes (slugs is None after a full reload)."""
+    _article_listeners.append(callback)
+
+def _current_articles():
+    seen = _content_version(ARTICLES_FILE)
+    with _article_lock:
+        state = _article_state.get(ARTICLES_FILE)
+        if state is None:
+            store = article_store.open_store(ARTICLES_FILE)
+            articles = tuple(Article(**a) for a in store.records())
+            state = _article_state[ARTICLES_FILE] = [store, articles, {a.slug: a for a in articles}, seen]
+            metrics.record_cache('articles', False)
+            return state
+        store, _, by_slug, checked = state
+        if seen is not None and seen == checked:
+            metrics.record_cache('articles', True)
+            return state
+        state[3] = seen
+        changed = store.refresh()
+        if not changed and changed is not None:
+            metrics.record_cache('articles', True)
+            return state
+        metrics.record_cache('articles', False)
+        if changed is None:
+            by_slug = {}
+        else:
+            by_slug = {slug: a for slug, a in by_slug.items() if slug not in changed}
+        articles = []
+        for record in store.records():
+            article = by_slug.get(record['slug'])
+            if article is None:
+                article = by_slug[record['slug']] = Article(**record)
+            articles.append(article)
+        state[1], state[2] = tuple(articles), by_slug
+    for callback in _article_listeners:
+        callback(changed)
+    return state
 
-# --- ARTICLE HELPERS (JSON) ---
 def get_all_articles():
-    """Reads all articles from JSON."""
-    if os.path.exists(ARTICLES_FILE):
-        with open(ARTICLES_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return []
+    """All articles, newest first (kept current as builder.py publishes)."""
+    return _current_articles()[1]
 
 def get_article_by_slug(slug):
     """Finds a specific article by its slug."""
-    articles = get_all_articles()
-    return next((a for a in articles if a["slug"] == slug), None)
+    return _current_articles()[2].get(slug)
 
 # --- MCQ HELPERS (SQLite) ---
 
-def get_paginated_mcq_sets(page=1, per_page=6):
+_schema_checked = set()  # (path, inode) of database files already checked by this process
+
+def ensure_schema():
     """
-    Fetches a specific chunk of sets for the Load More button.
-    Efficiently uses LIMIT and OFFSET.
+    Checks once per database file that it carries the current schema. The site
+    only reads: migrating is a deploy step (`python schema.py`, or a promote).
     """
-    conn = get_db_connection()
-    if not conn: return []
-    
-    offset = (page - 1) * per_page
-    
+    conn = get_read_connection()
+    if conn is None or (DB_NAME, _local.ino) in _schema_checked:
+        return
+    if not schema.is_current(conn):
+        raise RuntimeError(f'{DB_NAME} predates schema version {schema.SCHEMA_VERSION}; '
+                           f'run `python schema.py` before starting the site')
+    _schema_checked.add((DB_NAME, _local.ino))
+
+def _load_categories():
+    ensure_schema()
+    conn = get_read_connection()
+    if not conn: return {}, {}
+    by_slug, legacy = {}, {}
+    for r in conn.execute('SELECT id, name, slug FROM categories'):
+        cat = Category(**dict(r))
+        by_slug[cat.slug] = cat
+        # Old URLs were matched with slug.replace('-', ' ') + COLLATE NOCASE
+        legacy[cat.name.lower()] = cat
+    return by_slug, legacy
+
+def get_category_map():
+    """(slug -> Category, lowercased name -> Category), rebuilt when the DB changes."""
+    return _cached_by_mtime('categories', DB_NAME, _load_categories, default=({}, {}))
+
+def resolve_category(slug):
+    """
+    Maps a URL slug to its Category. Returns None if unknown; callers should
+    301 to category.slug when it differs from what was requested.
+    """
+    by_slug, legacy = get_category_map()
+    cat = by_slug.get(slug)
+    if cat is None:
+        cat = by_slug.get(slug.lower()) or legacy.get(slug.replace('-', ' ').lower())
+    return cat
+
+def _load_mcq_set_index():
+    ensure_schema()
+    conn = get_read_connection()
+    if not conn: return ()
+
     # --- SORTING LOGIC ---
     # ORDER BY category ASC  -> A to Z (e.g. Apex, then Salesforce)
     # ORDER BY set_id DESC   -> 10 to 1 (Newest/Highest Set first)
+    # Reads the category_sets aggregate the writers maintain (no GROUP BY over questions)
     rows = conn.execute('''
-        SELECT category, set_id as set_num, tag, description 
-        FROM questions 
-        GROUP BY category, set_id 
-        ORDER BY category ASC, set_id DESC
-        LIMIT ? OFFSET ?
-    ''', (per_page, offset)).fetchall()
-    conn.close()
-    
-    sets = []
-    for r in rows:
-        s = dict(r)
-        s['url_slug'] = s['category'].replace(' ', '-').lower()
-        sets.append(s)
-    return sets
+        SELECT c.name AS category, s.set_id AS set_num, s.tag, s.description,
+               c.slug AS url_slug, s.question_count
+        FROM category_sets s
+        JOIN categories c ON c.id = s.category_id
+        ORDER BY c.name ASC, s.set_id DESC
+    ''').fetchall()
+
+    return tuple(McqSet(**dict(r)) for r in rows)
+
+def get_mcq_set_index():
+    """
+    Returns every (category, set) card in display order.
+    One aggregate read per DB change instead of one per request.
+    """
+    return _cached_by_mtime('mcq_set_index', DB_NAME, _load_mcq_set_index, default=())
+
+def _group_sets_by_category():
+    groups = {}
+    for s in get_mcq_set_index():
+        groups.setdefault(s.url_slug, []).append(s)
+    return {slug: tuple(sets) for slug, sets in groups.items()}
+
+def get_category_sets(category):
+    """All sets of one Category (newest first), for the /mcqs/<category> page."""
+    groups = _cached_by_mtime('sets_by_category', DB_NAME, _group_sets_by_category, default={})
+    return groups.get(category.slug, ())
+
+def _load_category_overview():
+    by_slug, _ = get_category_map()
+    overview = []
+    for slug, sets in _cached_by_mtime('sets_by_category', DB_NAME, _group_sets_by_category, default={}).items():
+        overview.append({
+            'name': by_slug[slug].name if slug in by_slug else sets[0].category,
+            'url_slug': slug,
+            'set_count': len(sets),
+            'question_count': sum(s.question_count for s in sets),
+        })
+    return tuple(sorted(overview, key=lambda c: c['name']))
+
+def get_category_overview():
+    """One entry per category (name, url_slug, set_count, question_count) for the browse links."""
+    return _cached_by_mtime('category_overview', DB_NAME, _load_category_overview, default=())
+
+def get_paginated_mcq_sets(page=1, per_page=6, sort=None):
+    """
+    Fetches a specific chunk of sets for the Load More button.
+    Slices the cached set index (no OFFSET scan per click).
+    sort='popular' slices the popularity ranking instead (cached alongside the index).
+    """
+    offset = (page - 1) * per_page
+    if offset < 0: return []
+    index = get_mcq_set_index()
+    if sort == 'popular':
+        index = popularity.rank('set', index, popularity.set_key)
+    return list(index[offset:offset + per_page])
 
 def get_mcq_set_data(category, set_num):
     """
@@ -67,69 +262,167 @@ def get_mcq_set_data(category, set_num):
     2. The Metadata (Tags)
     3. 'Next Set' check
     4. Sidebar Links
+    `category` is a Category from resolve_category(); every query below is
+    a point lookup on idx_questions_category_set.
     """
-    clean_cat = category.replace('-', ' ')
-    conn = get_db_connection()
+    conn = get_read_connection()
     if not conn: return None
     
     # 1. Fetch Questions for this set
     q_rows = conn.execute('''
         SELECT * FROM questions 
-        WHERE set_id = ? AND category = ? COLLATE NOCASE
-    ''', (set_num, clean_cat)).fetchall()
+        WHERE category_id = ? AND set_id = ?
+    ''', (category.id, set_num)).fetchall()
     
     if not q_rows:
-        conn.close()
         return None
 
-    # Parse JSON strings back to Python lists
-    questions = []
-    for row in q_rows:
-        q = dict(row)
-        q['options'] = json.loads(q['options'])
-        q['correct'] = json.loads(q['correct'])
-        questions.append(q)
+    questions = [_question(row) for row in q_rows]
 
     # 2. Check if Next Set exists (for the "Next" button)
     next_check = conn.execute('''
         SELECT 1 FROM questions 
-        WHERE set_id = ? AND category = ? COLLATE NOCASE 
+        WHERE category_id = ? AND set_id = ?
         LIMIT 1
-    ''', (set_num + 1, clean_cat)).fetchone()
+    ''', (category.id, set_num + 1)).fetchone()
     has_next = next_check is not None
 
     # 3. Sidebar Data (Latest 5 sets in this category)
     sb_rows = conn.execute('''
         SELECT DISTINCT set_id 
         FROM questions 
-        WHERE category = ? COLLATE NOCASE 
+        WHERE category_id = ?
         ORDER BY set_id DESC
         LIMIT 5
-    ''', (clean_cat,)).fetchall()
+    ''', (category.id,)).fetchall()
     
     sidebar_sets = [
-        {'category': clean_cat, 'set_num': r['set_id'], 'url_slug': category} 
+        {'category': category.name, 'set_num': r['set_id'], 'url_slug': category.slug} 
         for r in sb_rows
     ]
-    
-    conn.close()
 
     return {
         'questions': questions,
         'current_tag': questions[0]['tag'],
-        'clean_category': clean_cat,
+        'clean_category': category.name,
+        'category_slug': category.slug,
         'has_next': has_next,
         'sidebar_sets': sidebar_sets
     }
 
+def get_mcq_set_answers(category, set_num):
+    """
+    Answer key for one set: {question id: {'correct': [option indices], 'explanation': str}}.
+    Served separately from the page so stems/options render first.
+    Returns None if the set does not exist.
+    """
+    conn = get_read_connection()
+    if not conn: return None
+
+    rows = conn.execute('''
+        SELECT id, options, correct, correct_idx, explanation FROM questions
+        WHERE category_id = ? AND set_id = ?
+    ''', (category.id, set_num)).fetchall()
+    if not rows:
+        return None
+
+    return _answer_key(rows)
+
+def get_answer_indices(question_ids):
+    """{question id: correct option indices} for the ids that exist (primary-key lookups)."""
+    conn = get_read_connection()
+    if not conn or not question_ids: return {}
+    ids = list(question_ids)
+    rows = conn.execute(f'''
+        SELECT id, options, correct, correct_idx FROM questions
+        WHERE id IN ({','.join('?' * len(ids))})
+    ''', ids).fetchall()
+    return {row['id']: _correct_idx(row) for row in rows}
+
+def _correct_idx(row):
+    """Stored option indices; rows a writer left unresolved are matched on the fly."""
+    if row['correct_idx'] is not None:
+        return json.loads(row['correct_idx'])
+    return answer_key.resolve(answer_key.json_field(row['options']), answer_key.json_field(row['correct']))[0]
+
+def _question(row):
+    """
+    Row -> template dict. correct_idx holds the option indices answer_key.py
+    resolved at write time; `correct` becomes the text of those options.
+    """
+    q = dict(row)
+    q['options'] = json.loads(q['options'])
+    q['correct_idx'] = _correct_idx(row)
+    q['correct'] = [q['options'][i].strip() for i in q['correct_idx'] if i < len(q['options'])]
+    return q
+
+def _answer_key(rows):
+    return {
+        row['id']: {'correct': _correct_idx(row), 'explanation': row['explanation'] or ''}
+        for row in rows
+    }
+
+# --- EXAM SAMPLER ---
+MAX_EXAM_QUESTIONS = 200
+
+def _load_exam_pools():
+    conn = get_read_connection()
+    if not conn: return {}
+    pools = {}
+    for cat_id, qid in conn.execute('SELECT category_id, id FROM questions WHERE category_id IS NOT NULL'):
+        ids = pools.get(cat_id)
+        if ids is None:
+            ids = pools[cat_id] = []
+        ids.append(qid)
+    # Sorted by question id, not rowid: promote() renumbers rowids, so a rowid
+    # pool would turn the same seed into a different exam after every publish
+    return {cat_id: tuple(sorted(ids)) for cat_id, ids in pools.items()}
+
+def get_exam_pools():
+    """category id -> every question id in it (sorted), rebuilt when the DB changes."""
+    return _cached_by_mtime('exam_pools', DB_NAME, _load_exam_pools, default={})
+
+def _sample_exam_ids(category, n, seed):
+    pool = get_exam_pools().get(category.id, ())
+    n = max(1, min(n, MAX_EXAM_QUESTIONS, len(pool)))
+    # A str seed is hashed deterministically, so the same seed gives the same exam
+    return random.Random(seed).sample(pool, n) if pool else []
+
+def _fetch_by_id(columns, category, ids):
+    """Rows of `category` with these ids (primary-key lookups), in the order given."""
+    conn = get_read_connection()
+    if not conn or not ids: return []
+    placeholders = ','.join('?' * len(ids))
+    rows = conn.execute(f'SELECT {columns} FROM questions WHERE id IN ({placeholders}) AND category_id = ?',
+                        [*ids, category.id]).fetchall()
+    by_id = {r['id']: r for r in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+def get_exam_questions(category, n, seed):
+    """
+    A random, non-repeating sample of `n` questions from all sets in `category`.
+    Sampling works on the in-memory id pool (no ORDER BY RANDOM()); only the
+    picked rows are read. The page should fetch its answers by these ids.
+    """
+    return [_question(row) for row in _fetch_by_id('*', category, _sample_exam_ids(category, n, seed))]
+
+def get_exam_answers(category, ids):
+    """
+    Answer key for the exam questions with these ids (as rendered; not sampled
+    again, so a publish in between cannot swap the questions), same shape as
+    get_mcq_set_answers().
+    """
+    rows = _fetch_by_id('id, options, correct, correct_idx, explanation', category, ids[:MAX_EXAM_QUESTIONS])
+    return _answer_key(rows) if rows else None
+
 # --- CONTEST HELPERS (JSON) ---
+def _load_contests():
+    with open(CONTESTS_FILE, 'r', encoding='utf-8') as f:
+        return tuple(Contest(**c) for c in json.load(f))
+
 def get_contests_data():
     """Returns live and expired contests from JSON."""
-    if not os.path.exists(CONTESTS_FILE):
-        return [], []
-    
-    with open(CONTESTS_FILE, 'r', encoding='utf-8') as f:
-        all_c = json.load(f)
+    all_c = _cached_by_mtime('contests', CONTESTS_FILE, _load_contests, default=())
 
     now = datetime.now()
     live, expired = [], []
@@ -163,16 +456,17 @@ def get_all_sitemap_urls():
     # 1. Get Article Slugs
     articles = get_all_articles()
     for article in articles:
-        urls.append(f"/{article['slug']}")
+        urls.append(f"/{article.slug}")
         
-    # 2. Get All MCQ Sets (Categories + Set Numbers)
-    conn = get_db_connection()
-    if conn:
-        rows = conn.execute('SELECT DISTINCT category, set_id FROM questions').fetchall()
-        conn.close()
-        for r in rows:
-            # Create the URL structure: /mcqs/category-slug/set-N
-            cat_slug = r['category'].replace(' ', '-').lower()
-            urls.append(f"/mcqs/{cat_slug}/set-{r['set_id']}")
+    # 2. Category landing pages: /mcqs/category-slug
+    # From the set aggregate, not the categories table: a renamed category
+    # keeps its old row, but only categories with questions have a page
+    for c in sorted(get_category_overview(), key=lambda c: c['url_slug']):
+        urls.append(f"/mcqs/{c['url_slug']}")
+
+    # 3. Get All MCQ Sets (Categories + Set Numbers)
+    for s in get_mcq_set_index():
+        # Create the URL structure: /mcqs/category-slug/set-N
+        urls.append(f"/mcqs/{s.url_slug}/set-{s.set_num}")
             
     return urls
\ No newline at end of file